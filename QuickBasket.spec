@@ -11,6 +11,7 @@ a = Analysis(
         ('recipes.db', '.'),
         ('alembic.ini', '.'),
         ('migrations', 'migrations'),
+        ('site_extractors.json', '.'),
     ],
     hiddenimports=[
         'flask',
@@ -19,6 +20,8 @@ a = Analysis(
         'sqlalchemy',
         'requests',
         'bs4',
+        'soupsieve',
+        'PIL',
         'beautifulsoup4',
         'html.parser',
         'alembic',
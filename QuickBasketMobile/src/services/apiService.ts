@@ -28,6 +28,20 @@ export interface GroceryItem {
   checked: boolean;
 }
 
+// One write in a batch; recipe_id may be "$<n>" for the recipe added by operation n
+export type BatchOperation =
+  | { op: 'delete_recipe'; recipe_id: number | string }
+  | { op: 'add_recipe_manual'; name: string; ingredients: string[]; instructions?: string }
+  | { op: 'update_ingredient'; recipe_id: number | string; old_ingredient: string; new_ingredient: string }
+  | { op: 'update_grocery_item'; item_name: string; checked: boolean };
+
+export interface BatchResult {
+  committed: boolean;
+  failed?: number;
+  error?: string;
+  results: Array<{ op: string; status: number; error?: string; [key: string]: unknown }>;
+}
+
 // API Service Class
 class ApiService {
   // Recipe methods
@@ -110,6 +124,23 @@ class ApiService {
     }
   }
 
+  // Apply several writes in one request and one transaction: all of them or none.
+  // A rolled-back batch comes back with a 4xx status; it still resolves, with
+  // committed false and the failed operation in `failed` and `results`
+  async runBatch(operations: BatchOperation[]): Promise<BatchResult> {
+    try {
+      const response = await api.post('/api/batch', { operations });
+      return response.data;
+    } catch (error) {
+      const data = axios.isAxiosError(error) ? error.response?.data : undefined;
+      if (data && data.committed === false && Array.isArray(data.results)) {
+        return data as BatchResult;
+      }
+      console.error('Error applying batch:', error);
+      throw error;
+    }
+  }
+
   // Health check for backend connection
   async checkBackendHealth(): Promise<boolean> {
     try {
@@ -1,31 +1,287 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from recipe_scraper import RecipeScrapingService
-from models import init_db, get_session, Recipe
+import multiprocessing
+if __name__ == '__main__':
+    # Frozen builds start image workers by running this executable again
+    multiprocessing.freeze_support()
+
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context, g, abort, send_from_directory
+from recipe_scraper import canonicalize_url
+from async_scraper import AsyncRecipeScraper
+from extraction_memory import ExtractionMemory
+from recipe_io import export_lines, import_lines
+from backup import BackupScheduler, household_backups_from_env, manager_from_env, sqlite_path
+from image_store import THUMBNAIL_NAME_RE, pipeline_from_env
+from models import init_db, get_session, get_engine, Recipe, RecipeSummary, engine, households, current_household, UnknownHousehold, db_path
+from metrics import install_metrics, CACHE_LOOKUPS, RATE_LIMITED
+from read_cache import read_cache
+from streaming import LazyRows, cached_rows, configure_streaming, stream_page
+import rate_limit
+import batch_ops
+from rate_limit import AdmissionControl, limiter_from_env
+from query_profiler import install_query_profiler
+from log_setup import configure_logging, install_request_logging
+from request_profiler import format_report, install_request_profiler
+from sqlalchemy import or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import undefer_group
 from datetime import datetime
+from functools import wraps
+import math
 import os
 import secrets
 import sys
 import logging
+import threading
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Create Flask application
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(32)  # Secure secret key
-recipe_scraper = RecipeScrapingService()
+install_request_logging(app)  # First, so its request line covers everything below
+# Next, so its after_request runs late and the report sees the request's SQL counts
+request_profiler = install_request_profiler(app, is_admin=lambda: admin_refusal() is None)
+install_query_profiler(app, Engine)  # Every engine, household databases included
+install_metrics(app)
+configure_streaming(app)
+recipe_scraper = AsyncRecipeScraper(
+    breaker_failure_threshold=int(os.environ.get('SCRAPER_BREAKER_FAILURES', 5)),
+    breaker_recovery_timeout=float(os.environ.get('SCRAPER_BREAKER_RESET_SECONDS', 60)),
+    negative_cache_ttl=float(os.environ.get('SCRAPER_NEGATIVE_CACHE_TTL', 600)),
+    max_page_bytes=int(os.environ.get('SCRAPER_MAX_PAGE_BYTES', 5 * 1024 * 1024)),
+    max_connections=int(os.environ.get('SCRAPER_MAX_CONNECTIONS', 100)),
+    max_connections_per_host=int(os.environ.get('SCRAPER_MAX_CONNECTIONS_PER_HOST', 8)),
+    parse_workers=int(os.environ['SCRAPER_PARSE_WORKERS']) if os.environ.get('SCRAPER_PARSE_WORKERS') else None,
+    # Shared by every household: it is about recipe sites, not anyone's recipes
+    extraction_memory=ExtractionMemory(engine)
+)
+
+# Online backups of the SQLite database and every household's, on a schedule and on demand
+backup_db_path = sqlite_path(engine)
+backup_manager = manager_from_env(backup_db_path) if backup_db_path else None
+household_backups = household_backups_from_env(households.directory, backup_manager)
+backup_interval = float(os.environ.get('BACKUP_INTERVAL_HOURS', 24)) * 3600
+backup_scheduler = (BackupScheduler(backup_manager, backup_interval, households=household_backups)
+                    if (backup_manager or household_backups) and backup_interval > 0 else None)
+
+# Recipe photo thumbnails, made in worker processes after an import (see image_store.py)
+image_pipeline = pipeline_from_env(backup_db_path or db_path)
+
+@app.before_request
+def start_backup_scheduler():
+    # Started from a request rather than at import so each server process
+    # (not a preloading master) runs its own, after any fork
+    if backup_scheduler is not None:
+        backup_scheduler.start()
+
+HOUSEHOLD_COOKIE = 'household'
+
+@app.before_request
+def select_household():
+    """Route this request's database work to its household's database.
+    The household comes from the X-Household header (mobile app) or the
+    household cookie (browser); without one the main database is used.
+    Unknown households are refused unless HOUSEHOLD_AUTO_CREATE is on."""
+    household = request.headers.get('X-Household') or request.cookies.get(HOUSEHOLD_COOKIE)
+    if not household:
+        return None
+    try:
+        households.path(household)  # Validates the id
+        if not households.auto_create and not households.exists(household):
+            raise UnknownHousehold(household)
+    except ValueError:
+        return jsonify({'error': 'Invalid household id'}), 400
+    except UnknownHousehold:
+        return jsonify({'error': f'Unknown household: {household}'}), 404
+    g.household_token = current_household.set(household)
+    return None
+
+@app.teardown_request
+def reset_household(exc):
+    token = g.pop('household_token', None)
+    if token is not None:
+        current_household.reset(token)
+
+# Readiness: set once warm_up() has run, cleared again by the server while draining
+warm = threading.Event()
+draining = threading.Event()
+
+def admin_refusal():
+    """Why the current request may not use operator features, or None if it may.
+    With ADMIN_TOKEN set the request must carry it in X-Admin-Token; without
+    it only requests from this machine are allowed."""
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if admin_token:
+        if not secrets.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+            return 'Admin token required'
+    elif request.remote_addr not in ('127.0.0.1', '::1'):
+        return 'Admin endpoints are only available locally'
+    return None
+
+def admin_required(view):
+    """Restrict a view to operators (see admin_refusal)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        refusal = admin_refusal()
+        if refusal:
+            return jsonify({'error': refusal}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+# Scrapes are slow and hold a server thread each; writes are cheap but still shouldn't be spammed
+scrape_limiter = limiter_from_env('scrape', per_minute=10, burst=5, global_per_minute=120)
+write_limiter = limiter_from_env('write', per_minute=120, burst=30, global_per_minute=1200)
+scrape_admission = AdmissionControl(
+    'scrape',
+    max_in_flight=int(os.environ.get('MAX_INFLIGHT_SCRAPES', 4)),
+    max_queue_depth=int(os.environ['MAX_QUEUE_DEPTH']) if os.environ.get('MAX_QUEUE_DEPTH') else None,
+)
+
+def client_id():
+    """Who a request counts against; behind a proxy every request comes from the proxy"""
+    if os.environ.get('RATE_LIMIT_TRUST_PROXY', '').lower() in ('1', 'true', 'yes'):
+        return request.access_route[0]
+    return request.remote_addr or 'unknown'
+
+def _turned_away(status, message, retry_after, limit, reason):
+    RATE_LIMITED.inc(limit=limit, reason=reason)
+    seconds = max(1, math.ceil(retry_after))
+    if request.path.startswith('/api/') or request.is_json:
+        response = jsonify({'error': message, 'retry_after': seconds})
+    else:
+        response = Response(message, mimetype='text/plain')
+    response.status_code = status
+    response.headers['Retry-After'] = str(seconds)
+    return response
+
+def rate_limited(limiter, admission=None, cost=None):
+    """Apply a token bucket (and optionally admission control) to a view's writes.
+    GET requests, e.g. the forms themselves, are never limited. cost() gives
+    the tokens a request takes when it is more than one."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method in ('GET', 'HEAD') or not rate_limit.enabled():
+                return view(*args, **kwargs)
+            if admission is not None:
+                reason = admission.try_enter()
+                if reason:
+                    return _turned_away(503, 'The server is busy importing recipes, please try again shortly.',
+                                        admission.retry_after, admission.name, reason)
+            try:
+                scope, wait = limiter.check(client_id(), cost() if cost else 1.0)
+                if scope == 'client':
+                    return _turned_away(429, 'Too many requests, please slow down.', wait, limiter.name, 'client')
+                if scope == 'global':
+                    return _turned_away(503, 'The server is busy, please try again shortly.',
+                                        wait, limiter.name, 'global')
+                return view(*args, **kwargs)
+            finally:
+                if admission is not None:
+                    admission.leave()
+        return wrapper
+    return decorator
 
 # Add cache control for development to prevent browser caching issues
 @app.after_request
 def after_request(response):
     """Add cache control headers to prevent caching during development"""
-    if request.endpoint and 'static' not in request.endpoint:
+    if request.endpoint and 'static' not in request.endpoint and request.endpoint != 'recipe_thumbnail':
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
         response.headers['Pragma'] = 'no-cache'
         response.headers['Expires'] = '0'
     return response
 
+def capture_recipe_image(session, recipe):
+    """Start making a just-imported recipe's thumbnail; never fails the import"""
+    try:
+        image_pipeline.capture(session, recipe, current_household.get())
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Could not start image capture for recipe {recipe.id}: {e}")
+
+def find_existing_recipe(session, url):
+    """Look up a recipe already imported from url (or any variant of it).
+    Returns (recipe_or_None, canonical_url); the lookup is a single probe of
+    the unique canonical_url index and never touches the network."""
+    canonical_url = canonicalize_url(url)
+    if not canonical_url:
+        return None, None
+    recipe = session.query(Recipe).filter_by(canonical_url=canonical_url).first()
+    CACHE_LOOKUPS.inc(cache='canonical_url', result='hit' if recipe else 'miss')
+    return recipe, canonical_url
+
+def _load_recipe_dicts():
+    session = get_session()
+    try:
+        return [recipe.to_dict() for recipe in session.query(Recipe).options(undefer_group('body'))]
+    finally:
+        session.close()
+
+# Rows fetched per round trip when a page streams off a server-side cursor
+STREAM_BATCH_ROWS = 500
+
+def _iter_recipe_summaries(session):
+    """Every recipe as a RecipeSummary, read off a server-side cursor without the bodies.
+    Takes the session from the view (see _streamed_rows) and closes it."""
+    try:
+        rows = session.execute(select(*RecipeSummary.COLUMNS).execution_options(yield_per=STREAM_BATCH_ROWS))
+        for row in rows:
+            yield RecipeSummary(*row)
+    finally:
+        session.close()
+
+def _iter_grocery_ingredients(session):
+    """Ingredients of recipes on the grocery list, case-insensitively deduplicated,
+    read off a server-side cursor. Takes the session from the view and closes it."""
+    try:
+        # Only show recipes that have been added to grocery list
+        rows = session.execute(
+            select(Recipe.ingredients)
+            .where(Recipe.last_added_to_grocery.isnot(None))
+            .execution_options(yield_per=STREAM_BATCH_ROWS)
+        )
+        seen = set()
+        for (ingredients,) in rows:
+            for item in (ingredients or '').split('\n'):
+                item_lower = item.lower()
+                if item_lower not in seen and item.strip():
+                    seen.add(item_lower)
+                    yield item.strip()
+    finally:
+        session.close()
+
+def _streamed_rows(key, iter_rows):
+    """cached_rows() for the current household's database. The engine and session
+    are picked here in the view: a streamed body is read after teardown has
+    reset current_household, when get_session() would give the main database."""
+    session = get_session()
+    return cached_rows(get_engine(), key, lambda: iter_rows(session), app.config['STREAM_CACHE_ROWS'])
+
+def _load_grocery_items():
+    """Every ingredient across all recipes, as the mobile app's grocery list"""
+    session = get_session()
+    try:
+        grocery_items = {}
+        for (ingredients,) in session.query(Recipe.ingredients):
+            for ingredient in (ingredients or '').split('\n'):
+                ingredient = ingredient.strip()
+                if ingredient and ingredient not in grocery_items:
+                    grocery_items[ingredient] = False  # Not checked by default
+
+        # Convert to list format expected by mobile app
+        grocery_list = [{'name': item, 'checked': checked} for item, checked in grocery_items.items()]
+        grocery_list.sort(key=lambda x: x['name'].lower())
+        return grocery_list
+    finally:
+        session.close()
+
+def cached_recipes():
+    """All recipes as dicts; shared between requests until the database changes"""
+    return read_cache.get(get_engine(), 'recipes', _load_recipe_dicts)
+
 try:
     # Initialize database
     init_db()
@@ -37,15 +293,15 @@ except Exception as e:
 @app.route('/')
 @app.route('/recipes/')
 def recipes():
-    session = get_session()
-    try:
-        recipes_list = session.query(Recipe).all()
-        recipes_data = [recipe.to_dict() for recipe in recipes_list]
-        return render_template('recipes.html', recipes=recipes_data)
-    finally:
-        session.close()
+    # Ingredients are fetched from /api/recipes/<id> when a recipe's details are opened
+    if not app.config['STREAM_PAGES']:
+        summaries = read_cache.get(get_engine(), 'recipe_summaries',
+                                   lambda: list(_iter_recipe_summaries(get_session())))
+        return render_template('recipes.html', recipes=summaries)
+    return stream_page('recipes.html', recipes=LazyRows(_streamed_rows('recipe_summaries', _iter_recipe_summaries)))
 
 @app.route('/add-to-grocery-list', methods=['POST'])
+@rate_limited(write_limiter)
 def add_to_grocery_list():
     session = get_session()
     try:
@@ -58,11 +314,10 @@ def add_to_grocery_list():
         # Format the date as MM-DD-YYYY for display
         formatted_date = current_time.strftime('%m-%d-%Y')
         
-        for recipe_id in recipe_ids:
-            recipe = session.query(Recipe).filter_by(id=recipe_id).first()
-            if recipe:
-                recipe.last_added_to_grocery = current_time
-        
+        # One UPDATE for all selected recipes instead of a lookup per id
+        session.query(Recipe).filter(Recipe.id.in_(recipe_ids)).update(
+            {Recipe.last_added_to_grocery: current_time}, synchronize_session=False
+        )
         session.commit()
         return jsonify({
             'status': 'success',
@@ -74,6 +329,7 @@ def add_to_grocery_list():
         session.close()
 
 @app.route('/clear-grocery-list', methods=['POST'])
+@rate_limited(write_limiter)
 def clear_grocery_list():
     session = get_session()
     try:
@@ -90,39 +346,20 @@ def clear_grocery_list():
 @app.route('/grocery_list/')
 @app.route('/grocery_list')  # Handle both with and without trailing slash
 def grocery_list():
-    session = get_session()
     try:
-        recipe_ids = request.args.get('recipe_ids', '')
-        ingredients_list = []
-        
-        # Only show recipes that have been added to grocery list
-        recipes = session.query(Recipe).filter(Recipe.last_added_to_grocery.isnot(None)).all()
-        
-        # Extract ingredients from each recipe
-        for recipe in recipes:
-            if recipe.ingredients:
-                ingredients_list.extend(recipe.ingredients.split('\n'))
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_ingredients = []
-        for item in ingredients_list:
-            item_lower = item.lower()
-            if item_lower not in seen and item.strip():
-                seen.add(item_lower)
-                unique_ingredients.append(item.strip())
-        
-        return render_template('grocery_list.html', 
-                            ingredients=unique_ingredients,
-                            selected_recipes=recipes)
+        if app.config['STREAM_PAGES']:
+            rows = _streamed_rows('grocery_list', _iter_grocery_ingredients)
+            return stream_page('grocery_list.html', ingredients=LazyRows(rows))
+        unique_ingredients = read_cache.get(get_engine(), 'grocery_list',
+                                            lambda: list(_iter_grocery_ingredients(get_session())))
+        return render_template('grocery_list.html', ingredients=unique_ingredients)
     except Exception as e:
         logger.error(f"Error generating grocery list: {e}")
         flash('Error generating grocery list.', 'error')
         return redirect(url_for('recipes'))
-    finally:
-        session.close()
 
 @app.route('/delete-recipes', methods=['POST'])
+@rate_limited(write_limiter)
 def delete_recipes():
     session = get_session()
     try:
@@ -150,6 +387,7 @@ def delete_recipes():
 
 
 @app.route('/add-recipe-url', methods=['GET', 'POST'])
+@rate_limited(scrape_limiter, scrape_admission)
 def add_recipe_url():
     if request.method == 'POST':
         url = request.form.get('recipe_url')
@@ -157,37 +395,55 @@ def add_recipe_url():
             flash('Please enter a recipe URL', 'error')
             return redirect(url_for('add_recipe_url'))
         
-        # Attempt to scrape the recipe
-        recipe_data, error = recipe_scraper.scrape_recipe(url)
-        
-        if recipe_data:
-            try:
-                # Format the recipe data
-                formatted_recipe = recipe_scraper.format_recipe(recipe_data)
-                
-                # Create new recipe in database
-                session = get_session()
-                new_recipe = Recipe(
-                    title=formatted_recipe['title'],
-                    ingredients=formatted_recipe['ingredients'],
-                    instructions=formatted_recipe.get('instructions', ''),
-                    source_url=url  # Use the original URL directly
-                )
-                session.add(new_recipe)
-                session.commit()
-                
-                flash('Recipe successfully imported!', 'success')
+        session = get_session()
+        try:
+            # Skip the scrape entirely if this page is already in the library
+            existing_recipe, canonical_url = find_existing_recipe(session, url)
+            if existing_recipe:
+                flash(f'"{existing_recipe.title}" is already in your recipes.', 'success')
                 return redirect(url_for('recipes'))
-            except Exception as e:
-                flash(f'Error saving recipe: {str(e)}', 'error')
+            
+            # Attempt to scrape the recipe
+            recipe_data, error = recipe_scraper.scrape_recipe(url)
+            
+            if recipe_data:
+                try:
+                    # Format the recipe data
+                    formatted_recipe = recipe_scraper.format_recipe(recipe_data)
+                    
+                    # Create new recipe in database
+                    new_recipe = Recipe(
+                        title=formatted_recipe['title'],
+                        ingredients=formatted_recipe['ingredients'],
+                        instructions=formatted_recipe.get('instructions', ''),
+                        source_url=url,  # Use the original URL directly
+                        canonical_url=canonical_url,
+                        image_url=formatted_recipe.get('image_url')
+                    )
+                    session.add(new_recipe)
+                    session.commit()
+                    capture_recipe_image(session, new_recipe)
+                    
+                    flash('Recipe successfully imported!', 'success')
+                    return redirect(url_for('recipes'))
+                except IntegrityError:
+                    # Another request imported the same page while we were scraping
+                    session.rollback()
+                    flash('Recipe is already in your recipes.', 'success')
+                    return redirect(url_for('recipes'))
+                except Exception as e:
+                    flash(f'Error saving recipe: {str(e)}', 'error')
+                    return redirect(url_for('add_recipe_url'))
+            else:
+                flash(f'Unable to extract recipe: {error}', 'error')
                 return redirect(url_for('add_recipe_url'))
-        else:
-            flash(f'Unable to extract recipe: {error}', 'error')
-            return redirect(url_for('add_recipe_url'))
+        finally:
+            session.close()
             
     return render_template('add_recipe_url.html')
 
 @app.route('/add-recipe-manual', methods=['GET', 'POST'])
+@rate_limited(write_limiter)
 def add_recipe_manual():
     if request.method == 'POST':
         try:
@@ -222,52 +478,117 @@ def serve_manifest():
     """Serve PWA manifest file"""
     return app.send_static_file('manifest.json')
 
+@app.route('/images/<name>')
+def recipe_thumbnail(name):
+    """A recipe photo thumbnail. Named by its content hash, so it never changes and is cached for good"""
+    match = THUMBNAIL_NAME_RE.match(name)
+    if not match:
+        abort(404)
+    image_hash = match.group(1)
+    response = send_from_directory(image_pipeline.store.directory, image_pipeline.store.relative_path(image_hash),
+                                   mimetype='image/jpeg', etag=image_hash, max_age=365 * 24 * 3600)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for mobile app connectivity"""
     return jsonify({'status': 'healthy', 'timestamp': datetime.utcnow().isoformat()})
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once warmed up, 503 while starting or draining"""
+    if draining.is_set():
+        return jsonify({'status': 'draining'}), 503
+    if not warm.is_set():
+        return jsonify({'status': 'starting'}), 503
+    return jsonify({'status': 'ready'})
+
 @app.route('/api/recipes', methods=['GET'])
 @app.route('/recipes', methods=['GET'])
 def api_recipes():
     """API endpoint to get all recipes in JSON format"""
     # Check if request expects JSON (from mobile app)
     if request.headers.get('Content-Type') == 'application/json' or request.args.get('format') == 'json':
-        session = get_session()
         try:
-            recipes_list = session.query(Recipe).all()
-            recipes_data = [recipe.to_dict() for recipe in recipes_list]
-            return jsonify({'recipes': recipes_data})
+            return jsonify({'recipes': cached_recipes()})
         except Exception as e:
             logger.error(f"Error fetching recipes API: {e}")
             return jsonify({'error': str(e)}), 500
-        finally:
-            session.close()
     else:
         # Original web interface behavior
-        session = get_session()
-        try:
-            recipes_list = session.query(Recipe).all()
-            recipes_data = [recipe.to_dict() for recipe in recipes_list]
-            return render_template('recipes.html', recipes=recipes_data)
-        finally:
-            session.close()
+        return recipes()
+
+@app.route('/api/export', methods=['GET'])
+def api_export():
+    """Stream the whole recipe library as NDJSON, one recipe per line"""
+    filename = f"quickbasket-recipes-{datetime.utcnow():%Y%m%d}.ndjson"
+    return Response(
+        stream_with_context(export_lines(get_engine())),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/api/import', methods=['POST'])
+@rate_limited(write_limiter)
+def api_import():
+    """Add recipes from an NDJSON body (or an uploaded file), skipping known URLs"""
+    upload = request.files.get('file')
+    lines = upload.stream if upload else request.stream
+    try:
+        chunk_size = max(1, int(request.args.get('chunk_size', 1000)))
+    except ValueError:
+        return jsonify({'error': 'chunk_size must be a number'}), 400
+    try:
+        report = import_lines(get_engine(), lines, chunk_size=chunk_size)
+    except Exception as e:
+        logger.error(f"Error importing recipes: {e}")
+        return jsonify({'error': 'Import failed; recipes from earlier chunks were kept'}), 500
+    logger.info(f"Imported {report.inserted} recipes ({report.duplicates} duplicates, "
+                f"{report.error_count} bad lines) at {report.rows_per_second:.0f} rows/s")
+    return jsonify(report.to_dict())
+
+@app.route('/api/recipes/<int:recipe_id>', methods=['GET'])
+def api_recipe(recipe_id):
+    """One recipe with its ingredients and instructions"""
+    session = get_session()
+    try:
+        recipe = session.get(Recipe, recipe_id, options=[undefer_group('body')])
+        if recipe is None:
+            return jsonify({'error': 'Recipe not found'}), 404
+        return jsonify(recipe.to_dict())
+    finally:
+        session.close()
+
+@app.route('/api/recipes/search', methods=['GET'])
+def api_search_recipes():
+    """Ids of the recipes whose title or ingredients contain q (case-insensitive)"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'ids': []})
+    pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    session = get_session()
+    try:
+        ids = session.scalars(select(Recipe.id).where(or_(
+            Recipe.title.ilike(pattern, escape='\\'),
+            Recipe.ingredients.ilike(pattern, escape='\\'),
+        ))).all()
+        return jsonify({'ids': ids})
+    finally:
+        session.close()
 
 @app.route('/api/recipes/<int:recipe_id>', methods=['DELETE'])
 @app.route('/delete_recipe/<int:recipe_id>', methods=['DELETE', 'POST'])
+@rate_limited(write_limiter)
 def api_delete_recipe(recipe_id):
     """API endpoint to delete a recipe"""
     session = get_session()
     try:
-        recipe = session.query(Recipe).filter_by(id=recipe_id).first()
-        if not recipe:
-            return jsonify({'error': 'Recipe not found'}), 404
-        
-        recipe_name = recipe.name
-        session.delete(recipe)
+        status, result = batch_ops.delete_recipe(session, {'recipe_id': recipe_id})
         session.commit()
-        
-        return jsonify({'message': f'Recipe "{recipe_name}" deleted successfully'})
+        return jsonify(result), status
+    except batch_ops.OperationError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
         logger.error(f"Error deleting recipe API: {e}")
         session.rollback()
@@ -277,6 +598,7 @@ def api_delete_recipe(recipe_id):
 
 @app.route('/api/recipes/url', methods=['POST'])
 @app.route('/add_recipe_url', methods=['POST'])
+@rate_limited(scrape_limiter, scrape_admission)
 def api_add_recipe_url():
     """API endpoint to add recipe from URL"""
     if request.method == 'POST':
@@ -297,9 +619,21 @@ def api_add_recipe_url():
                     flash(error_msg, 'error')
                     return redirect(url_for('add_recipe_url'))
             
+            # Known URLs return the stored recipe without any network I/O
+            existing_recipe, canonical_url = find_existing_recipe(session, url)
+            if existing_recipe:
+                if request.is_json:
+                    return jsonify(existing_recipe.to_dict()), 200
+                else:
+                    flash(f'"{existing_recipe.title}" is already in your recipes.', 'success')
+                    return redirect(url_for('recipes'))
+            
             # Extract recipe using the scraping service
             try:
-                recipe_data = recipe_scraper.scrape_recipe(url)
+                recipe_data, error = recipe_scraper.scrape_recipe(url)
+                if not recipe_data:
+                    raise ValueError(error)
+                recipe_data = recipe_scraper.format_recipe(recipe_data)
             except Exception as scrape_error:
                 error_msg = f'Failed to extract recipe from URL: {str(scrape_error)}'
                 logger.error(f"Scraping error for URL {url}: {scrape_error}")
@@ -314,12 +648,28 @@ def api_add_recipe_url():
                 title=recipe_data['title'],
                 ingredients=recipe_data['ingredients'],
                 instructions=recipe_data.get('instructions', ''),
-                source_url=url
+                source_url=url,
+                canonical_url=canonical_url,
+                image_url=recipe_data.get('image_url')
             )
             
             session.add(new_recipe)
-            session.commit()
+            try:
+                session.commit()
+            except IntegrityError:
+                # Lost a race with a concurrent import of the same page
+                session.rollback()
+                new_recipe, _ = find_existing_recipe(session, url)
+                if new_recipe is None:
+                    # Not that race: some other constraint failed, which the handler below reports
+                    raise
+                if request.is_json:
+                    return jsonify(new_recipe.to_dict()), 200
+                else:
+                    flash('Recipe is already in your recipes.', 'success')
+                    return redirect(url_for('recipes'))
             
+            capture_recipe_image(session, new_recipe)
             recipe_dict = new_recipe.to_dict()
             
             if request.is_json:
@@ -342,6 +692,7 @@ def api_add_recipe_url():
 
 @app.route('/api/recipes/manual', methods=['POST'])
 @app.route('/add_recipe_manual', methods=['POST'])
+@rate_limited(write_limiter)
 def api_add_recipe_manual():
     """API endpoint to add recipe manually"""
     if request.method == 'POST':
@@ -350,51 +701,27 @@ def api_add_recipe_manual():
             # Handle both JSON (mobile) and form data (web)
             if request.is_json:
                 data = request.get_json()
-                name = data.get('name', '').strip()
-                ingredients = data.get('ingredients', [])
-                instructions = data.get('instructions', '').strip()
             else:
-                name = request.form.get('recipe_name', '').strip()
-                ingredients_text = request.form.get('ingredients', '').strip()
-                instructions = request.form.get('instructions', '').strip()
-                
-                # Parse ingredients from text (split by newlines)
-                ingredients = [ing.strip() for ing in ingredients_text.split('\n') if ing.strip()]
-            
-            if not name:
-                error_msg = 'Recipe name is required'
-                if request.is_json:
-                    return jsonify({'error': error_msg}), 400
-                else:
-                    flash(error_msg, 'error')
-                    return redirect(url_for('add_recipe_manual'))
-            
-            if not ingredients:
-                error_msg = 'At least one ingredient is required'
-                if request.is_json:
-                    return jsonify({'error': error_msg}), 400
-                else:
-                    flash(error_msg, 'error')
-                    return redirect(url_for('add_recipe_manual'))
-            
-            # Create and save recipe
-            new_recipe = Recipe(
-                title=name,
-                ingredients=ingredients,
-                instructions=instructions or ''
-            )
-            
-            session.add(new_recipe)
+                data = {
+                    'name': request.form.get('recipe_name', ''),
+                    'ingredients': request.form.get('ingredients', ''),
+                    'instructions': request.form.get('instructions', ''),
+                }
+            status, recipe_dict = batch_ops.add_recipe_manual(session, data)
             session.commit()
             
-            recipe_dict = new_recipe.to_dict()
-            
             if request.is_json:
-                return jsonify(recipe_dict), 201
+                return jsonify(recipe_dict), status
             else:
                 flash('Recipe added successfully!', 'success')
                 return redirect(url_for('recipes'))
                 
+        except batch_ops.OperationError as e:
+            if request.is_json:
+                return jsonify({'error': e.message}), e.status
+            else:
+                flash(e.message, 'error')
+                return redirect(url_for('add_recipe_manual'))
         except Exception as e:
             session.rollback()
             error_msg = f'Error saving recipe: {str(e)}'
@@ -413,28 +740,11 @@ def api_grocery_list():
     """API endpoint to get grocery list in JSON format"""
     # Check if request expects JSON (from mobile app)
     if request.headers.get('Content-Type') == 'application/json' or request.args.get('format') == 'json':
-        session = get_session()
         try:
-            recipes = session.query(Recipe).all()
-            
-            # Generate grocery list from all recipes
-            grocery_items = {}
-            for recipe in recipes:
-                for ingredient in recipe.ingredients:
-                    ingredient = ingredient.strip()
-                    if ingredient and ingredient not in grocery_items:
-                        grocery_items[ingredient] = False  # Not checked by default
-            
-            # Convert to list format expected by mobile app
-            grocery_list = [{'name': item, 'checked': checked} for item, checked in grocery_items.items()]
-            grocery_list.sort(key=lambda x: x['name'].lower())
-            
-            return jsonify({'grocery_list': grocery_list})
+            return jsonify({'grocery_list': read_cache.get(get_engine(), 'grocery_items', _load_grocery_items)})
         except Exception as e:
             logger.error(f"Error fetching grocery list API: {e}")
             return jsonify({'error': str(e)}), 500
-        finally:
-            session.close()
     else:
         # Original web interface behavior
         session = get_session()
@@ -446,63 +756,39 @@ def api_grocery_list():
 
 @app.route('/api/grocery-list/update', methods=['POST'])
 @app.route('/update_grocery_item', methods=['POST'])
+@rate_limited(write_limiter)
 def api_update_grocery_item():
     """API endpoint to update grocery item checked status"""
     try:
         if request.is_json:
             data = request.get_json()
-            item_name = data.get('item_name', '').strip()
-            checked = data.get('checked', False)
         else:
-            item_name = request.form.get('item_name', '').strip()
-            checked = request.form.get('checked') == 'true'
+            data = {'item_name': request.form.get('item_name', ''), 'checked': request.form.get('checked') == 'true'}
         
-        if not item_name:
-            return jsonify({'error': 'Item name is required'}), 400
-        
-        # For now, just return success (in a full implementation, you might store checked states in database)
         # The mobile app handles state locally, this endpoint maintains compatibility
-        return jsonify({'message': 'Item updated successfully', 'item': item_name, 'checked': checked})
+        status, result = batch_ops.update_grocery_item(None, data)
+        return jsonify(result), status
         
+    except batch_ops.OperationError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
         logger.error(f"Error updating grocery item: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ingredients/update', methods=['POST'])
 @app.route('/update_ingredient', methods=['POST'])
+@rate_limited(write_limiter)
 def api_update_ingredient():
     """API endpoint to update recipe ingredient"""
     session = get_session()
     try:
-        if request.is_json:
-            data = request.get_json()
-            recipe_id = data.get('recipe_id')
-            old_ingredient = data.get('old_ingredient', '').strip()
-            new_ingredient = data.get('new_ingredient', '').strip()
-        else:
-            recipe_id = request.form.get('recipe_id')
-            old_ingredient = request.form.get('old_ingredient', '').strip()
-            new_ingredient = request.form.get('new_ingredient', '').strip()
-        
-        if not all([recipe_id, old_ingredient, new_ingredient]):
-            return jsonify({'error': 'Recipe ID, old ingredient, and new ingredient are required'}), 400
-        
-        recipe = session.query(Recipe).filter_by(id=recipe_id).first()
-        if not recipe:
-            return jsonify({'error': 'Recipe not found'}), 404
-        
-        # Update ingredient in the list
-        ingredients = recipe.ingredients.copy()
-        if old_ingredient in ingredients:
-            index = ingredients.index(old_ingredient)
-            ingredients[index] = new_ingredient
-            recipe.ingredients = ingredients
-            session.commit()
-            
-            return jsonify({'message': 'Ingredient updated successfully'})
-        else:
-            return jsonify({'error': 'Ingredient not found in recipe'}), 404
+        data = request.get_json() if request.is_json else request.form.to_dict()
+        status, result = batch_ops.update_ingredient(session, data)
+        session.commit()
+        return jsonify(result), status
             
+    except batch_ops.OperationError as e:
+        return jsonify({'error': e.message}), e.status
     except Exception as e:
         logger.error(f"Error updating ingredient: {e}")
         session.rollback()
@@ -510,51 +796,207 @@ def api_update_ingredient():
     finally:
         session.close()
 
+def batch_cost():
+    """A batch pays for each of its writes, so batching can't get around the write limit"""
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list):
+        return 1.0
+    return float(max(1, min(len(operations), batch_ops.BATCH_MAX_OPERATIONS)))
+
+@app.route('/api/batch', methods=['POST'])
+@rate_limited(write_limiter, cost=batch_cost)
+def api_batch():
+    """Apply an ordered list of recipe and grocery list writes in one transaction"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object with an operations list'}), 400
+    session = get_session()
+    try:
+        status, result = batch_ops.run_batch(session, data.get('operations'))
+        return jsonify(result), status
+    except Exception as e:
+        logger.error(f"Error applying batch: {e}")
+        session.rollback()
+        return jsonify({'committed': False, 'error': str(e)}), 500
+    finally:
+        session.close()
+
+@app.route('/admin/scraper/breakers', methods=['GET'])
+@admin_required
+def admin_scraper_breakers():
+    """Per-host circuit breaker state, the negative URL cache and scrape coalescing"""
+    return jsonify({
+        'breakers': recipe_scraper.breakers.snapshot(),
+        'negative_cache': recipe_scraper.negative_cache.snapshot(),
+        'flights': recipe_scraper.flights.snapshot()
+    })
+
+@app.route('/admin/scraper/breakers/reset', methods=['POST'])
+@admin_required
+def admin_reset_scraper_breakers():
+    """Close one host's breaker (or all of them) and forget cached failures"""
+    data = request.get_json(silent=True) or {}
+    host = data.get('host') or request.form.get('host')
+    recipe_scraper.breakers.reset(host)
+    if not host:
+        recipe_scraper.negative_cache.clear()
+    return jsonify({'message': f'Reset circuit breaker for {host}' if host else 'Reset all circuit breakers'})
+
+@app.route('/admin/scraper/extraction', methods=['GET'])
+@admin_required
+def admin_scraper_extraction():
+    """Per-host extraction strategy stats, in the order each host's pages are tried"""
+    return jsonify({'hosts': recipe_scraper.extraction_memory.snapshot(request.args.get('host'))})
+
+@app.route('/admin/scraper/extraction/reset', methods=['POST'])
+@admin_required
+def admin_reset_scraper_extraction():
+    """Forget what worked on one host (or every host), e.g. after a site redesign"""
+    data = request.get_json(silent=True) or {}
+    host = data.get('host') or request.form.get('host')
+    recipe_scraper.extraction_memory.forget(host)
+    return jsonify({'message': f'Reset extraction stats for {host}' if host else 'Reset all extraction stats'})
+
+@app.route('/household/', defaults={'household_id': None})
+@app.route('/household/<household_id>')
+def switch_household(household_id):
+    """Use a household's own recipes and grocery list in this browser (no id: the shared ones)"""
+    response = redirect(url_for('recipes'))
+    if household_id is None:
+        response.delete_cookie(HOUSEHOLD_COOKIE)
+        return response
+    try:
+        known = households.exists(household_id) or households.auto_create
+    except ValueError:
+        flash('Household names can only use letters, numbers, - and _.', 'error')
+        return response
+    except UnknownHousehold:
+        known = False
+    if not known:
+        # An operator makes households (POST /admin/households); a cookie for
+        # one that doesn't exist would only get every request refused
+        flash(f'There is no household called {household_id}.', 'error')
+        return response
+    response.set_cookie(HOUSEHOLD_COOKIE, household_id, max_age=365 * 24 * 3600, samesite='Lax')
+    return response
+
+@app.route('/admin/households', methods=['GET'])
+@admin_required
+def admin_households():
+    """Households with a database, and household engine cache statistics"""
+    return jsonify({'households': households.ids(), **households.snapshot()})
+
+@app.route('/admin/households', methods=['POST'])
+@admin_required
+def admin_create_household():
+    """Make a household's database, so its members can switch to it"""
+    data = request.get_json(silent=True) or {}
+    household_id = data.get('id') or request.form.get('id') or ''
+    if not households.enabled:
+        return jsonify({'error': 'Households need HOUSEHOLD_DB_DIR with a server database'}), 501
+    try:
+        created = households.create(household_id)
+    except ValueError:
+        return jsonify({'error': 'Invalid household id'}), 400
+    if not created:
+        return jsonify({'message': f'Household {household_id} already exists'}), 200
+    logger.info(f"Created household {household_id}")
+    return jsonify({'message': f'Created household {household_id}'}), 201
+
+@app.route('/admin/read-cache', methods=['GET'])
+@admin_required
+def admin_read_cache():
+    """Read cache statistics for this worker"""
+    return jsonify(read_cache.snapshot())
+
+@app.route('/admin/limits', methods=['GET'])
+@admin_required
+def admin_limits():
+    """Rate limiter and admission control state for this worker"""
+    return jsonify({
+        'enabled': rate_limit.enabled(),
+        'scrape': scrape_limiter.snapshot(),
+        'write': write_limiter.snapshot(),
+        'scrape_admission': scrape_admission.snapshot(),
+    })
+
+@app.route('/admin/profiles', methods=['GET'])
+@admin_required
+def admin_profiles():
+    """Request profiles kept by this worker, newest first (on demand and slow captures)"""
+    return jsonify({
+        'slow_ms': app.config['PROFILE_SLOW_MS'],
+        'slow_sample_rate': app.config['PROFILE_SLOW_SAMPLE_RATE'],
+        'profiles': request_profiler.reports(),
+    })
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+@admin_required
+def admin_profile(profile_id):
+    """One request profile; ?format=text for a pstats-like listing"""
+    report = request_profiler.get(profile_id)
+    if report is None:
+        return jsonify({'error': 'Profile not found (reports are per worker and only the latest are kept)'}), 404
+    if request.args.get('format') == 'text':
+        return Response(format_report(report), mimetype='text/plain')
+    return jsonify(report)
+
+@app.route('/admin/backup', methods=['POST'])
+@admin_required
+def admin_start_backup():
+    """Start an online backup of the database and every household's; poll GET /admin/backup for progress"""
+    if backup_manager is None and household_backups is None:
+        return jsonify({'error': 'Online backups need a SQLite database'}), 501
+    started = backup_manager.start() if backup_manager else False
+    started = (household_backups.start() if household_backups else False) or started
+    if not started:
+        return jsonify({'message': 'A backup is already running', **backup_status()}), 409
+    return jsonify(backup_status()), 202, {'Location': url_for('admin_backup_status')}
+
+@app.route('/admin/backup', methods=['GET'])
+@admin_required
+def admin_backup_status():
+    """Progress of the current or last backup, and the snapshots on disk"""
+    if backup_manager is None and household_backups is None:
+        return jsonify({'error': 'Online backups need a SQLite database'}), 501
+    return jsonify(backup_status())
+
+def backup_status():
+    status = backup_manager.status() if backup_manager else {}
+    if household_backups is not None:
+        status['households'] = household_backups.status()
+    return status
+
 @app.route('/pwa-debug/')
 def pwa_debug():
     """PWA installation debug page"""
     return render_template('pwa_debug.html')
 
 
+def warm_up():
+    """Compile templates and open a DB connection before taking traffic"""
+    try:
+        for template in app.jinja_env.list_templates(extensions=['html']):
+            app.jinja_env.get_template(template)
+        session = get_session()
+        try:
+            session.query(Recipe.id).first()
+        finally:
+            session.close()
+        warm.set()
+        logger.info("Warm-up complete, ready for traffic")
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+
+warm_up()
+
 if __name__ == '__main__':
     try:
-        port = int(os.environ.get('PORT', 5000))
-        
-        # Always use Waitress WSGI server (production-grade)
-        import threading
-        import webbrowser
-        import time
-        from waitress import serve
-        
-        print("=" * 60)
-        print("🍽️  QuickBasket - Production Server")
-        print("=" * 60)
-        print(f"Server: Waitress WSGI Server")
-        print(f"Local: http://127.0.0.1:{port}")
-        print(f"Network: http://192.168.1.17:{port} (for tablets)")
-        print("=" * 60)
-        print("✅ Progressive Web App - Installable on tablets")
-        print("✅ Web scraping - Import recipes from URLs")
-        print("✅ Offline support - Service worker caching")
-        print("=" * 60)
-        
-        # Detect if running in cloud environment (no browser opening)
-        is_cloud = os.environ.get('DYNO') or os.environ.get('RAILWAY_ENVIRONMENT') or os.environ.get('RENDER')
-        
-        if not getattr(sys, 'frozen', False) and not is_cloud:
-            # Open browser automatically when run locally (not in cloud)
-            browser_thread = threading.Thread(
-                target=lambda: (time.sleep(2), webbrowser.open(f'http://127.0.0.1:{port}'))
-            )
-            browser_thread.daemon = True
-            browser_thread.start()
-        
-        # Start Waitress server
-        host = '0.0.0.0'  # Bind to all interfaces for cloud hosting
-        logger.info(f"Starting Waitress WSGI server on {host}:{port}")
-        print(f"Environment: {'Cloud' if is_cloud else 'Local'}")
-        serve(app, host=host, port=port, threads=6)
-            
+        # Let server.py's `import app` reuse this module instead of loading it twice
+        sys.modules.setdefault('app', sys.modules[__name__])
+        import server
+        server.main(open_browser=not getattr(sys, 'frozen', False) and not server._is_cloud())
     except Exception as e:
         logger.error(f"Error starting Flask application: {e}")
         if not os.environ.get('DYNO'):  # Don't wait for input in cloud
@@ -0,0 +1,310 @@
+"""
+Asyncio fetch layer for recipe imports.
+
+AsyncRecipeScraper behaves like RecipeScrapingService (circuit breakers,
+negative cache, streamed JSON-LD shortcut, extraction cascade) but fetches
+pages with one pooled aiohttp session on a background event loop:
+- connections are reused and capped in total and per host
+- every request has connect, read and total timeouts
+- HTML parsing runs in parse_workers worker processes, so pages are parsed
+  on other CPUs while the loop keeps fetching (parse_workers=0 parses on a
+  thread instead, which keeps the loop free but shares the GIL)
+
+A parse worker starts each page from the scraper's extraction memory for
+its host and sends back what it learned and its extraction metrics, so
+the memory and /metrics see every page as if it was parsed in-process.
+
+scrape_recipe(url) keeps its blocking signature for the Flask routes;
+scrape_many(urls) imports a batch of URLs concurrently.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+from extraction_memory import ExtractionMemory
+from metrics import REGISTRY, SCRAPE_EXTRACTIONS, EXTRACTION_ATTEMPTS
+from recipe_scraper import RecipeScrapingService, StreamedPage
+from single_flight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Same statuses the blocking session retries on
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 30.0
+
+# Counters extract_recipe updates, reported back from the parse workers
+PARSE_COUNTERS = {counter.name: counter for counter in (SCRAPE_EXTRACTIONS, EXTRACTION_ATTEMPTS)}
+
+_parse_service: Optional[RecipeScrapingService] = None
+
+
+def _init_parse_worker(site_extractors) -> None:
+    global _parse_service
+    # The parent adds this worker's counts to its own; a metrics file of ours would count them twice
+    REGISTRY.multiprocess_dir = None
+    # Ctrl-C is for the server, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _parse_service = RecipeScrapingService(site_extractors=site_extractors)
+
+
+def _counter_values() -> Dict[str, Dict[Tuple[str, ...], float]]:
+    return {name: {tuple(labels): value for labels, value in counter.dump()['samples']}
+            for name, counter in PARSE_COUNTERS.items()}
+
+
+def _parse_page(html: str, url: str, known: Dict, min_attempts: int):
+    """extract_recipe in a parse worker, starting from the parent's counts for the host.
+    Returns (result, extraction counts learned, counter increments)."""
+    memory = ExtractionMemory(min_attempts=min_attempts)
+    memory.seed(urlparse(url).hostname or '', known)
+    _parse_service.extraction_memory = memory
+    before = _counter_values()
+    result = _parse_service.extract_recipe(html, url)
+    increments = []
+    for name, values in _counter_values().items():
+        for key, value in values.items():
+            if value != before[name].get(key, 0.0):
+                increments.append((name, key, value - before[name].get(key, 0.0)))
+    return result, memory.take_pending(), increments
+
+
+class AsyncRecipeScraper(RecipeScrapingService):
+    def __init__(self, *args, max_connections: int = 100, max_connections_per_host: int = 8,
+                 connect_timeout: float = 5.0, read_timeout: float = 10.0, total_timeout: float = 15.0,
+                 retries: int = 3, backoff_factor: float = 1.0, parse_workers: Optional[int] = None,
+                 **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout = aiohttp.ClientTimeout(total=total_timeout, sock_connect=connect_timeout,
+                                             sock_read=read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.parse_workers = parse_workers if parse_workers is not None else min(4, os.cpu_count() or 1)
+
+        # Started on first use, so a preloading server can fork before any thread exists
+        self._start_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        # Every caller, blocking API included, runs on the loop, so coalescing happens there
+        self.flights = AsyncSingleFlight('scrape')
+
+    # ----- blocking API -----
+
+    def scrape_recipe(self, url: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Scrape recipe information from a given URL.
+        Returns a tuple of (recipe_data, error_message), like RecipeScrapingService.
+        """
+        return self.run(self.scrape_recipe_async(url))
+
+    def scrape_many(self, urls: Iterable[str], concurrency: int = 10) -> List[Tuple[Optional[Dict], Optional[str]]]:
+        """Scrape several URLs at once; results are in the same order as urls"""
+        return self.run(self.scrape_many_async(list(urls), concurrency))
+
+    def run(self, coroutine):
+        """Run a coroutine on the scraper's event loop and wait for its result"""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Blocking scraper call from the scraper loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def close(self) -> None:
+        """Close pooled connections and stop the loop thread"""
+        with self._start_lock:
+            if self._loop is None or self._pid != os.getpid():
+                return
+            if self._http is not None:
+                asyncio.run_coroutine_threadsafe(self._http.close(), self._loop).result()
+                self._http = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown(wait=False)
+            self._loop = self._thread = self._parse_pool = None
+
+    # ----- coroutines (run on the scraper loop) -----
+
+    async def scrape_recipe_async(self, url: str) -> Tuple[Optional[Dict], Optional[str]]:
+        key = self.flight_key(url)
+        if key is None:
+            return await self._scrape_recipe_async(url)
+        return await self.flights.do(key, lambda: self._scrape_recipe_async(url))
+
+    async def _scrape_recipe_async(self, url: str) -> Tuple[Optional[Dict], Optional[str]]:
+        rejection, cache_key, breaker = self._admit(url)
+        if rejection:
+            return None, rejection
+
+        started = time.perf_counter()
+        recipe_data, error, outcome = await self._scrape_page_async(url)
+        return self._settle(cache_key, breaker, started, recipe_data, error, outcome)
+
+    async def scrape_many_async(self, urls: List[str], concurrency: int = 10) -> List[Tuple[Optional[Dict], Optional[str]]]:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def bounded(url):
+            async with semaphore:
+                return await self.scrape_recipe_async(url)
+
+        return await asyncio.gather(*(bounded(url) for url in urls))
+
+    async def _scrape_page_async(self, url: str) -> Tuple[Optional[Dict], Optional[str], str]:
+        """Async counterpart of _scrape_page, with the same outcome classification"""
+        try:
+            headers = self.request_headers()
+            try:
+                html, recipe_ld = await self._fetch_with_retries(url, headers)
+            except aiohttp.ClientSSLError:
+                logger.warning(f"SSL verification failed for {url}, attempting without verification")
+                html, recipe_ld = await self._fetch_with_retries(url, headers, verify=False)
+
+            extracted = None
+            if html is not None and not recipe_ld:
+                extracted = await self._extract_async(html, url)
+            return self.finish_page(html, recipe_ld, url, lambda html, url: extracted)
+
+        except asyncio.TimeoutError:
+            return None, "Request timed out. Please try again.", self.HOST_FAILURE
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"Error fetching URL {url}: {str(e)}")
+            error_msg = "Could not access the webpage. Please check the URL and try again."
+            # A missing page is the page's problem; auth walls, rate limits and 5xx are the host's
+            if e.status in (404, 410):
+                return None, error_msg, self.PAGE_FAILURE
+            return None, error_msg, self.HOST_FAILURE
+        except aiohttp.ClientError as e:
+            logger.error(f"Error fetching URL {url}: {str(e)}")
+            return None, "Could not access the webpage. Please check the URL and try again.", self.HOST_FAILURE
+        except Exception as e:
+            logger.error(f"Unexpected error scraping recipe from {url}: {str(e)}")
+            return None, "An unexpected error occurred while processing the recipe.", self.PAGE_FAILURE
+
+    async def _fetch_with_retries(self, url: str, headers: Dict, verify: bool = True) -> Tuple[Optional[str], Optional[Dict]]:
+        """Retry connection errors and retryable statuses with exponential backoff"""
+        attempt = 0
+        while True:
+            try:
+                return await self._fetch_page_async(url, headers, verify)
+            except aiohttp.ClientResponseError as e:
+                if e.status not in RETRY_STATUSES or attempt >= self.retries:
+                    raise
+                delay = self._retry_delay(attempt, e.headers.get('Retry-After') if e.headers else None)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.retries:
+                    raise
+                delay = self._retry_delay(attempt)
+            attempt += 1
+            logger.info(f"Retrying {url} in {delay:.1f}s (attempt {attempt} of {self.retries})")
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        delay = self.backoff_factor * (2 ** attempt)
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return min(delay, MAX_RETRY_AFTER)
+
+    async def _fetch_page_async(self, url: str, headers: Dict, verify: bool = True) -> Tuple[Optional[str], Optional[Dict]]:
+        """Stream a page like _fetch_page, stopping early once a recipe has arrived"""
+        session = self._session()
+        options = {} if verify else {'ssl': False}
+        async with session.get(url, headers=headers, **options) as response:
+            response.raise_for_status()
+
+            # Check content type before downloading anything
+            page = StreamedPage(self, url, response.headers.get('Content-Type', ''))
+            if not page.is_webpage:
+                return None, None
+
+            async for chunk in response.content.iter_chunked(self.FETCH_CHUNK_SIZE):
+                if page.feed(chunk):
+                    break
+        return page.finish()
+
+    async def _extract_async(self, html: str, url: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """extract_recipe off the loop: in a parse worker process, or on a thread without them"""
+        loop = asyncio.get_running_loop()
+        pool = self._parse_pool
+        if pool is None:
+            return await loop.run_in_executor(None, self.extract_recipe, html, url)
+
+        # Both may touch the extraction_stats table, so neither runs on the loop
+        memory = self.extraction_memory
+        known = await loop.run_in_executor(None, memory.known, urlparse(url).hostname or '')
+        try:
+            result, learned, increments = await loop.run_in_executor(
+                pool, _parse_page, html, url, known, memory.min_attempts)
+        except BrokenProcessPool:
+            # A worker died (out of memory, killed); later pages get a new pool
+            with self._start_lock:
+                if self._parse_pool is pool:
+                    self._parse_pool = self._new_parse_pool()
+            pool.shutdown(wait=False)
+            raise
+        await loop.run_in_executor(None, memory.merge, learned)
+        for name, key, amount in increments:
+            counter = PARSE_COUNTERS[name]
+            counter.inc(amount, **dict(zip(counter.labelnames, key)))
+        return result
+
+    # ----- loop and session management -----
+
+    def _session(self) -> aiohttp.ClientSession:
+        # Only ever touched from the loop thread, so no locking needed
+        if self._http is None or self._http.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                ttl_dns_cache=300,
+            )
+            self._http = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._http
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return self._loop
+
+            # First use, or first use in a forked worker where the parent's
+            # loop thread and sockets are not ours to use
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            thread = threading.Thread(target=self._run_loop, args=(loop, ready),
+                                      name='scraper-loop', daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop, self._thread, self._pid = loop, thread, os.getpid()
+            self._http = None
+            self.flights = AsyncSingleFlight('scrape')  # Futures belong to the old loop
+            self._parse_pool = self._new_parse_pool()
+            return loop
+
+    def _new_parse_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.parse_workers <= 0:
+            return None
+        # Not plain fork: the server process has threads (and their locks) a fork would copy
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        return ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=context,
+                                   initializer=_init_parse_worker, initargs=(self.site_extractors,))
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+QuickBasket Online Backups
+Hot snapshots of the SQLite database while the server keeps running.
+
+sqlite3.Connection.backup copies the database page by page. In WAL mode
+(the app default) the copy reads a snapshot and never blocks writers; with
+a rollback journal it copies a few hundred pages at a time and sleeps
+between steps, so a writer waits at most one small step instead of the
+whole copy. Snapshots are checked, gzipped and rotated; only the newest
+BACKUP_KEEP are kept.
+
+Household databases (see models.HouseholdEngines) are backed up the same
+way, each into its own households/<id>/ folder under the backup directory,
+on the same schedule as the main database.
+
+Settings (environment):
+    BACKUP_DIR             where snapshots go (default: backups/ next to the database)
+    BACKUP_KEEP            snapshots to keep (default 7)
+    BACKUP_INTERVAL_HOURS  run automatically this often; 0 disables (default 24)
+    BACKUP_PAGES_PER_STEP  pages copied per step (default 256, about 1 MB)
+
+Examples:
+    python backup.py                     # one snapshot of the app database (and each household's) now
+    python backup.py --db /tmp/capacity.db --dir /tmp/backups --keep 3
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PREFIX = 'recipes-'
+SNAPSHOT_SUFFIX = '.db.gz'
+
+
+class BackupInProgress(RuntimeError):
+    """Another backup of the same database is already running"""
+
+
+class _Restarted(Exception):
+    """Raised from the progress callback to abort a backup that SQLite restarted"""
+
+
+class _DirectoryLock:
+    """Cross-process lock file, so several gunicorn workers never back up at once"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.handle = None
+
+    def acquire(self) -> bool:
+        self.handle = open(self.path, 'a+')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self.handle.close()
+            self.handle = None
+            return False
+
+    def release(self) -> None:
+        if self.handle is not None:
+            self.handle.close()  # Closing the file drops the lock
+            self.handle = None
+
+
+class BackupManager:
+    """Takes, compresses and rotates snapshots of one SQLite database"""
+
+    def __init__(self, db_path: str, backup_dir: Optional[str] = None, keep: int = 7,
+                 pages_per_step: int = 256, step_sleep: float = 0.005, max_restarts: int = 3,
+                 compress_level: int = 6):
+        self.db_path = db_path
+        self.backup_dir = backup_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), 'backups')
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        # Writes from other connections restart the copy; after this many
+        # restarts it is done in one step instead
+        self.max_restarts = max_restarts
+        self.compress_level = compress_level
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._status: Dict = {'state': 'idle'}
+
+    def status(self) -> Dict:
+        with self._lock:
+            status = dict(self._status)
+        status['snapshots'] = [os.path.basename(path) for path in self.snapshots()]
+        return status
+
+    def _update(self, **fields) -> None:
+        with self._lock:
+            self._status.update(fields)
+
+    def snapshots(self) -> List[str]:
+        """Existing snapshot paths, newest first"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        names = [name for name in os.listdir(self.backup_dir)
+                 if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)]
+        return [os.path.join(self.backup_dir, name) for name in sorted(names, reverse=True)]
+
+    def last_backup_age(self) -> Optional[float]:
+        snapshots = self.snapshots()
+        if not snapshots:
+            return None
+        return time.time() - os.path.getmtime(snapshots[0])
+
+    def start(self) -> bool:
+        """Run a backup on a background thread; False if one is already running"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._status = {'state': 'starting', 'started_at': datetime.utcnow().isoformat()}
+            self._thread = threading.Thread(target=self._run_logged, name='backup', daemon=True)
+            self._thread.start()
+        return True
+
+    def _run_logged(self) -> None:
+        try:
+            self.run()
+        except BackupInProgress as e:
+            logger.info(str(e))
+        except Exception as e:
+            logger.error(f"Backup failed: {e}")
+
+    def run(self) -> str:
+        """Take one snapshot now; returns the path of the compressed file"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        lock = _DirectoryLock(os.path.join(self.backup_dir, '.backup.lock'))
+        if not lock.acquire():
+            self._update(state='skipped', error='another process is backing up this database')
+            raise BackupInProgress(f"Backup of {self.db_path} already running in another process")
+
+        started = time.perf_counter()
+        # Microseconds, so a backup started in the same second as the last one
+        # (another process, once the lock is free) doesn't replace its file
+        stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')
+        snapshot = os.path.join(self.backup_dir, f"{SNAPSHOT_PREFIX}{stamp}.db")
+        counter = 1
+        while os.path.exists(snapshot + '.gz'):
+            snapshot = os.path.join(self.backup_dir, f"{SNAPSHOT_PREFIX}{stamp}-{counter}.db")
+            counter += 1
+        partial = snapshot + '.partial'
+        with self._lock:
+            # start() has already stamped the request time; direct calls start fresh
+            started_at = self._status.get('started_at') if self._status.get('state') == 'starting' else None
+            self._status = {'state': 'copying', 'started_at': started_at or datetime.utcnow().isoformat(),
+                            'pages_total': 0, 'pages_done': 0, 'percent': 0.0, 'restarts': 0}
+        try:
+            self._copy(partial)
+            copied = time.perf_counter()
+
+            self._update(state='verifying')
+            self._verify(partial)
+
+            self._update(state='compressing')
+            with open(partial, 'rb') as source, gzip.open(snapshot + '.gz.partial', 'wb',
+                                                          compresslevel=self.compress_level) as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            os.replace(snapshot + '.gz.partial', snapshot + '.gz')
+            removed = self._rotate()
+
+            finished = time.perf_counter()
+            self._update(
+                state='done',
+                path=snapshot + '.gz',
+                size_bytes=os.path.getsize(snapshot + '.gz'),
+                copy_seconds=round(copied - started, 3),
+                seconds=round(finished - started, 3),
+                rotated=removed,
+                finished_at=datetime.utcnow().isoformat(),
+            )
+            logger.info(f"Backup written to {snapshot}.gz in {finished - started:.1f}s")
+            return snapshot + '.gz'
+        except Exception as e:
+            self._update(state='failed', error=str(e), finished_at=datetime.utcnow().isoformat())
+            raise
+        finally:
+            for leftover in (partial, snapshot + '.gz.partial'):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            lock.release()
+
+    def _copy(self, target_path: str) -> None:
+        """
+        Copy the live database into target_path.
+
+        In WAL mode the copy is one step inside a read snapshot: writers
+        carry on in the WAL and nobody waits. With a rollback journal the
+        copy holds a lock while it runs, so it goes in small steps. A write
+        from another connection restarts an SQLite backup, so each restart
+        aborts and retries with steps four times bigger (a shorter copy for
+        writes to land in); the last attempt copies everything in one step.
+        """
+        restarts = 0
+        last_remaining = None
+
+        def progress(status, remaining, total):
+            nonlocal last_remaining
+            if last_remaining is not None and remaining > last_remaining:
+                raise _Restarted()
+            last_remaining = remaining
+            done = total - remaining
+            self._update(pages_total=total, pages_done=done, restarts=restarts,
+                         percent=round(100.0 * done / total, 1) if total else 100.0)
+            if remaining:
+                # backup() only sleeps when the source is busy; pause between
+                # steps too so writers get the database in between
+                time.sleep(self.step_sleep)
+
+        source = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            target = sqlite3.connect(target_path)
+            try:
+                wal = source.execute('PRAGMA journal_mode').fetchone()[0].lower() == 'wal'
+                pages = -1 if wal else self.pages_per_step
+                self._update(journal_mode='wal' if wal else 'rollback')
+                while True:
+                    final = pages < 0 or restarts >= self.max_restarts
+                    last_remaining = None
+                    try:
+                        source.backup(target, pages=-1 if final else pages, progress=progress, sleep=self.step_sleep)
+                        break
+                    except _Restarted:
+                        restarts += 1
+                        pages *= 4
+                        logger.info(f"Backup restarted by a concurrent write, retrying with {pages} pages per step")
+                self._update(restarts=restarts, percent=100.0)
+            finally:
+                target.close()
+        finally:
+            source.close()
+
+    @staticmethod
+    def _verify(path: str) -> None:
+        connection = sqlite3.connect(path)
+        try:
+            result = connection.execute('PRAGMA quick_check').fetchone()[0]
+        finally:
+            connection.close()
+        if result != 'ok':
+            raise sqlite3.DatabaseError(f"Snapshot failed quick_check: {result}")
+
+    def _rotate(self) -> int:
+        removed = 0
+        for path in self.snapshots()[self.keep:]:
+            os.remove(path)
+            removed += 1
+        return removed
+
+
+class HouseholdBackups:
+    """A BackupManager per household database, made as households appear"""
+
+    def __init__(self, household_dir: str, backup_dir: str, keep: int = 7, pages_per_step: int = 256):
+        self.household_dir = household_dir
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self._managers: Dict[str, BackupManager] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def managers(self) -> Dict[str, BackupManager]:
+        """household -> its BackupManager, for every household database on disk"""
+        from models import HOUSEHOLD_ID_RE
+
+        names = os.listdir(self.household_dir) if os.path.isdir(self.household_dir) else []
+        households = {name[:-3] for name in names if name.endswith('.db') and HOUSEHOLD_ID_RE.match(name[:-3])}
+        with self._lock:
+            for household in households - self._managers.keys():
+                self._managers[household] = BackupManager(
+                    os.path.join(self.household_dir, f"{household}.db"),
+                    backup_dir=os.path.join(self.backup_dir, 'households', household),
+                    keep=self.keep,
+                    pages_per_step=self.pages_per_step,
+                )
+            for household in self._managers.keys() - households:
+                del self._managers[household]
+            return dict(sorted(self._managers.items()))
+
+    def run_all(self) -> None:
+        """Back up every household now, one after another"""
+        for manager in self.managers().values():
+            manager._run_logged()
+
+    def start(self) -> bool:
+        """run_all() on a background thread; False if it is already running"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self.run_all, name='household-backup', daemon=True)
+            self._thread.start()
+        return True
+
+    def status(self) -> Dict[str, Dict]:
+        return {household: manager.status() for household, manager in self.managers().items()}
+
+
+class BackupScheduler:
+    """Background thread that takes a snapshot whenever the newest one is older than
+    interval, of the main database and of every household's"""
+
+    def __init__(self, manager: Optional[BackupManager], interval: float, check_every: float = 60.0,
+                 households: Optional[HouseholdBackups] = None):
+        self.manager = manager
+        self.households = households
+        self.interval = interval
+        self.check_every = min(check_every, interval)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def start(self) -> None:
+        # Restarted per process: threads don't survive a gunicorn fork
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='backup-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _managers(self) -> List[BackupManager]:
+        managers = [self.manager] if self.manager is not None else []
+        if self.households is not None:
+            managers.extend(self.households.managers().values())
+        return managers
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.check_every):
+            for manager in self._managers():
+                if self._stop.is_set():
+                    break
+                age = manager.last_backup_age()
+                if age is None or age >= self.interval:
+                    manager._run_logged()
+
+
+def sqlite_path(engine) -> Optional[str]:
+    """File path of a SQLite engine's database, None for other databases"""
+    if engine.url.get_backend_name() != 'sqlite' or not engine.url.database or engine.url.database == ':memory:':
+        return None
+    return engine.url.database
+
+
+def manager_from_env(db_path: str) -> BackupManager:
+    return BackupManager(
+        db_path,
+        backup_dir=os.environ.get('BACKUP_DIR') or None,
+        keep=int(os.environ.get('BACKUP_KEEP', 7)),
+        pages_per_step=int(os.environ.get('BACKUP_PAGES_PER_STEP', 256)),
+    )
+
+
+def household_backups_from_env(household_dir: Optional[str],
+                               manager: Optional[BackupManager]) -> Optional[HouseholdBackups]:
+    """Backups for the households in household_dir, beside the main database's snapshots"""
+    if not household_dir:
+        return None
+    backup_dir = (os.environ.get('BACKUP_DIR') or (manager.backup_dir if manager else None)
+                  or os.path.join(household_dir, 'backups'))
+    return HouseholdBackups(
+        household_dir,
+        backup_dir,
+        keep=int(os.environ.get('BACKUP_KEEP', 7)),
+        pages_per_step=int(os.environ.get('BACKUP_PAGES_PER_STEP', 256)),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Take a hot backup of the QuickBasket database')
+    parser.add_argument('--db', help='SQLite database file (default: the app database)')
+    parser.add_argument('--dir', help='backup directory (default: BACKUP_DIR or backups/ next to the database)')
+    parser.add_argument('--keep', type=int, help='snapshots to keep')
+    parser.add_argument('--pages-per-step', type=int, help='pages copied per step')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    household_dir = None
+    if args.db:
+        db_path = args.db
+    else:
+        from models import engine, households
+        db_path = sqlite_path(engine)
+        household_dir = households.directory
+        if not db_path and not household_dir:
+            print("❌ Online backups need a SQLite database; use your database's own tools instead")
+            sys.exit(1)
+
+    managers = []
+    main_manager = manager_from_env(db_path) if db_path else None
+    if main_manager is not None:
+        managers.append(('Database', main_manager))
+    household_backups = household_backups_from_env(household_dir, main_manager)
+    if household_backups is not None:
+        if args.dir:
+            household_backups.backup_dir = args.dir
+        managers.extend((f"Household {household}", manager)
+                        for household, manager in household_backups.managers().items())
+    for _, manager in managers:
+        if args.dir and manager is main_manager:
+            manager.backup_dir = args.dir
+        if args.keep is not None:
+            manager.keep = args.keep
+        if args.pages_per_step:
+            manager.pages_per_step = args.pages_per_step
+
+    print("=" * 60)
+    print("🍽️  QuickBasket - Online Backup")
+    print("=" * 60)
+    failed = False
+    for label, manager in managers:
+        print(f"📁 {label}: {manager.db_path}")
+        try:
+            path = manager.run()
+        except (BackupInProgress, sqlite3.Error, OSError) as e:
+            print(f"❌ Backup failed: {e}")
+            failed = True
+            continue
+        status = manager.status()
+        print(f"✅ {path} ({status['size_bytes'] / 1e6:,.1f} MB) in {status['seconds']:.1f}s")
+        print(f"🗂️  {len(status['snapshots'])} snapshot(s) kept, {status['rotated']} rotated out")
+    print("=" * 60)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
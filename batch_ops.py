@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+QuickBasket Batch Operations
+The recipe and grocery list writes the mobile app makes, as functions on a
+session that never commit, so one request can apply a whole offline
+session's worth of them in a single transaction (POST /api/batch). The
+single-operation routes use the same functions and commit after each.
+
+A batch is an ordered list of operations, each a JSON object naming its
+"op" plus that operation's fields:
+
+    {"operations": [
+        {"op": "add_recipe_manual", "name": "Soup", "ingredients": ["1 leek"]},
+        {"op": "update_ingredient", "recipe_id": "$0", "old_ingredient": "1 leek",
+         "new_ingredient": "2 leeks"},
+        {"op": "delete_recipe", "recipe_id": 12},
+        {"op": "update_grocery_item", "item_name": "2 leeks", "checked": true}
+    ]}
+
+A recipe_id of "$<n>" is the id of the recipe added by operation n of the
+same batch. Operations run in order and either all are committed or none
+are: the first one that fails rolls the batch back, and the response says
+which one it was and why (the operations before it get status 424).
+
+Every operation in a batch counts against the write rate limit as if it
+had been sent on its own.
+
+Settings (environment):
+    BATCH_MAX_OPERATIONS  operations allowed in one batch (default 100)
+"""
+
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models import Recipe
+
+BATCH_MAX_OPERATIONS = int(os.environ.get('BATCH_MAX_OPERATIONS', 100))
+
+
+class OperationError(Exception):
+    """An operation that can't be applied; status is the HTTP status it would get on its own"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _text(data: Dict, field: str) -> str:
+    value = data.get(field) or ''
+    if not isinstance(value, str):
+        raise OperationError(f'{field} must be a string')
+    return value.strip()
+
+
+def _lines(value: Any) -> List[str]:
+    """Ingredients sent either as a list or as newline-separated text"""
+    if isinstance(value, str):
+        value = value.split('\n')
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise OperationError('ingredients must be a list of strings')
+    return [item.strip() for item in value if item.strip()]
+
+
+def _recipe(session, recipe_id: Any) -> Recipe:
+    try:
+        recipe_id = int(recipe_id)
+    except (TypeError, ValueError):
+        raise OperationError('recipe_id must be a number')
+    recipe = session.get(Recipe, recipe_id)
+    if recipe is None:
+        raise OperationError('Recipe not found', 404)
+    return recipe
+
+
+def delete_recipe(session, data: Dict) -> Tuple[int, Dict]:
+    recipe = _recipe(session, data.get('recipe_id'))
+    recipe_id, title = recipe.id, recipe.title
+    session.delete(recipe)
+    session.flush()
+    return 200, {'message': f'Recipe "{title}" deleted successfully', 'recipe_id': recipe_id}
+
+
+def add_recipe_manual(session, data: Dict) -> Tuple[int, Dict]:
+    name = _text(data, 'name')
+    if not name:
+        raise OperationError('Recipe name is required')
+    ingredients = _lines(data.get('ingredients') or [])
+    if not ingredients:
+        raise OperationError('At least one ingredient is required')
+    recipe = Recipe(title=name, ingredients='\n'.join(ingredients), instructions=_text(data, 'instructions'))
+    session.add(recipe)
+    session.flush()
+    return 201, recipe.to_dict()
+
+
+def update_ingredient(session, data: Dict) -> Tuple[int, Dict]:
+    old_ingredient = _text(data, 'old_ingredient')
+    new_ingredient = _text(data, 'new_ingredient')
+    if not all([data.get('recipe_id'), old_ingredient, new_ingredient]):
+        raise OperationError('Recipe ID, old ingredient, and new ingredient are required')
+    recipe = _recipe(session, data['recipe_id'])
+    ingredients = (recipe.ingredients or '').split('\n')
+    for index, ingredient in enumerate(ingredients):
+        if ingredient.strip() == old_ingredient:
+            ingredients[index] = new_ingredient
+            break
+    else:
+        raise OperationError('Ingredient not found in recipe', 404)
+    recipe.ingredients = '\n'.join(ingredients)
+    session.flush()
+    return 200, {'message': 'Ingredient updated successfully', 'recipe_id': recipe.id}
+
+
+def update_grocery_item(session, data: Dict) -> Tuple[int, Dict]:
+    # Checked states live on the device; the server only acknowledges them
+    item_name = _text(data, 'item_name')
+    if not item_name:
+        raise OperationError('Item name is required')
+    return 200, {'message': 'Item updated successfully', 'item': item_name, 'checked': bool(data.get('checked'))}
+
+
+OPERATIONS: Dict[str, Callable[[Any, Dict], Tuple[int, Dict]]] = {
+    'delete_recipe': delete_recipe,
+    'add_recipe_manual': add_recipe_manual,
+    'update_ingredient': update_ingredient,
+    'update_grocery_item': update_grocery_item,
+}
+
+
+def _resolve_references(data: Dict, created: Dict[int, int]) -> Dict:
+    reference = data.get('recipe_id')
+    if not (isinstance(reference, str) and reference.startswith('$')):
+        return data
+    try:
+        index = int(reference[1:])
+    except ValueError:
+        raise OperationError(f'Bad recipe reference {reference}')
+    if index not in created:
+        raise OperationError(f'Operation {index} did not add a recipe before this one')
+    return {**data, 'recipe_id': created[index]}
+
+
+def run_batch(session, operations: Any) -> Tuple[int, Dict]:
+    """Apply operations in order on session and commit once.
+    Returns (HTTP status, response body); on any failure nothing is committed."""
+    if not isinstance(operations, list) or not operations:
+        return 400, {'error': 'operations must be a non-empty list'}
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return 413, {'error': f'At most {BATCH_MAX_OPERATIONS} operations per batch'}
+
+    results: List[Dict] = []
+    created: Dict[int, int] = {}
+    failure: Optional[OperationError] = None
+    for index, data in enumerate(operations):
+        name = data.get('op') if isinstance(data, dict) else None
+        try:
+            operation = OPERATIONS.get(name) if isinstance(name, str) else None
+            if operation is None:
+                raise OperationError(f'Unknown operation {name!r}')
+            status, body = operation(session, _resolve_references(data, created))
+        except OperationError as e:
+            failure = e
+            results.append({'op': name, 'status': e.status, 'error': e.message})
+            break
+        if operation is add_recipe_manual:
+            created[index] = body['id']
+        results.append({'op': name, 'status': status, **body})
+
+    if failure is not None:
+        session.rollback()
+        failed = len(results) - 1
+        # Nothing before the failure was kept either, ids of added recipes included
+        applied = [{'op': result['op'], 'status': 424, 'error': f'Not applied: operation {failed} failed'}
+                   for result in results[:failed]]
+        return failure.status, {'committed': False, 'failed': failed,
+                                'error': failure.message, 'results': applied + results[failed:]}
+    session.commit()
+    return 200, {'committed': True, 'results': results}
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+QuickBasket Batch Scraper
+Extracts recipes from saved HTML pages (a directory or a tar archive)
+without fetching anything, using the same stages as a live scrape: the
+streamed JSON-LD scan, then the extraction cascade. Pages are sent to a
+process pool in chunks, so extraction runs on every core.
+
+Output is NDJSON in the recipe_io format (so `recipe_io.py import` can load
+it later) or rows inserted straight into the database, batch by batch,
+skipping recipes whose URL is already saved. A page's URL comes from its
+canonical link, og:url or the browser's "saved from url" comment.
+
+Finished pages are appended to a state file after every batch is written;
+--resume skips them, so an interrupted run picks up where it stopped. A
+page can be written twice if the run dies between writing a batch and
+recording it; the database import drops such duplicates by URL.
+
+Examples:
+    python batch_scraper.py saved_pages/ --out recipes.ndjson.gz
+    python batch_scraper.py pages.tar.gz --db --workers 4
+    python batch_scraper.py pages.tar.gz --db /tmp/capacity.db --resume
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+import signal
+import sys
+import tarfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+PAGE_SUFFIXES = ('.html', '.htm', '.html.gz', '.htm.gz')
+CHUNK_SIZE = 16          # pages per task sent to a worker
+BATCH_SIZE = 500         # results per write (and per state file update)
+MAX_REPORTED_ERRORS = 20
+URL_SNIFF_BYTES = 64 * 1024
+
+# (page key, file path or None, file bytes or None): directories send paths
+# and workers read the files; tar members are read here and sent as bytes
+PageItem = Tuple[str, Optional[str], Optional[bytes]]
+
+SAVED_FROM_RE = re.compile(rb'<!--\s*saved from url=\(\d+\)(\S+?)\s*-->', re.I)
+CANONICAL_RE = re.compile(rb'<link\b[^>]*\brel=["\']?canonical\b[^>]*>', re.I)
+OG_URL_RE = re.compile(rb'<meta\b[^>]*\bproperty=["\']?og:url\b[^>]*>', re.I)
+HREF_RE = re.compile(rb'\bhref=["\']?([^"\'\s>]+)', re.I)
+CONTENT_RE = re.compile(rb'\bcontent=["\']?([^"\'\s>]+)', re.I)
+
+
+def page_url(data: bytes) -> Optional[str]:
+    """The page's own URL from its markup, if it says"""
+    head = data[:URL_SNIFF_BYTES]
+    candidates = []
+    for tag_re, attr_re in ((CANONICAL_RE, HREF_RE), (OG_URL_RE, CONTENT_RE)):
+        tag = tag_re.search(head)
+        value = attr_re.search(tag.group(0)) if tag else None
+        if value:
+            candidates.append(value.group(1))
+    saved_from = SAVED_FROM_RE.search(head)
+    if saved_from:
+        candidates.append(saved_from.group(1))
+    for candidate in candidates:
+        url = candidate.decode('utf-8', errors='replace').replace('&amp;', '&')
+        if url.startswith(('http://', 'https://')):
+            return url
+    return None
+
+
+# ----- sources -----
+
+def _is_page(name: str) -> bool:
+    return name.lower().endswith(PAGE_SUFFIXES)
+
+
+def directory_pages(root: str) -> Iterator[PageItem]:
+    """Every saved page under root, in a stable order; keys are relative paths"""
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if _is_page(name):
+                path = os.path.join(directory, name)
+                yield os.path.relpath(path, root).replace(os.sep, '/'), path, None
+
+
+def tar_pages(path: str) -> Iterator[PageItem]:
+    """Every saved page in a (possibly compressed) tar, read as a stream"""
+    with tarfile.open(path, mode='r|*') as archive:
+        for member in archive:
+            if member.isfile() and _is_page(member.name):
+                handle = archive.extractfile(member)
+                yield member.name, None, handle.read()
+
+
+def open_source(path: str) -> Iterator[PageItem]:
+    if os.path.isdir(path):
+        return directory_pages(path)
+    if tarfile.is_tarfile(path):
+        return tar_pages(path)
+    raise ValueError(f"{path} is neither a directory nor a tar archive")
+
+
+# ----- workers -----
+
+_service = None
+
+
+def _init_worker() -> None:
+    global _service
+    from recipe_scraper import RecipeScrapingService
+
+    # Per-page extraction logging would drown the progress output; failures are in the report
+    logging.disable(logging.ERROR)
+    # Ctrl-C is for the parent, which stops handing out chunks and saves what is done
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _service = RecipeScrapingService()
+
+
+def _text(value) -> str:
+    """JSON-LD allows a list where one string is expected ("name": ["Soup", ...]); take its first string"""
+    if isinstance(value, list):
+        value = next((item for item in value if isinstance(item, str) and item.strip()), '')
+    return value.strip() if isinstance(value, str) else ''
+
+
+def _lines(value) -> List[str]:
+    """Ingredients or instructions as a list of non-empty strings, whatever shape the page gave"""
+    if isinstance(value, (str, dict)):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    lines = []
+    for item in value:
+        if isinstance(item, dict):
+            item = item.get('text')
+        if isinstance(item, str):
+            lines.extend(line.strip() for line in item.split('\n') if line.strip())
+    return lines
+
+
+def extract_page(service, key: str, data: bytes) -> Dict:
+    """Run one saved page through the scrape stages; returns an NDJSON record or an error"""
+    from recipe_scraper import StreamedPage
+
+    if key.lower().endswith('.gz'):
+        data = gzip.decompress(data)
+    url = page_url(data)
+    page = StreamedPage(service, url or key, 'text/html')
+    page.feed(data)
+    html, recipe_ld = page.finish()
+    recipe, error, _ = service.finish_page(html, recipe_ld, url or '', service.extract_recipe)
+    if not recipe:
+        return {'page': key, 'error': error or 'no recipe found'}
+    title = _text(recipe.get('title'))
+    if not title:
+        return {'page': key, 'error': 'recipe has no title'}
+    source_url = url or _text(recipe.get('source_url'))
+    return {
+        'page': key,
+        'title': title,
+        'ingredients': _lines(recipe.get('ingredients')),
+        'instructions': _lines(recipe.get('instructions')),
+        'source_url': source_url or None,
+    }
+
+
+def _extract_chunk(items: List[PageItem]) -> List[Dict]:
+    results = []
+    for key, path, data in items:
+        try:
+            if data is None:
+                with open(path, 'rb') as handle:
+                    data = handle.read()
+            results.append(extract_page(_service, key, data))
+        except Exception as e:
+            results.append({'page': key, 'error': f"{type(e).__name__}: {e}"})
+    return results
+
+
+# ----- sinks -----
+
+class NdjsonSink:
+    """Appends recipe records to an NDJSON file (.gz compresses, '-' is stdout)"""
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        if path == '-':
+            self.handle = sys.stdout
+        elif path.endswith('.gz'):
+            # Appending adds another gzip member; readers see one stream
+            self.handle = gzip.open(path, 'at' if append else 'wt', encoding='utf-8', compresslevel=6)
+        else:
+            self.handle = open(path, 'a' if append else 'w', encoding='utf-8')
+        self.written = 0
+
+    def write(self, records: List[Dict]) -> None:
+        for record in records:
+            self.handle.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.handle.flush()
+        self.written += len(records)
+
+    def close(self) -> None:
+        if self.handle is not sys.stdout:
+            self.handle.close()
+
+
+class DatabaseSink:
+    """Inserts recipe records through recipe_io, skipping URLs already saved"""
+
+    def __init__(self, engine, chunk_size: int = BATCH_SIZE):
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.inserted = 0
+        self.duplicates = 0
+        self.rejected = 0
+
+    def write(self, records: List[Dict]) -> None:
+        from recipe_io import import_lines
+
+        report = import_lines(self.engine, (json.dumps(record) for record in records), chunk_size=self.chunk_size)
+        self.inserted += report.inserted
+        self.duplicates += report.duplicates
+        # Recipes the library won't take, e.g. JSON-LD without a name
+        self.rejected += report.error_count
+
+    def close(self) -> None:
+        pass
+
+
+# ----- runner -----
+
+class BatchReport:
+    """Counts for one batch run"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.pages = 0
+        self.extracted = 0
+        self.failed = 0
+        self.resumed = 0
+        self.errors: List[str] = []
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def error(self, page: str, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"{page}: {message}")
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'workers': self.workers,
+            'pages': self.pages,
+            'extracted': self.extracted,
+            'failed': self.failed,
+            'resumed': self.resumed,
+            'error_samples': self.errors,
+            'seconds': round(self.seconds, 3),
+            'pages_per_second': round(self.pages_per_second, 1),
+        }
+
+
+def _read_state(path: str) -> set:
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return {line.rstrip('\n') for line in handle if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def _chunks(items: Iterable[PageItem], size: int) -> Iterator[List[PageItem]]:
+    chunk: List[PageItem] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(pages: Iterable[PageItem], sink, workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+              batch_size: int = BATCH_SIZE, state_path: Optional[str] = None, resume: bool = False,
+              progress=None) -> BatchReport:
+    """Extract every page on a pool of worker processes and write the recipes to sink"""
+    workers = workers or os.cpu_count() or 1
+    report = BatchReport(workers)
+    done = _read_state(state_path) if state_path and resume else set()
+    state = open(state_path, 'a' if resume else 'w', encoding='utf-8') if state_path else None
+
+    def remaining() -> Iterator[PageItem]:
+        for item in pages:
+            if item[0] in done:
+                report.resumed += 1
+                continue
+            yield item
+
+    records: List[Dict] = []
+    finished: List[str] = []
+
+    def flush() -> None:
+        # Write first, then record: a crash in between repeats pages, never loses them.
+        # Taken off the lists before writing, so a sink that raises isn't handed the
+        # same batch again by the flush in the finally below
+        batch, pages_done = records[:], finished[:]
+        records.clear()
+        finished.clear()
+        if batch:
+            sink.write(batch)
+        if state and pages_done:
+            state.write(''.join(f"{page}\n" for page in pages_done))
+            state.flush()
+            os.fsync(state.fileno())
+
+    def collect(results: List[Dict]) -> None:
+        for result in results:
+            report.pages += 1
+            finished.append(result['page'])
+            if 'error' in result:
+                report.error(result['page'], result['error'])
+            else:
+                report.extracted += 1
+                records.append(result)
+        if len(finished) >= batch_size:
+            flush()
+            if progress:
+                progress(report)
+
+    # At most two chunks queued per worker, so a big tar is never read into memory
+    max_pending = workers * 2
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    pending = set()
+    try:
+        for chunk in _chunks(remaining(), chunk_size):
+            pending.add(pool.submit(_extract_chunk, chunk))
+            if len(pending) >= max_pending:
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    collect(future.result())
+        for future in pending:
+            collect(future.result())
+        pending = set()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        flush()
+        if state:
+            state.close()
+        report.seconds = time.perf_counter() - report.started
+    return report
+
+
+def default_state_path(source: str, out: Optional[str]) -> str:
+    base = out if out and out != '-' else source.rstrip('/\\')
+    return f"{base}.done"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract recipes from a directory or tar of saved HTML pages')
+    parser.add_argument('source', help='directory or tar archive (.tar, .tar.gz, ...) of saved pages')
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--out', help="NDJSON output file, .gz to compress, '-' for stdout")
+    output.add_argument('--db', nargs='?', const='', metavar='DATABASE',
+                        help='insert into a SQLite file or database URL (default: the app database / DATABASE_URL)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='pages per task sent to a worker')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='recipes per write')
+    parser.add_argument('--state', help='file listing finished pages (default: <out or source>.done)')
+    parser.add_argument('--resume', action='store_true', help='skip pages the state file lists and append')
+    parser.add_argument('--json', metavar='PATH', help='also write the report as JSON')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        pages = open_source(args.source)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.out:
+        sink = NdjsonSink(args.out, append=args.resume)
+    else:
+        if args.db:
+            from models import build_engine, prepare_database
+            engine = build_engine(args.db if '://' in args.db else f"sqlite:///{args.db}")
+            prepare_database(engine)
+        else:
+            from models import engine, init_db
+            init_db()
+        sink = DatabaseSink(engine, chunk_size=args.batch_size)
+
+    # Progress goes to stderr so `--out -` can be piped
+    log = sys.stderr
+
+    def progress(report: BatchReport) -> None:
+        print(f"   {report.pages:,} pages, {report.extracted:,} recipes "
+              f"({report.pages / (time.perf_counter() - report.started):,.0f} pages/s)", file=log)
+
+    state_path = args.state or default_state_path(args.source, args.out)
+    try:
+        report = run_batch(pages, sink, workers=args.workers, chunk_size=args.chunk_size,
+                           batch_size=args.batch_size, state_path=state_path, resume=args.resume,
+                           progress=progress)
+    except KeyboardInterrupt:
+        print(f"⏸️  Interrupted; finished pages are listed in {state_path}, rerun with --resume", file=log)
+        sys.exit(130)
+    finally:
+        sink.close()
+
+    print(f"✅ {report.extracted:,} recipes from {report.pages:,} pages in {report.seconds:.2f}s "
+          f"({report.pages_per_second:,.0f} pages/s on {report.workers} workers)", file=log)
+    if report.resumed:
+        print(f"   {report.resumed:,} pages already done in an earlier run", file=log)
+    if isinstance(sink, DatabaseSink):
+        print(f"   {sink.inserted:,} inserted, {sink.duplicates:,} duplicates skipped, "
+              f"{sink.rejected:,} rejected", file=log)
+    print(f"   {report.failed:,} pages without a recipe", file=log)
+    for message in report.errors:
+        print(f"   ❌ {message}", file=log)
+
+    if args.json:
+        result = report.to_dict()
+        if isinstance(sink, DatabaseSink):
+            result.update(inserted=sink.inserted, duplicates=sink.duplicates, rejected=sink.rejected)
+        with open(args.json, 'w') as handle:
+            json.dump(result, handle, indent=2)
+        print(f"💾 Report written to {args.json}", file=log)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Online backup cost on a large database.
+
+Seeds (or reuses) a SQLite database of --size-mb, keeps readers and a
+writer running against it like app requests would, and takes backups:
+- idle:     no backup, the latency baseline
+- app:      BackupManager as the app runs it (a snapshot in WAL mode,
+            small page steps with a rollback journal)
+- one-step: the whole database in a single backup step
+
+For each phase it reports how long the copy took and the read/write
+latency seen while it ran, i.e. the pause the backup causes. Run it with
+--journal-mode wal (the app default) and delete to compare.
+
+Examples:
+    python benchmarks/backup_pause.py                      # 1 GB
+    python benchmarks/backup_pause.py --size-mb 200 --db /tmp/backup-bench.db
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backup import BackupManager  # noqa: E402
+from seed_data import bulk_load  # noqa: E402
+
+BYTES_PER_RECIPE = 930  # Measured on seed_data output, including the index
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def ensure_database(path, size_mb):
+    target = size_mb * 1024 * 1024
+    current = os.path.getsize(path) if os.path.exists(path) else 0
+    if current >= target * 0.95:
+        print(f"📁 Reusing {path} ({current / 1e6:,.0f} MB)")
+        return
+    count = int((target - current) / BYTES_PER_RECIPE)
+    print(f"📁 Seeding {count:,} recipes into {path}...")
+    bulk_load(path, count, batch_size=100000)
+    print(f"   {os.path.getsize(path) / 1e6:,.0f} MB")
+
+
+class Workload:
+    """Reader threads and a paced writer, recording (timestamp, latency) per operation"""
+
+    def __init__(self, db_path, readers, write_rate):
+        self.db_path = db_path
+        self.readers = readers
+        self.write_rate = write_rate
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.samples = {'read': [], 'write': []}
+        connection = sqlite3.connect(db_path)
+        self.max_id = connection.execute("SELECT MAX(id) FROM recipes").fetchone()[0]
+        connection.close()
+
+    def _record(self, kind, started):
+        finished = time.perf_counter()
+        with self.lock:
+            self.samples[kind].append((started, finished))
+
+    def _reader(self):
+        connection = sqlite3.connect(self.db_path, timeout=60)
+        rng = random.Random()
+        while not self.stop_event.is_set():
+            started = time.perf_counter()
+            connection.execute("SELECT id, title, ingredients FROM recipes WHERE id = ?",
+                               (rng.randint(1, self.max_id),)).fetchone()
+            self._record('read', started)
+            time.sleep(0.002)
+        connection.close()
+
+    def _writer(self):
+        connection = sqlite3.connect(self.db_path, timeout=60)
+        rng = random.Random()
+        while not self.stop_event.wait(1.0 / self.write_rate):
+            started = time.perf_counter()
+            connection.execute("UPDATE recipes SET last_added_to_grocery = CURRENT_TIMESTAMP WHERE id = ?",
+                               (rng.randint(1, self.max_id),))
+            connection.commit()
+            self._record('write', started)
+        connection.close()
+
+    def start(self):
+        self.threads = [threading.Thread(target=self._reader) for _ in range(self.readers)]
+        if self.write_rate > 0:
+            self.threads.append(threading.Thread(target=self._writer))
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+
+    def window(self, kind, start, end):
+        """Latencies of operations that overlapped [start, end], including ones blocked past it"""
+        with self.lock:
+            return sorted(finished - began for began, finished in self.samples[kind]
+                          if began <= end and finished >= start)
+
+
+def summarize(latencies):
+    return {
+        'count': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round((latencies[-1] if latencies else 0.0) * 1000, 2),
+    }
+
+
+def run_phase(name, workload, db_path, backup_dir, pages_per_step, idle_seconds):
+    if name == 'idle':
+        start = time.perf_counter()
+        time.sleep(idle_seconds)
+        end = time.perf_counter()
+        result = {'copy_seconds': 0.0, 'total_seconds': 0.0, 'restarts': 0}
+    else:
+        manager = BackupManager(db_path, backup_dir=backup_dir, keep=1, pages_per_step=pages_per_step)
+        start = time.perf_counter()
+        manager.run()
+        status = manager.status()
+        time.sleep(0.5)  # Give writes blocked by the copy time to finish and be counted
+        # The copy is the part that touches the live database
+        end = start + status['copy_seconds']
+        result = {'copy_seconds': status['copy_seconds'], 'total_seconds': status['seconds'],
+                  'restarts': status.get('restarts', 0)}
+        time.sleep(0.5)  # Let the workload settle before the next phase
+    result['read'] = summarize(workload.window('read', start, end))
+    result['write'] = summarize(workload.window('write', start, end))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure online backup time and the pause it causes')
+    parser.add_argument('--size-mb', type=int, default=1024, help='database size to test with')
+    parser.add_argument('--db', help='database file to create or reuse (default: a temporary file)')
+    parser.add_argument('--readers', type=int, default=2, help='concurrent reader threads')
+    parser.add_argument('--write-rate', type=float, default=5, help='writes per second')
+    parser.add_argument('--pages-per-step', type=int, default=256, help='pages per step for rollback-journal backups')
+    parser.add_argument('--idle-seconds', type=float, default=5, help='length of the baseline phase')
+    parser.add_argument('--journal-mode', choices=['wal', 'delete'], default='wal',
+                        help='SQLite journal mode of the database under test')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix='quickbasket-backup-bench-')
+    db_path = args.db or os.path.join(workdir, 'recipes.db')
+    backup_dir = os.path.join(workdir, 'backups')
+
+    print("=" * 72)
+    print("🍽️  QuickBasket - Online Backup Benchmark")
+    print("=" * 72)
+    results = {}
+    try:
+        ensure_database(db_path, args.size_mb)
+        connection = sqlite3.connect(db_path)
+        connection.execute(f"PRAGMA journal_mode = {args.journal_mode}")
+        connection.close()
+        print(f"📓 Journal mode: {args.journal_mode}")
+        workload = Workload(db_path, args.readers, args.write_rate)
+        workload.start()
+        try:
+            for name, pages in (('idle', None), ('app', args.pages_per_step), ('one-step', -1)):
+                results[name] = run_phase(name, workload, db_path, backup_dir, pages, args.idle_seconds)
+        finally:
+            workload.stop()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'phase':<9} {'copy s':>7} {'total s':>8} {'restarts':>8} "
+          f"{'read p50/p99/max ms':>22} {'write p50/p99/max ms':>24}")
+    for name, result in results.items():
+        read, write = result['read'], result['write']
+        print(f"{name:<9} {result['copy_seconds']:>7.2f} {result['total_seconds']:>8.2f} {result['restarts']:>8} "
+              f"{read['p50_ms']:>7.2f}/{read['p99_ms']:>6.2f}/{read['max_ms']:>7.1f} "
+              f"{write['p50_ms']:>8.2f}/{write['p99_ms']:>7.2f}/{write['max_ms']:>7.1f}")
+    print("=" * 72)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
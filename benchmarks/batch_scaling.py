@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Batch scraper throughput from one worker process up to N.
+
+Writes a directory (or a tar, with --tar) of saved recipe pages in a few
+site layouts (JSON-LD, microdata, plain HTML) spread over several hosts,
+then runs batch_scraper over it with 1, 2, 4 ... workers, writing NDJSON.
+Reports pages/s and the speedup over one worker. The speedup is bounded by
+the machine's cores (os.cpu_count() is printed).
+
+Examples:
+    python benchmarks/batch_scaling.py
+    python benchmarks/batch_scaling.py --pages 5000 --workers 1 2 4 8 --tar
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_scraper import NdjsonSink, open_source, run_batch  # noqa: E402
+from seed_data import RecipeGenerator  # noqa: E402
+
+HOSTS = ['www.example-kitchen.com', 'food.example.org', 'blog.example.net', 'recipes.example.com']
+
+
+def render(index, generator):
+    rng = generator.rng
+    host = HOSTS[index % len(HOSTS)]
+    url = f"https://{host}/recipes/{index}-{generator.title().lower().replace(' ', '-')}"
+    title = generator.title()
+    ingredients = generator.ingredients(rng.randint(5, 12))
+    steps = generator.steps(rng.randint(3, 8))
+    filler = '<p>' + ' '.join(generator.step() for _ in range(40)) + '</p>'
+    head = f'<title>{title}</title><link rel="canonical" href="{url}">'
+    layout = index % 3
+    if layout == 0:
+        recipe_ld = json.dumps({
+            '@context': 'https://schema.org', '@type': 'Recipe', 'name': title,
+            'recipeIngredient': ingredients,
+            'recipeInstructions': [{'@type': 'HowToStep', 'text': step} for step in steps],
+        })
+        head += f'<script type="application/ld+json">{recipe_ld}</script>'
+        body = f'<h1>{title}</h1>{filler * 3}'
+    elif layout == 1:
+        items = ''.join(f'<li itemprop="recipeIngredient">{item}</li>' for item in ingredients)
+        method = ''.join(f'<li itemprop="recipeInstructions">{step}</li>' for step in steps)
+        body = (f'{filler}<div itemscope itemtype="http://schema.org/Recipe"><h1 itemprop="name">{title}</h1>'
+                f'<ul>{items}</ul><ol>{method}</ol></div>{filler}')
+    else:
+        items = ''.join(f'<li class="ingredient">{item}</li>' for item in ingredients)
+        method = ''.join(f'<li class="instruction">{step}</li>' for step in steps)
+        body = f'<h1 class="recipe-title">{title}</h1>{filler}<ul>{items}</ul><ol>{method}</ol>{filler}'
+    return f'<html><head>{head}</head><body>{body}</body></html>'
+
+
+def write_pages(directory, count):
+    generator = RecipeGenerator(seed=5)
+    for index in range(count):
+        subdirectory = os.path.join(directory, f"{index // 1000:03d}")
+        os.makedirs(subdirectory, exist_ok=True)
+        with open(os.path.join(subdirectory, f"page-{index:06d}.html"), 'w', encoding='utf-8') as handle:
+            handle.write(render(index, generator))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batch_scraper pages/s by worker count')
+    parser.add_argument('--pages', type=int, default=2000, help='saved pages to extract')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='worker counts to run')
+    parser.add_argument('--chunk-size', type=int, default=16, help='pages per task sent to a worker')
+    parser.add_argument('--tar', action='store_true', help='read the pages from a tar.gz instead of a directory')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='quickbasket-batch-')
+    pages_dir = os.path.join(workdir, 'pages')
+    source = pages_dir
+    print("=" * 60)
+    print("🍽️  QuickBasket - Batch Scraper Scaling")
+    print("=" * 60)
+    results = []
+    try:
+        write_pages(pages_dir, args.pages)
+        if args.tar:
+            source = os.path.join(workdir, 'pages.tar.gz')
+            with tarfile.open(source, 'w:gz') as archive:
+                archive.add(pages_dir, arcname='pages')
+        print(f"{args.pages:,} pages from {'a tar.gz' if args.tar else 'a directory'}, "
+              f"{os.cpu_count()} CPUs, chunks of {args.chunk_size}")
+        print(f"{'workers':>7} {'pages':>7} {'recipes':>8} {'seconds':>8} {'pages/s':>8} {'speedup':>8}")
+        baseline = None
+        for workers in args.workers:
+            out_path = os.path.join(workdir, f"recipes-{workers}.ndjson")
+            sink = NdjsonSink(out_path)
+            try:
+                report = run_batch(open_source(source), sink, workers=workers, chunk_size=args.chunk_size)
+            finally:
+                sink.close()
+            result = report.to_dict()
+            baseline = baseline or report.pages_per_second
+            result['speedup'] = round(report.pages_per_second / baseline, 2) if baseline else 0.0
+            results.append(result)
+            print(f"{workers:>7} {report.pages:>7,} {report.extracted:>8,} {report.seconds:>8.2f} "
+                  f"{report.pages_per_second:>8,.0f} {result['speedup']:>7.2f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("=" * 60)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
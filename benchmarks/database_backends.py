@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+The app schema and bulk-insert path on each database backend.
+
+For every URL: builds the engine the way models.py does (per-dialect pool
+options), creates and upgrades the schema with prepare_database(), bulk
+inserts generated recipes through models.bulk_insert, then has several
+threads read recipes back through pooled sessions. SQLite file and
+in-memory databases are always tested; add a scratch server database with
+--url (its recipes table must be empty or missing, and is dropped after).
+
+Examples:
+    python benchmarks/database_backends.py
+    python benchmarks/database_backends.py --url postgresql://localhost/qb_scratch --rows 50000
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, inspect, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from models import Base, Recipe, build_engine, bulk_insert, prepare_database  # noqa: E402
+from seed_data import DATETIME_FORMAT, RecipeGenerator  # noqa: E402
+
+COLUMNS = ['title', 'ingredients', 'instructions', 'source_url', 'canonical_url',
+           'created_at', 'updated_at', 'last_added_to_grocery']
+DATETIME_COLUMNS = ('created_at', 'updated_at', 'last_added_to_grocery')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def recipe_rows(count):
+    for values in RecipeGenerator(seed=7).rows(count):
+        row = dict(zip(COLUMNS, values))
+        for column in DATETIME_COLUMNS:
+            if row[column]:
+                row[column] = datetime.strptime(row[column], DATETIME_FORMAT)
+        yield row
+
+
+def read_back(engine, threads, reads_per_thread, max_id):
+    Session = sessionmaker(bind=engine)
+    latencies = []
+    lock = threading.Lock()
+
+    def reader():
+        rng = random.Random()
+        local = []
+        for _ in range(reads_per_thread):
+            started = time.perf_counter()
+            session = Session()
+            try:
+                recipe = session.get(Recipe, rng.randint(1, max_id))
+                recipe.to_dict()
+            finally:
+                session.close()
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=reader) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sorted(latencies)
+
+
+def check_backend(label, url, rows, chunk_size, threads, reads):
+    engine = build_engine(url)
+    try:
+        if inspect(engine).has_table('recipes'):
+            with engine.connect() as connection:
+                if connection.execute(select(func.count()).select_from(Recipe.__table__)).scalar():
+                    raise SystemExit(f"❌ {label}: recipes table is not empty; use a scratch database")
+
+        prepare_database(engine)
+        started = time.perf_counter()
+        with engine.begin() as connection:
+            inserted = bulk_insert(connection, Recipe.__table__, recipe_rows(rows), chunk_size=chunk_size)
+        insert_seconds = time.perf_counter() - started
+
+        with engine.connect() as connection:
+            stored = connection.execute(select(func.count()).select_from(Recipe.__table__)).scalar()
+            max_id = connection.execute(select(func.max(Recipe.id))).scalar()
+        latencies = read_back(engine, threads, reads, max_id)
+        return {
+            'backend': label,
+            'dialect': f"{engine.dialect.name}+{engine.driver}",
+            'pool': type(engine.pool).__name__,
+            'rows': inserted,
+            'stored': stored,
+            'insert_rows_per_second': round(inserted / insert_seconds, 1),
+            'read_p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'read_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'pool_status': engine.pool.status(),
+        }
+    finally:
+        if engine.dialect.name != 'sqlite':
+            Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the schema and bulk inserts on each database backend')
+    parser.add_argument('--url', action='append', default=[], help='extra scratch database URL (repeatable)')
+    parser.add_argument('--rows', type=int, default=20000, help='recipes to bulk insert')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='rows per executemany()')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent readers')
+    parser.add_argument('--reads', type=int, default=500, help='reads per thread')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='quickbasket-backends-')
+    backends = [('sqlite file', f"sqlite:///{os.path.join(workdir, 'recipes.db')}"),
+                ('sqlite memory', 'sqlite://')]
+    backends += [(url.split('://', 1)[0], url) for url in args.url]
+
+    print("=" * 72)
+    print("🍽️  QuickBasket - Database Backends")
+    print("=" * 72)
+    print(f"{'backend':<14} {'dialect':<18} {'pool':<10} {'rows':>7} {'insert/s':>10} "
+          f"{'read p50':>9} {'read p99':>9}")
+    results = []
+    try:
+        for label, url in backends:
+            result = check_backend(label, url, args.rows, args.chunk_size, args.threads, args.reads)
+            results.append(result)
+            status = '✅' if result['stored'] == result['rows'] else '❌'
+            print(f"{label:<14} {result['dialect']:<18} {result['pool']:<10} {result['stored']:>7,} "
+                  f"{result['insert_rows_per_second']:>10,.0f} {result['read_p50_ms']:>7.2f}ms "
+                  f"{result['read_p99_ms']:>7.2f}ms {status}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("=" * 72)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
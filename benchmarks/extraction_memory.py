@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Extraction cost per page with and without the per-host strategy memory.
+
+Builds pages for four made-up hosts, each with its own template, and runs
+the extraction cascade over them (no network):
+- json-ld.example   Recipe JSON-LD in the head
+- microdata.example schema.org microdata
+- classic.example   ingredient / instruction CSS classes
+- legacy.example    bare lists and numbered paragraphs, found by the last patterns
+
+Modes:
+- cascade: the fixed order, as before (memory never reorders)
+- cold:    a new, empty extraction_stats table; the memory learns as it goes
+- warm:    a new process-level memory loading the table the cold run saved
+
+Reports ms per page (parsing included), strategies tried per page, ms per
+page spent in ingredient and instruction searches, and pages whose extracted
+recipe differs from the cascade's.
+
+Examples:
+    python benchmarks/extraction_memory.py
+    python benchmarks/extraction_memory.py --pages 500
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction_memory import ExtractionMemory  # noqa: E402
+from recipe_scraper import RecipeScrapingService  # noqa: E402
+from seed_data import RecipeGenerator  # noqa: E402
+
+HOSTS = ['json-ld.example', 'microdata.example', 'classic.example', 'legacy.example']
+
+
+def render(host, generator):
+    rng = generator.rng
+    title = generator.title()
+    ingredients = generator.ingredients(rng.randint(5, 12))
+    steps = generator.steps(rng.randint(3, 8))
+    nav = '<ul>' + ''.join(f'<li><a href="/{word}">{word}</a></li>' for word in ('home', 'recipes', 'about')) + '</ul>'
+    filler = '<p>' + ' '.join(generator.step() for _ in range(20)) + '</p>'
+    if host == 'json-ld.example':
+        recipe_ld = json.dumps({
+            '@context': 'https://schema.org', '@type': 'Recipe', 'name': title,
+            'recipeIngredient': ingredients,
+            'recipeInstructions': [{'@type': 'HowToStep', 'text': step} for step in steps],
+        })
+        body = f'<h1>{title}</h1>{filler * 3}'
+        head = f'<script type="application/ld+json">{recipe_ld}</script>'
+    elif host == 'microdata.example':
+        items = ''.join(f'<li itemprop="recipeIngredient">{item}</li>' for item in ingredients)
+        method = ''.join(f'<li itemprop="recipeInstructions">{step}</li>' for step in steps)
+        body = (f'{filler}<div itemscope itemtype="http://schema.org/Recipe"><h1 itemprop="name">{title}</h1>'
+                f'<ul>{items}</ul><ol>{method}</ol></div>{filler}')
+        head = ''
+    elif host == 'classic.example':
+        items = ''.join(f'<li class="ingredient">{item}</li>' for item in ingredients)
+        method = ''.join(f'<li class="instruction">{step}</li>' for step in steps)
+        body = f'<h1 class="recipe-title">{title}</h1>{filler}<ul>{items}</ul><ol>{method}</ol>{filler}'
+        head = ''
+    else:
+        items = ''.join(f'<li>{item}</li>' for item in ingredients)
+        method = ''.join(f'<p>{number}. {step} Stir now and then.</p>' for number, step in enumerate(steps, 1))
+        body = f'<h1>{title}</h1>{filler}<ul>{items}</ul>{method}{filler}'
+        head = ''
+    return f'<html><head><title>{title}</title>{head}</head><body>{nav}{body}</body></html>'
+
+
+class CountingMemory(ExtractionMemory):
+    """ExtractionMemory that counts the strategies tried"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tried = 0
+        self.searching = 0.0
+
+    def record(self, host, stage, strategy, success, seconds):
+        self.tried += 1
+        if stage != 'page':  # Page strategies include the ingredient and instruction ones
+            self.searching += seconds
+        super().record(host, stage, strategy, success, seconds)
+
+
+def run(mode, memory, pages):
+    scraper = RecipeScrapingService(extraction_memory=memory)
+    results = {}
+    rows = []
+    for host, host_pages in pages.items():
+        tried_before, searching_before = memory.tried, memory.searching
+        started = time.perf_counter()
+        extracted = [scraper.extract_recipe(html, url)[0] for url, html in host_pages]
+        elapsed = time.perf_counter() - started
+        results[host] = extracted
+        rows.append({
+            'mode': mode,
+            'host': host,
+            'pages': len(host_pages),
+            'extracted': sum(1 for recipe in extracted if recipe),
+            'ms_per_page': round(elapsed / len(host_pages) * 1000, 2),
+            'strategies_per_page': round((memory.tried - tried_before) / len(host_pages), 2),
+            'search_ms_per_page': round((memory.searching - searching_before) / len(host_pages) * 1000, 3),
+        })
+    memory.flush()
+    return rows, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark extraction with the per-host strategy memory')
+    parser.add_argument('--pages', type=int, default=200, help='pages per host')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    workdir = tempfile.mkdtemp(prefix='quickbasket-extraction-')
+    # Before models is imported, which binds the engine on import
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'recipes.db')}"
+    from models import engine, init_db
+    init_db()
+
+    generator = RecipeGenerator(seed=11)
+    pages = {host: [(f"https://{host}/recipes/{index}", render(host, generator)) for index in range(args.pages)]
+             for host in HOSTS}
+
+    print("=" * 72)
+    print("🍽️  QuickBasket - Extraction Memory Benchmark")
+    print("=" * 72)
+    print(f"{args.pages} pages per host")
+    print(f"{'mode':<8} {'host':<18} {'extracted':>9} {'ms/page':>8} {'tried/page':>10} {'search ms':>9} {'differs':>8}")
+    results = []
+    try:
+        baseline = None
+        for mode in ('cascade', 'cold', 'warm'):
+            if mode == 'cascade':
+                memory = CountingMemory(min_attempts=10 ** 9)
+            else:
+                memory = CountingMemory(engine, flush_interval=3600)
+            rows, extracted = run(mode, memory, pages)
+            if baseline is None:
+                baseline = extracted
+            for row in rows:
+                row['differs'] = sum(1 for ours, theirs in zip(extracted[row['host']], baseline[row['host']])
+                                     if ours != theirs)
+                results.append(row)
+                print(f"{mode:<8} {row['host']:<18} {row['extracted']:>9} {row['ms_per_page']:>8.2f} "
+                      f"{row['strategies_per_page']:>10.2f} {row['search_ms_per_page']:>9.3f} {row['differs']:>8}")
+    finally:
+        engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("=" * 72)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
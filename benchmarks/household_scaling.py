@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Household routing latency as the number of households grows.
+
+Creates N household databases (copies of one seeded template), then runs
+request-like work through models.HouseholdEngines: open a session for a
+household, list its recipes, close. Households are picked uniformly (the
+worst case for the LRU cache) or Zipf-distributed (a few busy families,
+a long tail of occasional ones).
+
+Examples:
+    python benchmarks/household_scaling.py
+    python benchmarks/household_scaling.py --households 10 100 1000 5000 --cache 128
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import HouseholdEngines, Recipe  # noqa: E402
+from seed_data import bulk_load  # noqa: E402
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def open_files() -> int:
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return -1
+
+
+def rss_mb() -> float:
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return -1.0
+
+
+def make_households(directory, count, template):
+    os.makedirs(directory, exist_ok=True)
+    for index in range(count):
+        path = os.path.join(directory, f"family-{index}.db")
+        if not os.path.exists(path):
+            shutil.copyfile(template, path)
+
+
+def pick_households(count, requests, distribution, rng):
+    if distribution == 'uniform':
+        return [rng.randrange(count) for _ in range(requests)]
+    # Zipf-like: household k is picked with weight 1 / (k + 1)
+    weights = [1.0 / (index + 1) for index in range(count)]
+    return rng.choices(range(count), weights=weights, k=requests)
+
+
+def run_level(directory, count, cache_size, requests, distribution, seed):
+    router = HouseholdEngines(directory, max_engines=cache_size, auto_create=False)
+    picks = pick_households(count, requests, distribution, random.Random(seed))
+    latencies = []
+    try:
+        for index in picks:
+            started = time.perf_counter()
+            session = router.get(f"family-{index}")[1]()
+            try:
+                session.query(Recipe).all()
+            finally:
+                session.close()
+            latencies.append(time.perf_counter() - started)
+        stats = router.snapshot()
+        files = open_files()
+    finally:
+        router.clear()
+    latencies.sort()
+    return {
+        'households': count,
+        'distribution': distribution,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'hit_rate': round(stats['hits'] / max(1, stats['hits'] + stats['misses']), 3),
+        'open_engines': stats['open_engines'],
+        'open_files': files,
+        'peak_rss_mb': round(rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-household database routing')
+    parser.add_argument('--households', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--cache', type=int, default=128, help='engines kept open (HOUSEHOLD_ENGINE_CACHE)')
+    parser.add_argument('--requests', type=int, default=5000, help='requests per measurement')
+    parser.add_argument('--recipes', type=int, default=50, help='recipes per household')
+    parser.add_argument('--distributions', nargs='+', choices=['zipf', 'uniform'], default=['zipf', 'uniform'])
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='quickbasket-households-')
+    template = os.path.join(workdir, 'template.db')
+    directory = os.path.join(workdir, 'households')
+
+    print("=" * 72)
+    print("🍽️  QuickBasket - Household Routing Benchmark")
+    print("=" * 72)
+    print(f"Engine cache: {args.cache}, {args.recipes} recipes per household, {args.requests:,} requests per row")
+    print(f"{'households':>10} {'distribution':>12} {'p50 ms':>8} {'p99 ms':>8} {'hit rate':>9} "
+          f"{'engines':>8} {'fds':>6} {'rss MB':>7}")
+    results = []
+    try:
+        bulk_load(template, args.recipes, progress=False)
+        for count in sorted(args.households):
+            make_households(directory, count, template)
+            for distribution in args.distributions:
+                result = run_level(directory, count, args.cache, args.requests, distribution, seed=count)
+                results.append(result)
+                print(f"{count:>10,} {distribution:>12} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+                      f"{result['hit_rate']:>9.1%} {result['open_engines']:>8} {result['open_files']:>6} "
+                      f"{result['peak_rss_mb']:>7.0f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("=" * 72)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Read latency while one client floods the scrape endpoint.
+
+Runs the app under server.py (waitress) against a slow stand-in recipe
+site. A few reader threads list recipes the whole time; in the overload
+phases many threads also post scrape requests as fast as they can, all
+from the same address, ignoring Retry-After. Phases:
+- idle:         readers only, the latency baseline
+- limits off:   RATE_LIMIT_ENABLED=0, scrapes take every server thread
+- limits on:    token buckets and admission control turn the flood away
+
+Examples:
+    python benchmarks/overload.py
+    python benchmarks/overload.py --threads 8 --scrapers 40 --site-latency 2 --duration 20
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from loadtest import StandInSite, free_port  # noqa: E402
+from seed_data import bulk_load  # noqa: E402
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def start_app(port, env, threads, log_path):
+    log = open(log_path, 'w')
+    process = subprocess.Popen(
+        [sys.executable, 'server.py', '--server', 'waitress', '--threads', str(threads),
+         '--host', '127.0.0.1', '--port', str(port), '--no-browser'],
+        cwd=BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited early, see {log_path}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/ready", timeout=1).ok:
+                return process, log
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"server did not become ready, see {log_path}")
+
+
+def run_phase(base_url, site, readers, scrapers, duration):
+    stop = threading.Event()
+    read_latencies = []
+    read_errors = []
+    scrape_statuses = Counter()
+    lock = threading.Lock()
+
+    def reader():
+        http = requests.Session()
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                ok = http.get(f"{base_url}/api/recipes?format=json", timeout=30).ok
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                (read_latencies if ok else read_errors).append(elapsed)
+            time.sleep(0.05)
+
+    def scraper():
+        http = requests.Session()
+        while not stop.is_set():
+            try:
+                status = http.post(f"{base_url}/api/recipes/url", json={'url': site.url(uuid.uuid4().hex)},
+                                   timeout=60).status_code
+            except requests.RequestException:
+                status = 'error'
+            with lock:
+                scrape_statuses[status] += 1
+            if status in (429, 503):
+                time.sleep(0.05)  # A rude client: retries almost at once
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=scraper) for _ in range(scrapers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    read_latencies.sort()
+    return {
+        'reads': len(read_latencies),
+        'read_errors': len(read_errors),
+        'read_p50_ms': round(percentile(read_latencies, 0.50) * 1000, 1),
+        'read_p99_ms': round(percentile(read_latencies, 0.99) * 1000, 1),
+        'scrapes_ok': scrape_statuses.get(201, 0) + scrape_statuses.get(200, 0),
+        'scrapes_429': scrape_statuses.get(429, 0),
+        'scrapes_503': scrape_statuses.get(503, 0),
+        'scrapes_other': sum(count for status, count in scrape_statuses.items()
+                             if status not in (200, 201, 429, 503)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure read latency while the scrape endpoint is flooded')
+    parser.add_argument('--threads', type=int, default=8, help='waitress threads')
+    parser.add_argument('--readers', type=int, default=2, help='threads listing recipes')
+    parser.add_argument('--scrapers', type=int, default=30, help='threads flooding the scrape endpoint')
+    parser.add_argument('--site-latency', type=float, default=1.0, help='stand-in site response delay (s)')
+    parser.add_argument('--duration', type=float, default=15, help='seconds per phase')
+    parser.add_argument('--recipes', type=int, default=200, help='recipes in the library')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='quickbasket-overload-')
+    db_path = os.path.join(workdir, 'recipes.db')
+    site = StandInSite(latency=args.site_latency).start()
+
+    print("=" * 72)
+    print("🍽️  QuickBasket - Overload Benchmark")
+    print("=" * 72)
+    print(f"{args.threads} server threads, {args.scrapers} scrape threads from one address, "
+          f"site latency {args.site_latency:.1f}s")
+    results = {}
+    try:
+        bulk_load(db_path, args.recipes, progress=False)
+        phases = [('idle', '1', 0), ('limits off', '0', args.scrapers), ('limits on', '1', args.scrapers)]
+        for name, enabled, scrapers in phases:
+            port = free_port()
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", RATE_LIMIT_ENABLED=enabled,
+                       BACKUP_INTERVAL_HOURS='0', PYTHONUNBUFFERED='1')
+            process, log = start_app(port, env, args.threads, os.path.join(workdir, f"server-{port}.log"))
+            try:
+                results[name] = run_phase(f"http://127.0.0.1:{port}", site, args.readers, scrapers, args.duration)
+            finally:
+                process.terminate()
+                process.wait(timeout=40)
+                log.close()
+    finally:
+        site.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'phase':<11} {'reads':>6} {'read p50':>9} {'read p99':>9} {'read errs':>9} "
+          f"{'scrape ok':>9} {'429':>6} {'503':>6}")
+    for name, result in results.items():
+        print(f"{name:<11} {result['reads']:>6} {result['read_p50_ms']:>7.1f}ms {result['read_p99_ms']:>7.1f}ms "
+              f"{result['read_errors']:>9} {result['scrapes_ok']:>9} {result['scrapes_429']:>6} "
+              f"{result['scrapes_503']:>6}")
+    print("=" * 72)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Read-heavy request mix with and without the data_version read cache.
+
+Seeds a recipe library, then sends the app a mix of list reads (recipes
+JSON, the grocery list page, the grocery list JSON) with occasional writes.
+Writes come from a separate process, standing in for another gunicorn
+worker. The first read after every write is checked for the new data, so
+"stale" counts cross-process invalidation failures and should stay 0.
+
+Examples:
+    python benchmarks/read_cache_mix.py
+    python benchmarks/read_cache_mix.py --recipes 5000 --requests 3000 --write-fraction 0.02
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seed_data import bulk_load  # noqa: E402
+
+READS = [
+    ('/api/recipes?format=json', 0.7),
+    ('/grocery_list', 0.2),
+    ('/api/grocery-list?format=json', 0.1),
+]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def writer(db_path, pipe):
+    """Another worker: renames a recipe per request and reports the new title"""
+    connection = sqlite3.connect(db_path, timeout=30)
+    max_id = connection.execute("SELECT MAX(id) FROM recipes").fetchone()[0]
+    rng = random.Random(1)
+    while True:
+        marker = pipe.recv()
+        if marker is None:
+            break
+        connection.execute("UPDATE recipes SET title = ? WHERE id = ?", (marker, rng.randint(1, max_id)))
+        connection.commit()
+        pipe.send(marker)
+    connection.close()
+
+
+def run_mode(client, read_cache, enabled, requests, write_fraction, pipe, seed):
+    read_cache.max_entries = 256 if enabled else 0
+    read_cache.clear()
+    read_cache.hits = read_cache.misses = 0
+    rng = random.Random(seed)
+    paths, weights = zip(*READS)
+    latencies = []
+    writes = stale = 0
+    pending_marker = None
+    started = time.perf_counter()
+    for index in range(requests):
+        if rng.random() < write_fraction:
+            pipe.send(f"Renamed {'cached' if enabled else 'uncached'} {index}")
+            pending_marker = pipe.recv()
+            writes += 1
+            continue
+        path = '/api/recipes?format=json' if pending_marker else rng.choices(paths, weights)[0]
+        began = time.perf_counter()
+        response = client.get(path)
+        latencies.append(time.perf_counter() - began)
+        if pending_marker:
+            titles = {recipe['title'] for recipe in response.get_json()['recipes']}
+            stale += pending_marker not in titles
+            pending_marker = None
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    snapshot = read_cache.snapshot()
+    lookups = snapshot['hits'] + snapshot['misses']
+    return {
+        'cache': 'on' if enabled else 'off',
+        'reads': len(latencies),
+        'writes': writes,
+        'reads_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'hit_rate': round(snapshot['hits'] / lookups, 3) if lookups else 0.0,
+        'stale_reads': stale,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the read cache on a read-heavy mix')
+    parser.add_argument('--recipes', type=int, default=1000, help='recipes in the library')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per mode')
+    parser.add_argument('--write-fraction', type=float, default=0.05, help='share of requests that write')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='quickbasket-read-cache-')
+    db_path = os.path.join(workdir, 'recipes.db')
+    print("=" * 72)
+    print("🍽️  QuickBasket - Read Cache Benchmark")
+    print("=" * 72)
+    results = []
+    writer_process = None
+    try:
+        # Before anything imports models, which binds the engine on import
+        os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+        os.environ['BACKUP_INTERVAL_HOURS'] = '0'
+        bulk_load(db_path, args.recipes, progress=False)
+        logging.disable(logging.INFO)
+        import app as app_module
+        from read_cache import read_cache
+        client = app_module.app.test_client()
+
+        parent_pipe, child_pipe = multiprocessing.Pipe()
+        writer_process = multiprocessing.Process(target=writer, args=(db_path, child_pipe), daemon=True)
+        writer_process.start()
+
+        print(f"{args.recipes:,} recipes, {args.requests:,} requests per mode, "
+              f"{args.write_fraction:.0%} writes from another process")
+        print(f"{'cache':<6} {'reads':>6} {'writes':>7} {'reads/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'hit rate':>9} {'stale':>6}")
+        for enabled in (False, True):
+            result = run_mode(client, read_cache, enabled, args.requests, args.write_fraction, parent_pipe, seed=7)
+            results.append(result)
+            print(f"{result['cache']:<6} {result['reads']:>6} {result['writes']:>7} {result['reads_per_second']:>9,.0f} "
+                  f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['hit_rate']:>9.1%} "
+                  f"{result['stale_reads']:>6}")
+        parent_pipe.send(None)
+    finally:
+        if writer_process is not None:
+            writer_process.join(timeout=5)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("=" * 72)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
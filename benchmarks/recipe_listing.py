@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Loading the recipe list: full ORM rows against column-only summaries.
+
+Seeds a library, then loads every recipe two ways: as Recipe instances
+turned into to_dict() (the bodies loaded and split, as the list page used
+to), and as RecipeSummary rows from a column-only select (what the page
+uses now). For each it reports the median load time, the peak memory
+while loading and the memory the loaded list keeps. It then times the
+page itself, rendered whole from a cold read cache, and the detail
+request that fetches one recipe's ingredients when they are opened.
+
+Examples:
+    python benchmarks/recipe_listing.py
+    python benchmarks/recipe_listing.py --recipes 100000 --repeat 3
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seed_data import bulk_load  # noqa: E402
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def measure(load, repeat):
+    """(median seconds, peak MB while loading, MB kept by the result, rows)"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        began = time.perf_counter()
+        rows = load()
+        timings.append(time.perf_counter() - began)
+        del rows
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        rows = load()
+        gc.collect()
+        kept, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return median(timings), (peak - baseline) / 1048576, (kept - baseline) / 1048576, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the recipe list read path')
+    parser.add_argument('--recipes', type=int, default=50000, help='recipes in the library')
+    parser.add_argument('--repeat', type=int, default=5, help='timed loads per path')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='quickbasket-recipe-listing-')
+    db_path = os.path.join(workdir, 'recipes.db')
+    print("=" * 72)
+    print("🍽️  QuickBasket - Recipe Listing Benchmark")
+    print("=" * 72)
+    results = []
+    try:
+        # Before anything imports models, which binds the engine on import
+        os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+        os.environ['BACKUP_INTERVAL_HOURS'] = '0'
+        os.environ['IMAGE_WORKERS'] = '0'
+        os.environ['PROFILE_SLOW_SAMPLE_RATE'] = '0'
+        os.environ['LOG_REQUESTS'] = '0'
+        bulk_load(db_path, args.recipes, progress=False)
+        logging.disable(logging.INFO)
+        import app as app_module
+        from models import Recipe, RecipeSummary, get_session
+        from read_cache import read_cache
+        from sqlalchemy import select
+        from sqlalchemy.orm import undefer_group
+
+        def full_rows():
+            session = get_session()
+            try:
+                return [recipe.to_dict() for recipe in session.query(Recipe).options(undefer_group('body'))]
+            finally:
+                session.close()
+
+        def summaries():
+            session = get_session()
+            try:
+                return [RecipeSummary(*row) for row in session.execute(select(*RecipeSummary.COLUMNS))]
+            finally:
+                session.close()
+
+        print(f"{args.recipes:,} recipes, median of {args.repeat} loads")
+        print(f"{'path':<28} {'rows':>7} {'ms':>9} {'peak MB':>9} {'kept MB':>9}")
+        for label, load in (('Recipe rows + to_dict()', full_rows), ('RecipeSummary (__slots__)', summaries)):
+            seconds, peak, kept, rows = measure(load, args.repeat)
+            results.append({'path': label, 'rows': rows, 'ms': round(seconds * 1000, 1),
+                            'peak_mb': round(peak, 1), 'kept_mb': round(kept, 1)})
+            print(f"{label:<28} {rows:>7,} {seconds * 1000:>9.1f} {peak:>9.1f} {kept:>9.1f}")
+
+        client = app_module.app.test_client()
+        app_module.app.config['STREAM_PAGES'] = False
+        timings = []
+        for _ in range(args.repeat):
+            read_cache.clear()
+            began = time.perf_counter()
+            body = client.get('/recipes/').get_data()
+            timings.append(time.perf_counter() - began)
+        page = {'path': 'GET /recipes/ (whole, cold)', 'ms': round(median(timings) * 1000, 1),
+                'body_kb': round(len(body) / 1024)}
+        results.append(page)
+        print(f"{page['path']:<28} {page['ms']:>9.1f} ms, {page['body_kb']:,} KB")
+
+        rng = random.Random(3)
+        timings = []
+        for _ in range(200):
+            began = time.perf_counter()
+            client.get(f"/api/recipes/{rng.randint(1, args.recipes)}")
+            timings.append(time.perf_counter() - began)
+        detail = {'path': 'GET /api/recipes/<id>', 'ms': round(median(timings) * 1000, 2)}
+        results.append(detail)
+        print(f"{detail['path']:<28} {detail['ms']:>9.2f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("=" * 72)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Concurrent imports of one shared recipe link, with and without coalescing.
+
+Several "devices" import the same recipe at once (some with share-tracking
+query parameters, which canonicalize to the same URL) from a slow local
+stand-in site:
+- single-flight: AsyncRecipeScraper.scrape_recipe, as the app calls it
+- independent:   the same scrape with coalescing bypassed
+
+Reports how many times the site was actually fetched and the coalesce
+ratio the scraper records in its metrics.
+
+Examples:
+    python benchmarks/scrape_coalescing.py
+    python benchmarks/scrape_coalescing.py --devices 2 5 20 50 --latency 1.0
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_scraper import AsyncRecipeScraper  # noqa: E402
+from loadtest import StandInSite  # noqa: E402
+
+
+class CountingSite(StandInSite):
+    """Stand-in site that counts the pages it serves"""
+
+    def __init__(self, latency):
+        super().__init__(latency=latency)
+        self.fetches = 0
+        self._lock = threading.Lock()
+
+    def render(self, path):
+        with self._lock:
+            self.fetches += 1
+        return super().render(path)
+
+
+def run(mode, scraper, site, devices):
+    url = site.url(uuid.uuid4().hex)
+    variants = [url, f"{url}?utm_source=whatsapp", f"{url}?fbclid={uuid.uuid4().hex}"]
+    if mode == 'single-flight':
+        scrape = scraper.scrape_recipe
+    else:
+        def scrape(target):
+            return scraper.run(scraper._scrape_recipe_async(target))
+
+    results = []
+    lock = threading.Lock()
+
+    def device(index):
+        result = scrape(variants[index % len(variants)])
+        with lock:
+            results.append(result)
+
+    before_fetches = site.fetches
+    before = scraper.flights.snapshot()
+    threads = [threading.Thread(target=device, args=(index,)) for index in range(devices)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    after = scraper.flights.snapshot()
+    leaders = after['leaders'] - before['leaders']
+    followers = after['followers'] - before['followers']
+    return {
+        'mode': mode,
+        'devices': devices,
+        'fetches': site.fetches - before_fetches,
+        'imported': sum(1 for recipe, error in results if recipe),
+        'seconds': round(elapsed, 3),
+        'coalesce_ratio': round(followers / (leaders + followers), 3) if leaders + followers else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark coalescing of concurrent imports of one recipe')
+    parser.add_argument('--devices', type=int, nargs='+', default=[1, 5, 20, 50], help='concurrent importers')
+    parser.add_argument('--latency', type=float, default=0.5, help='stand-in site response delay (s)')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    site = CountingSite(args.latency).start()
+    scraper = AsyncRecipeScraper(max_connections_per_host=max(args.devices))
+
+    print("=" * 60)
+    print("🍽️  QuickBasket - Shared Link Import Benchmark")
+    print("=" * 60)
+    print(f"Site latency: {args.latency * 1000:.0f} ms")
+    print(f"{'mode':<14} {'devices':>7} {'fetches':>8} {'imported':>9} {'seconds':>8} {'coalesced':>10}")
+    results = []
+    try:
+        for devices in args.devices:
+            for mode in ('independent', 'single-flight'):
+                result = run(mode, scraper, site, devices)
+                results.append(result)
+                print(f"{mode:<14} {devices:>7} {result['fetches']:>8} {result['imported']:>9} "
+                      f"{result['seconds']:>8.2f} {result['coalesce_ratio']:>10.0%}")
+    finally:
+        scraper.close()
+        site.stop()
+    print("=" * 60)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Recipe import throughput at increasing concurrency.
+
+Imports batches of URLs from a local stand-in recipe site with a fixed
+response delay, at 1, 10 and 100 URLs in flight, through:
+- async:   AsyncRecipeScraper.scrape_many (one event loop, pooled connections)
+- threads: the blocking RecipeScrapingService on a thread per in-flight URL
+
+Examples:
+    python benchmarks/scrape_concurrency.py
+    python benchmarks/scrape_concurrency.py --latency 0.5 --levels 1 10 100 200 --json scrape.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from async_scraper import AsyncRecipeScraper  # noqa: E402
+from loadtest import StandInSite  # noqa: E402
+from recipe_scraper import RecipeScrapingService  # noqa: E402
+
+
+def run_async(urls, concurrency, per_host):
+    scraper = AsyncRecipeScraper(max_connections=max(100, concurrency), max_connections_per_host=per_host)
+    try:
+        return scraper.scrape_many(urls, concurrency=concurrency)
+    finally:
+        scraper.close()
+
+
+def run_threads(urls, concurrency, per_host):
+    scraper = RecipeScrapingService()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(scraper.scrape_recipe, urls))
+
+
+ENGINES = {'async': run_async, 'threads': run_threads}
+
+
+def measure(engine, site, concurrency, count, per_host, run_id):
+    urls = [site.url(f"{engine}-{run_id}-{concurrency}-{index}") for index in range(count)]
+    started = time.perf_counter()
+    results = ENGINES[engine](urls, concurrency, per_host)
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for recipe, error in results if error or not recipe)
+    return {
+        'engine': engine,
+        'concurrency': concurrency,
+        'urls': count,
+        'seconds': round(elapsed, 3),
+        'imports_per_second': round((count - errors) / elapsed, 1),
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark recipe imports against a slow local site')
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 10, 100], help='URLs in flight')
+    parser.add_argument('--rounds', type=int, default=3, help='batches of `level` URLs per measurement')
+    parser.add_argument('--min-urls', type=int, default=20, help='lower bound on URLs per measurement')
+    parser.add_argument('--latency', type=float, default=0.25, help='stand-in site response delay (s)')
+    parser.add_argument('--per-host', type=int, default=None,
+                        help='async per-host connection cap (default: the highest level, '
+                             'since every URL here is on one host)')
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    # The scraper logs every page at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('urllib3').setLevel(logging.ERROR)
+
+    per_host = args.per_host or max(args.levels)
+    site = StandInSite(latency=args.latency).start()
+    run_id = int(time.time())
+
+    print("=" * 60)
+    print("🍽️  QuickBasket - Import Concurrency Benchmark")
+    print("=" * 60)
+    print(f"Site latency: {args.latency * 1000:.0f} ms, async per-host cap: {per_host}")
+    print(f"{'engine':<8} {'in flight':>9} {'urls':>6} {'seconds':>8} {'imports/s':>10} {'errors':>7}")
+
+    results = []
+    try:
+        for concurrency in args.levels:
+            count = max(args.min_urls, concurrency * args.rounds)
+            for engine in args.engines:
+                result = measure(engine, site, concurrency, count, per_host, run_id)
+                results.append(result)
+                print(f"{engine:<8} {concurrency:>9} {count:>6} {result['seconds']:>8.2f} "
+                      f"{result['imports_per_second']:>10.1f} {result['errors']:>7}")
+    finally:
+        site.stop()
+
+    print("=" * 60)
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
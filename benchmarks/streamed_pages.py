@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Time to first byte and peak memory of the recipe and grocery list pages,
+rendered whole or streamed.
+
+Seeds a library where every recipe is on the grocery list with one
+ingredient of its own, so both pages list at least --items rows, and serves
+the app with waitress on a local port so the timings include the socket.
+Each page is fetched in three modes: rendered whole from a cold read cache,
+rendered whole from a warm one, and streamed (lists longer than
+STREAM_CACHE_ROWS are never cached, so streaming always reads the
+database). Peak memory is the largest tracemalloc peak over a request,
+measured in a separate pass because tracing slows everything down.
+
+Examples:
+    python benchmarks/streamed_pages.py
+    python benchmarks/streamed_pages.py --items 50000 --requests 5
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seed_data import bulk_load  # noqa: E402
+
+PAGES = ['/recipes/', '/grocery_list']
+MODES = [
+    ('whole, cold cache', False, False),
+    ('whole, warm cache', False, True),
+    ('streamed', True, False),
+]
+
+
+def fetch(port, path):
+    """(seconds to the first body byte, seconds to the last, body bytes)"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    try:
+        began = time.perf_counter()
+        connection.request('GET', path)
+        response = connection.getresponse()
+        first = response.read(1)
+        first_byte = time.perf_counter() - began
+        size = len(first) + len(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"GET {path} returned {response.status}")
+        return first_byte, time.perf_counter() - began, size
+    finally:
+        connection.close()
+
+
+def run_mode(app, read_cache, port, path, streamed, warm, requests, trace):
+    app.config['STREAM_PAGES'] = streamed
+    read_cache.clear()
+    if warm:
+        fetch(port, path)
+    first_bytes, totals, peaks = [], [], []
+    size = 0
+    for _ in range(requests):
+        if not warm:
+            read_cache.clear()
+        if trace:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        first_byte, total, size = fetch(port, path)
+        if trace:
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        first_bytes.append(first_byte)
+        totals.append(total)
+    first_bytes.sort()
+    totals.sort()
+    return {
+        'ttfb_ms': round(first_bytes[len(first_bytes) // 2] * 1000, 1),
+        'total_ms': round(totals[len(totals) // 2] * 1000, 1),
+        'peak_mb': round(max(peaks) / 1048576, 1) if peaks else None,
+        'body_kb': round(size / 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streamed against whole page rendering')
+    parser.add_argument('--items', type=int, default=10000, help='recipes, and so grocery list items')
+    parser.add_argument('--requests', type=int, default=10, help='timed requests per page and mode')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='quickbasket-streamed-pages-')
+    db_path = os.path.join(workdir, 'recipes.db')
+    print("=" * 72)
+    print("🍽️  QuickBasket - Streamed Pages Benchmark")
+    print("=" * 72)
+    results = []
+    server = None
+    try:
+        # Before anything imports models, which binds the engine on import
+        os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+        os.environ['BACKUP_INTERVAL_HOURS'] = '0'
+        os.environ['IMAGE_WORKERS'] = '0'
+        os.environ['PROFILE_SLOW_SAMPLE_RATE'] = '0'
+        os.environ['LOG_REQUESTS'] = '0'
+        bulk_load(db_path, args.items, progress=False)
+        connection = sqlite3.connect(db_path)
+        connection.execute(
+            "UPDATE recipes SET last_added_to_grocery = created_at, "
+            "ingredients = ingredients || char(10) || 'Pantry item ' || id"
+        )
+        connection.commit()
+        connection.close()
+
+        logging.disable(logging.INFO)
+        import app as app_module
+        from read_cache import read_cache
+        from waitress import create_server
+
+        server = create_server(app_module.app, host='127.0.0.1', port=0, threads=4)
+        threading.Thread(target=server.run, daemon=True).start()
+        port = server.effective_port
+
+        print(f"{args.items:,} recipes on the grocery list, {args.requests} requests per page and mode "
+              f"(medians; peak is the largest)")
+        print(f"{'page':<15} {'mode':<18} {'TTFB ms':>9} {'total ms':>9} {'peak MB':>8} {'body KB':>8}")
+        for path in PAGES:
+            for label, streamed, warm in MODES:
+                result = run_mode(app_module.app, read_cache, port, path, streamed, warm, args.requests, trace=False)
+                tracemalloc.start()
+                try:
+                    traced = run_mode(app_module.app, read_cache, port, path, streamed, warm,
+                                      max(1, args.requests // 5), trace=True)
+                finally:
+                    tracemalloc.stop()
+                result.update(page=path, mode=label, peak_mb=traced['peak_mb'])
+                results.append(result)
+                print(f"{path:<15} {label:<18} {result['ttfb_ms']:>9.1f} {result['total_ms']:>9.1f} "
+                      f"{result['peak_mb']:>8.1f} {result['body_kb']:>8,}")
+    finally:
+        if server is not None:
+            server.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("=" * 72)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
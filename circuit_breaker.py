@@ -0,0 +1,196 @@
+"""
+Failure isolation for outbound recipe fetches.
+
+CircuitBreaker tracks consecutive failures for one host and short-circuits
+calls while the host is known to be down; HostCircuitBreakers keeps one
+breaker per host. NegativeCache remembers URLs that recently failed so that
+repeated imports of a known-bad page fail without touching the network.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open probe after a timeout"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 60.0,
+                 half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._total_failures = 0
+        self._total_rejections = 0
+        self._last_error = None
+
+    def allow_request(self) -> bool:
+        """Return True if a call may go out now; probes are rationed while half-open"""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    self._total_rejections += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._half_open_calls = 0
+            if self._state == self.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    self._total_rejections += 1
+                    return False
+                self._half_open_calls += 1
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._half_open_calls = 0
+
+    def record_failure(self, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._failures += 1
+            self._total_failures += 1
+            self._last_error = error
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._half_open_calls = 0
+
+    def _effective_state(self) -> Tuple[str, float]:
+        """(state, seconds until the next probe); caller holds the lock"""
+        if self._state != self.OPEN:
+            return self._state, 0.0
+        remaining = self.recovery_timeout - (time.monotonic() - self._opened_at)
+        if remaining <= 0:
+            return self.HALF_OPEN, 0.0
+        return self.OPEN, remaining
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets the next probe through"""
+        with self._lock:
+            return self._effective_state()[1]
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._effective_state()[0]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            state, retry_after = self._effective_state()
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'total_failures': self._total_failures,
+                'total_rejections': self._total_rejections,
+                'retry_after_seconds': round(retry_after, 1),
+                'last_error': self._last_error,
+            }
+
+
+class HostCircuitBreakers:
+    """One CircuitBreaker per host, bounded so a crawl of many hosts can't grow it forever"""
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 60.0,
+                 max_hosts: int = 1024):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_hosts = max_hosts
+        self._lock = threading.Lock()
+        self._breakers: 'OrderedDict[str, CircuitBreaker]' = OrderedDict()
+
+    def get(self, host: str) -> CircuitBreaker:
+        host = host.lower()
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.recovery_timeout)
+                self._breakers[host] = breaker
+                if len(self._breakers) > self.max_hosts:
+                    self._evict()
+            else:
+                self._breakers.move_to_end(host)
+            return breaker
+
+    def _evict(self) -> None:
+        # Prefer dropping the least recently used healthy host; keep open breakers
+        for host, breaker in self._breakers.items():
+            if breaker.state == CircuitBreaker.CLOSED:
+                del self._breakers[host]
+                return
+        self._breakers.popitem(last=False)
+
+    def reset(self, host: Optional[str] = None) -> None:
+        with self._lock:
+            if host is None:
+                self._breakers.clear()
+            else:
+                self._breakers.pop(host.lower(), None)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            items = list(self._breakers.items())
+        return {host: breaker.snapshot() for host, breaker in items}
+
+
+class NegativeCache:
+    """TTL cache of keys (canonical URLs) that recently failed, with the error to replay"""
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached error for key if it hasn't expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, error = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return error
+
+    def add(self, key: str, error: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, error)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            live: List[Dict] = [
+                {'url': key, 'error': error, 'expires_in_seconds': round(expires_at - now, 1)}
+                for key, (expires_at, error) in self._entries.items()
+                if expires_at > now
+            ]
+            return {'ttl_seconds': self.ttl, 'hits': self.hits, 'misses': self.misses, 'entries': live}
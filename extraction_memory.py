@@ -0,0 +1,260 @@
+"""
+Per-host memory of which extraction strategies work.
+
+Recipe sites are built from templates, so the strategy that found a recipe
+on one page of a host nearly always finds it on the next. ExtractionMemory
+counts, per host and stage, how often each strategy was tried, how often it
+worked and how long it took, and orders the cascade from that:
+- proven strategies (worked before) run first, best success rate first
+- strategies without enough attempts yet keep their original order
+- strategies that never worked on the host run last, so they are skipped
+  whenever anything else finds the recipe
+
+Stages and their strategies (path, pattern_index):
+    page          ('site', -1) for hosts with site selectors, ('json_ld', -1), ('fields', -1)
+    ingredients   ('microdata', -1), ('pattern', 0..5)
+    instructions  ('microdata', -1), ('pattern', 0..6)
+
+With an engine the counts are kept in the extraction_stats table, so every
+worker and restart starts from what is already known. Workers add their own
+counts to the table (never overwrite it) every EXTRACTION_STATS_FLUSH_SECONDS.
+
+Settings (environment):
+    EXTRACTION_STATS_MIN_ATTEMPTS    attempts before a strategy counts as proven or failing (3)
+    EXTRACTION_STATS_FLUSH_SECONDS   how often counts are written to the database (30)
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+Strategy = Tuple[str, int]
+
+
+class _Counts:
+    __slots__ = ('attempts', 'successes', 'seconds')
+
+    def __init__(self, attempts: int = 0, successes: int = 0, seconds: float = 0.0):
+        self.attempts = attempts
+        self.successes = successes
+        self.seconds = seconds
+
+    def add(self, other: '_Counts') -> None:
+        self.attempts += other.attempts
+        self.successes += other.successes
+        self.seconds += other.seconds
+
+
+class ExtractionMemory:
+    """Learns, per host, which extraction strategies find recipes"""
+
+    def __init__(self, engine=None, min_attempts: Optional[int] = None, flush_interval: Optional[float] = None):
+        self.engine = engine
+        self.min_attempts = min_attempts if min_attempts is not None else \
+            int(os.environ.get('EXTRACTION_STATS_MIN_ATTEMPTS', 3))
+        self.flush_interval = flush_interval if flush_interval is not None else \
+            float(os.environ.get('EXTRACTION_STATS_FLUSH_SECONDS', 30))
+        self._lock = threading.Lock()
+        # host -> (stage, path, pattern_index) -> counts, totals including unflushed ones
+        self._hosts: Dict[str, Dict[Tuple[str, str, int], _Counts]] = {}
+        # Counts recorded here and not yet added to the table
+        self._pending: Dict[Tuple[str, str, str, int], _Counts] = {}
+        self._last_success: Dict[Tuple[str, str, str, int], datetime] = {}
+        self._last_flush = time.monotonic()
+        if engine is not None:
+            atexit.register(self.flush)
+
+    def order(self, host: str, stage: str, strategies: Iterable[Strategy]) -> List[Strategy]:
+        """strategies in the order to try them on host"""
+        if not host:
+            return list(strategies)
+        counts = self._host(host)
+
+        def rank(item):
+            position, (path, pattern_index) = item
+            seen = counts.get((stage, path, pattern_index))
+            if seen is None or seen.attempts < self.min_attempts:
+                return (1, 0.0, 0.0, position)
+            if not seen.successes:
+                return (2, 0.0, 0.0, position)
+            return (0, -seen.successes / seen.attempts, seen.seconds / seen.attempts, position)
+
+        return [strategy for _, strategy in sorted(enumerate(strategies), key=rank)]
+
+    def record(self, host: str, stage: str, strategy: Strategy, success: bool, seconds: float) -> None:
+        """One attempt of strategy on a page from host"""
+        if not host:
+            return
+        path, pattern_index = strategy
+        succeeded = datetime.utcnow() if success else None
+        self.merge({(host, stage, path, pattern_index): (1, int(success), seconds, succeeded)})
+
+    def known(self, host: str) -> Dict[Tuple[str, str, int], Tuple[int, int, float]]:
+        """host's counts as plain tuples, for a parse worker process to start from"""
+        counts = self._host(host)
+        with self._lock:
+            return {key: (seen.attempts, seen.successes, seen.seconds) for key, seen in counts.items()}
+
+    def seed(self, host: str, known: Dict[Tuple[str, str, int], Tuple[int, int, float]]) -> None:
+        """Start host from counts learned elsewhere (see known())"""
+        with self._lock:
+            self._hosts[host] = {key: _Counts(*values) for key, values in known.items()}
+
+    def take_pending(self) -> Dict[Tuple[str, str, str, int], Tuple[int, int, float, Optional[datetime]]]:
+        """Counts recorded here since the last call, as plain tuples for merge() in another process"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            last_success, self._last_success = self._last_success, {}
+        return {key: (counts.attempts, counts.successes, counts.seconds, last_success.get(key))
+                for key, counts in pending.items()}
+
+    def merge(self, pending: Dict[Tuple[str, str, str, int], Tuple[int, int, float, Optional[datetime]]]) -> None:
+        """Add counts recorded elsewhere (see take_pending()) as if they were recorded here"""
+        with self._lock:
+            for key, (attempts, successes, seconds, succeeded) in pending.items():
+                host, stage, path, pattern_index = key
+                attempt = _Counts(attempts, successes, seconds)
+                counts = self._hosts.setdefault(host, {})
+                counts.setdefault((stage, path, pattern_index), _Counts()).add(attempt)
+                self._pending.setdefault(key, _Counts()).add(attempt)
+                if succeeded and (key not in self._last_success or succeeded > self._last_success[key]):
+                    self._last_success[key] = succeeded
+            due = self.engine is not None and time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def _host(self, host: str) -> Dict[Tuple[str, str, int], _Counts]:
+        with self._lock:
+            counts = self._hosts.get(host)
+        if counts is not None:
+            return counts
+        loaded = self._load(host)
+        with self._lock:
+            # Another thread may have loaded the host meanwhile; its copy wins
+            return self._hosts.setdefault(host, loaded)
+
+    def _load(self, host: str) -> Dict[Tuple[str, str, int], _Counts]:
+        if self.engine is None:
+            return {}
+        from models import ExtractionStat
+
+        table = ExtractionStat.__table__
+        try:
+            with self.engine.connect() as connection:
+                rows = connection.execute(
+                    select(table.c.stage, table.c.path, table.c.pattern_index,
+                           table.c.attempts, table.c.successes, table.c.total_seconds)
+                    .where(table.c.host == host)
+                ).fetchall()
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not load extraction stats for {host}: {e}")
+            return {}
+        return {(stage, path, pattern_index): _Counts(attempts, successes, seconds)
+                for stage, path, pattern_index, attempts, successes, seconds in rows}
+
+    def flush(self) -> int:
+        """Add pending counts to the extraction_stats table; returns rows written"""
+        if self.engine is None:
+            return 0
+        from models import ExtractionStat
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            last_success, self._last_success = self._last_success, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        table = ExtractionStat.__table__
+        now = datetime.utcnow()
+        try:
+            with self.engine.begin() as connection:
+                for (host, stage, path, pattern_index), counts in pending.items():
+                    where = ((table.c.host == host) & (table.c.stage == stage) &
+                             (table.c.path == path) & (table.c.pattern_index == pattern_index))
+                    values = {
+                        'attempts': table.c.attempts + counts.attempts,
+                        'successes': table.c.successes + counts.successes,
+                        'total_seconds': table.c.total_seconds + counts.seconds,
+                        'updated_at': now,
+                    }
+                    succeeded = last_success.get((host, stage, path, pattern_index))
+                    if succeeded:
+                        values['last_success_at'] = succeeded
+                    if connection.execute(update(table).where(where).values(**values)).rowcount:
+                        continue
+                    row = {
+                        'host': host, 'stage': stage, 'path': path, 'pattern_index': pattern_index,
+                        'attempts': counts.attempts, 'successes': counts.successes,
+                        'total_seconds': counts.seconds, 'last_success_at': succeeded, 'updated_at': now,
+                    }
+                    try:
+                        with connection.begin_nested():
+                            connection.execute(insert(table), row)
+                    except IntegrityError:
+                        # Another worker inserted the row first
+                        connection.execute(update(table).where(where).values(**values))
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not save extraction stats, keeping them for the next flush: {e}")
+            with self._lock:
+                for key, counts in pending.items():
+                    self._pending.setdefault(key, _Counts()).add(counts)
+                for key, succeeded in last_success.items():
+                    self._last_success.setdefault(key, succeeded)
+            return 0
+        return len(pending)
+
+    def forget(self, host: Optional[str] = None) -> None:
+        """Drop what is known about host (or every host), here and in the table"""
+        with self._lock:
+            if host:
+                self._hosts.pop(host, None)
+                self._pending = {key: counts for key, counts in self._pending.items() if key[0] != host}
+                self._last_success = {key: at for key, at in self._last_success.items() if key[0] != host}
+            else:
+                self._hosts.clear()
+                self._pending.clear()
+                self._last_success.clear()
+        if self.engine is None:
+            return
+        from models import ExtractionStat
+
+        table = ExtractionStat.__table__
+        statement = table.delete()
+        if host:
+            statement = statement.where(table.c.host == host)
+        with self.engine.begin() as connection:
+            connection.execute(statement)
+
+    def snapshot(self, host: Optional[str] = None) -> Dict:
+        """Per host and stage: each strategy's counts, in the order they would be tried"""
+        if host:
+            self._host(host)
+        with self._lock:
+            hosts = {name: dict(counts) for name, counts in self._hosts.items() if not host or name == host}
+        result = {}
+        for name, counts in sorted(hosts.items()):
+            stages: Dict[str, List[Dict]] = {}
+            for (stage, path, pattern_index), seen in counts.items():
+                stages.setdefault(stage, []).append({
+                    'path': path,
+                    'pattern_index': pattern_index,
+                    'attempts': seen.attempts,
+                    'successes': seen.successes,
+                    'avg_ms': round(seen.seconds / seen.attempts * 1000, 2) if seen.attempts else 0.0,
+                })
+            for stage, entries in stages.items():
+                ordered = self.order(name, stage, [(e['path'], e['pattern_index']) for e in entries])
+                position = {strategy: index for index, strategy in enumerate(ordered)}
+                entries.sort(key=lambda e: position[(e['path'], e['pattern_index'])])
+            result[name] = stages
+        return result
@@ -0,0 +1,323 @@
+"""
+Recipe photos: downloaded once, shrunk to a thumbnail and kept on disk under
+the SHA-256 of the downloaded image, so recipes sharing a photo share the
+file. Browsers get the thumbnail from /images/<sha256>.jpg (immutable, so
+cached for a year), never the full-size photo from the recipe site.
+
+Downloading and resizing happen in a small process pool in the background:
+the import request returns as soon as the recipe is saved, and the
+recipe's image_hash is filled in when its thumbnail is ready. A photo URL
+another recipe already has a thumbnail for is never downloaded again.
+
+Settings (environment):
+- IMAGE_DIR: where thumbnails are kept (default images/ next to recipes.db)
+- IMAGE_WORKERS: processes downloading and resizing (default 1, 0 turns capture off)
+- IMAGE_MAX_BYTES: larger photos are skipped (default 10 MB)
+- IMAGE_THUMBNAIL_SIZE: longest side of a thumbnail in pixels (default 320)
+- IMAGE_MAX_PENDING: photos waiting for a worker before new ones are skipped (default 100)
+
+Recipes imported with recipe_io.py keep their photo URL but not the thumbnail:
+    python image_store.py backfill
+    python image_store.py --db /tmp/capacity.db backfill --workers 4
+"""
+
+import argparse
+import atexit
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_NAME_RE = re.compile(r'^([0-9a-f]{64})\.jpg$')
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8',
+}
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def thumbnail_url(image_hash: Optional[str]) -> Optional[str]:
+    """Path a thumbnail is served from (see the recipe_thumbnail route)"""
+    return f"/images/{image_hash}.jpg" if image_hash else None
+
+
+class ImageStore:
+    """Thumbnails on disk, named by content hash and fanned out over subdirectories"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def relative_path(self, image_hash: str) -> str:
+        return os.path.join(image_hash[:2], f"{image_hash}.jpg")
+
+    def path(self, image_hash: str) -> str:
+        return os.path.join(self.directory, self.relative_path(image_hash))
+
+    def exists(self, image_hash: str) -> bool:
+        return os.path.exists(self.path(image_hash))
+
+    def save(self, image_hash: str, data: bytes) -> None:
+        """Write a thumbnail atomically; readers never see half a file"""
+        path = self.path(image_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def _download(url: str, max_bytes: int, timeout: float) -> bytes:
+    with requests.get(url, headers=REQUEST_HEADERS, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '')
+        if content_type and not content_type.startswith('image/'):
+            raise ValueError(f"Not an image: {content_type}")
+        if int(response.headers.get('Content-Length') or 0) > max_bytes:
+            raise ValueError(f"Image larger than {max_bytes} bytes")
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            body.extend(chunk)
+            if len(body) > max_bytes:
+                raise ValueError(f"Image larger than {max_bytes} bytes")
+    return bytes(body)
+
+
+def render_thumbnail(data: bytes, size: int, quality: int = 82) -> bytes:
+    """JPEG thumbnail whose longest side is at most size pixels"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Lets the JPEG decoder skip most of the pixels of a large photo
+        image.draft('RGB', (size * 2, size * 2))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.thumbnail((size, size), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def capture_image(url: str, directory: str, max_bytes: int, size: int, timeout: float = 15) -> Tuple[str, bool]:
+    """Download a photo and store its thumbnail (runs in a worker process).
+    Returns (image_hash, created); created is False when the same photo was already stored."""
+    data = _download(url, max_bytes, timeout)
+    image_hash = hashlib.sha256(data).hexdigest()
+    store = ImageStore(directory)
+    if store.exists(image_hash):
+        return image_hash, False
+    store.save(image_hash, render_thumbnail(data, size))
+    return image_hash, True
+
+
+class ImagePipeline:
+    """Hands recipe photos to the worker processes and records the results"""
+
+    def __init__(self, store: ImageStore, workers: int = 1, max_bytes: int = 10 * 1024 * 1024,
+                 thumbnail_size: int = 320, max_pending: int = 100):
+        # Imported here so worker processes, which import this module, stay out of the metrics
+        from metrics import IMAGE_CAPTURES
+
+        self._captures = IMAGE_CAPTURES
+        self.store = store
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        # Photo URL -> recipes (id, household) waiting for it, so one download serves them all
+        self._pending: Dict[str, List[Tuple[int, Optional[str]]]] = {}
+        atexit.register(self.shutdown)
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use, and again in a forked server process
+        if self._executor is None or self._pid != os.getpid():
+            # Not plain fork: the server process has threads (and their locks) a fork would copy
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            self._pid = os.getpid()
+        return self._executor
+
+    def capture(self, session, recipe, household: Optional[str] = None) -> None:
+        """Give a just-saved recipe its thumbnail: at once when another recipe
+        already has this photo, otherwise once a worker has made it"""
+        from models import Recipe
+
+        if not self.enabled or not recipe.image_url or recipe.image_hash:
+            return
+        known = (session.query(Recipe.image_hash)
+                 .filter(Recipe.image_url == recipe.image_url, Recipe.image_hash.isnot(None))
+                 .first())
+        if known and self.store.exists(known[0]):
+            recipe.image_hash = known[0]
+            session.commit()
+            self._captures.inc(outcome='shared')
+            return
+
+        url = recipe.image_url
+        with self._lock:
+            waiting = self._pending.get(url)
+            if waiting is not None:
+                waiting.append((recipe.id, household))
+                return
+            if len(self._pending) >= self.max_pending:
+                self._captures.inc(outcome='dropped')
+                logger.warning(f"Image queue full, not capturing {url}")
+                return
+            self._pending[url] = [(recipe.id, household)]
+            try:
+                future = self._get_executor().submit(
+                    capture_image, url, self.store.directory, self.max_bytes, self.thumbnail_size)
+            except Exception as e:
+                del self._pending[url]
+                self._captures.inc(outcome='failed')
+                logger.error(f"Could not start image capture for {url}: {e}")
+                return
+        future.add_done_callback(lambda done: self._finish(url, done))
+
+    def _finish(self, url: str, future: Future) -> None:
+        with self._lock:
+            recipes = self._pending.pop(url, [])
+        try:
+            image_hash, created = future.result()
+        except Exception as e:
+            self._captures.inc(outcome='failed')
+            logger.warning(f"Could not capture image {url}: {e}")
+            return
+        self._captures.inc(outcome='stored' if created else 'shared')
+        by_household: Dict[Optional[str], List[int]] = {}
+        for recipe_id, household in recipes:
+            by_household.setdefault(household, []).append(recipe_id)
+        for household, recipe_ids in by_household.items():
+            try:
+                self._record(household, recipe_ids, image_hash)
+            except Exception as e:
+                logger.error(f"Could not save image for recipes {recipe_ids}: {e}")
+
+    def _record(self, household: Optional[str], recipe_ids: List[int], image_hash: str) -> None:
+        from models import Recipe, Session, households
+
+        session = Session() if household is None else households.get(household)[1]()
+        try:
+            (session.query(Recipe)
+             .filter(Recipe.id.in_(recipe_ids))
+             .update({Recipe.image_hash: image_hash}, synchronize_session=False))
+            session.commit()
+        finally:
+            session.close()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def shutdown(self) -> None:
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def pipeline_from_env(database_path: str) -> ImagePipeline:
+    """The app's image pipeline, configured from the environment"""
+    directory = os.environ.get('IMAGE_DIR') or os.path.join(os.path.dirname(database_path), 'images')
+    return ImagePipeline(
+        ImageStore(directory),
+        workers=int(os.environ.get('IMAGE_WORKERS', 1)),
+        max_bytes=int(os.environ.get('IMAGE_MAX_BYTES', 10 * 1024 * 1024)),
+        thumbnail_size=int(os.environ.get('IMAGE_THUMBNAIL_SIZE', 320)),
+        max_pending=int(os.environ.get('IMAGE_MAX_PENDING', 100)),
+    )
+
+
+def backfill(engine, pipeline: ImagePipeline) -> Counter:
+    """Make the missing thumbnails of every recipe that has a photo URL, e.g. after
+    an import or on a new disk (recipes whose thumbnail file is gone count too)"""
+    from sqlalchemy import select, update
+    from models import Recipe
+
+    with engine.connect() as connection:
+        rows = connection.execute(select(Recipe.id, Recipe.image_url, Recipe.image_hash).where(
+            Recipe.image_url.isnot(None))).fetchall()
+    by_url: Dict[str, List[int]] = {}
+    for recipe_id, image_url, image_hash in rows:
+        if not image_hash or not pipeline.store.exists(image_hash):
+            by_url.setdefault(image_url, []).append(recipe_id)
+
+    counts: Counter = Counter()
+    with ProcessPoolExecutor(max_workers=max(1, pipeline.workers)) as pool:
+        futures = {pool.submit(capture_image, url, pipeline.store.directory, pipeline.max_bytes,
+                               pipeline.thumbnail_size): url for url in by_url}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                image_hash, created = future.result()
+            except Exception as e:
+                counts['failed'] += 1
+                print(f"   ❌ {url}: {e}", file=sys.stderr)
+                continue
+            counts['stored' if created else 'shared'] += 1
+            with engine.begin() as connection:
+                connection.execute(update(Recipe).where(Recipe.id.in_(by_url[url])).values(image_hash=image_hash))
+            counts['recipes'] += len(by_url[url])
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage QuickBasket recipe photo thumbnails')
+    parser.add_argument('--db', help='SQLite database file or database URL (default: the app database / DATABASE_URL)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    backfill_parser = commands.add_parser('backfill', help='make missing thumbnails, e.g. after recipe_io.py import')
+    backfill_parser.add_argument('--workers', type=int, help='download processes (default: IMAGE_WORKERS or 1)')
+    args = parser.parse_args()
+
+    if args.db:
+        from models import build_engine, db_path, prepare_database
+        engine = build_engine(args.db if '://' in args.db else f"sqlite:///{args.db}")
+        prepare_database(engine)
+    else:
+        from models import db_path, engine, init_db
+        init_db()
+    pipeline = pipeline_from_env(engine.url.database if engine.url.get_backend_name() == 'sqlite' else db_path)
+    if args.workers:
+        pipeline.workers = args.workers
+
+    started = time.perf_counter()
+    counts = backfill(engine, pipeline)
+    print(f"✅ Thumbnails for {counts['recipes']:,} recipes in {time.perf_counter() - started:.2f}s: "
+          f"{counts['stored']:,} new, {counts['shared']:,} already stored, {counts['failed']:,} failed")
+    print(f"   Stored in {pipeline.store.directory}")
+    if counts['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
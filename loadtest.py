@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+QuickBasket Load Test
+Starts the app under waitress or gunicorn against a throwaway SQLite
+database, seeds it with synthetic recipes, replays a realistic request mix
+and reports throughput and p50/p95/p99 latency per route.
+
+Everything runs on this machine: recipe imports scrape a local stand-in
+recipe site instead of the internet.
+
+Examples:
+    python loadtest.py --server waitress --recipes 5000 --concurrency 16
+    python loadtest.py --server both --duration 60 --json results.json
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from seed_data import RecipeGenerator, bulk_load
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Route name -> relative weight; each route maps to a Workload._<route> method
+DEFAULT_MIX = {
+    'list_recipes_json': 30,
+    'recipes_page': 15,
+    'grocery_list': 15,
+    'add_to_list': 15,
+    'manual_add': 10,
+    'scrape': 10,
+    'health': 5,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class StandInSite:
+    """Local recipe website the scrape requests point at"""
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                time.sleep(site.latency)
+                body = site.render(self.path).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 256  # The default backlog of 5 drops bursts of connections
+
+        self.server = Server(('127.0.0.1', free_port()), Handler)
+        self.port = self.server.server_address[1]
+
+    def url(self, slug: str) -> str:
+        return f"http://127.0.0.1:{self.port}/recipes/{slug}/"
+
+    def render(self, path: str) -> str:
+        generator = RecipeGenerator(seed=zlib.crc32(path.encode()))
+        rng = generator.rng
+        title = generator.title()
+        ingredients = generator.ingredients(rng.randint(5, 12))
+        steps = generator.steps(rng.randint(3, 8))
+        filler = '<p>' + ' '.join(generator.step() for _ in range(40)) + '</p>'
+        if rng.random() < 0.7:
+            # Most real sites publish JSON-LD
+            recipe_ld = json.dumps({
+                '@context': 'https://schema.org', '@type': 'Recipe', 'name': title,
+                'recipeIngredient': ingredients,
+                'recipeInstructions': [{'@type': 'HowToStep', 'text': step} for step in steps],
+            })
+            return (f'<html><head><title>{title}</title>'
+                    f'<script type="application/ld+json">{recipe_ld}</script></head>'
+                    f'<body><h1>{title}</h1>{filler * 3}</body></html>')
+        items = ''.join(f'<li itemprop="recipeIngredient">{item}</li>' for item in ingredients)
+        method = ''.join(f'<li itemprop="recipeInstructions">{step}</li>' for step in steps)
+        return (f'<html><head><title>{title}</title></head><body>{filler}'
+                f'<div itemscope itemtype="http://schema.org/Recipe"><h1 itemprop="name">{title}</h1>'
+                f'<ul>{items}</ul><ol>{method}</ol></div>{filler}</body></html>')
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class AppServer:
+    """The QuickBasket app running as a child process"""
+
+    def __init__(self, mode: str, port: int, env: dict, workers: int, threads: int, log_path: str):
+        self.mode = mode
+        self.port = port
+        self.log_path = log_path
+        if mode == 'waitress':
+            command = [sys.executable, '-m', 'waitress', f'--port={port}', '--host=127.0.0.1',
+                       f'--threads={threads}', 'app:app']
+        elif mode.startswith('gunicorn'):
+            # gunicorn silently turns sync workers into gthread when threads > 1
+            worker_class = 'gthread' if mode == 'gunicorn-gthread' else 'sync'
+            command = [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}',
+                       '--workers', str(workers), '--worker-class', worker_class,
+                       '--threads', str(threads if worker_class == 'gthread' else 1), '--timeout', '60']
+        else:
+            raise ValueError(f"Unknown server mode: {mode}")
+        self.command = command
+        self.env = env
+        self.process = None
+
+    def start(self, timeout: float = 60.0):
+        self._log = open(self.log_path, 'w')
+        self.process = subprocess.Popen(self.command, cwd=BASE_DIR, env=self.env,
+                                        stdout=self._log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.mode} exited early, see {self.log_path}")
+            try:
+                if requests.get(f"http://127.0.0.1:{self.port}/health", timeout=1).ok:
+                    return self
+            except requests.RequestException:
+                time.sleep(0.2)
+        raise RuntimeError(f"{self.mode} did not become healthy in {timeout}s, see {self.log_path}")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self._log.close()
+
+
+class Workload:
+    """Issues the request mix from one client thread"""
+
+    def __init__(self, base_url: str, site: StandInSite, recipe_count: int, mix: dict, seed: int):
+        self.base_url = base_url
+        self.site = site
+        self.recipe_count = max(recipe_count, 1)
+        self.routes = list(mix)
+        self.weights = [mix[route] for route in self.routes]
+        self.rng = random.Random(seed)
+        self.generator = RecipeGenerator(seed=seed)
+        self.http = requests.Session()
+        self.scraped = []
+
+    def run_one(self):
+        route = self.rng.choices(self.routes, self.weights)[0]
+        started = time.perf_counter()
+        try:
+            response = getattr(self, f"_{route}")()
+            ok = response.status_code < 500
+        except requests.RequestException:
+            ok = False
+        return route, time.perf_counter() - started, ok
+
+    def _list_recipes_json(self):
+        return self.http.get(f"{self.base_url}/api/recipes?format=json", timeout=60)
+
+    def _recipes_page(self):
+        return self.http.get(f"{self.base_url}/", timeout=60)
+
+    def _grocery_list(self):
+        return self.http.get(f"{self.base_url}/grocery_list", timeout=60)
+
+    def _health(self):
+        return self.http.get(f"{self.base_url}/health", timeout=60)
+
+    def _add_to_list(self):
+        ids = [str(self.rng.randint(1, self.recipe_count)) for _ in range(self.rng.randint(1, 5))]
+        return self.http.post(f"{self.base_url}/add-to-grocery-list", data={'recipe_ids': ids}, timeout=60)
+
+    def _manual_add(self):
+        return self.http.post(f"{self.base_url}/add-recipe-manual", data={
+            'title': f"Load Test Recipe {uuid.uuid4().hex[:8]}",
+            'ingredients': '\n'.join(self.generator.ingredients(6)),
+            'instructions': '\n'.join(self.generator.steps(4)),
+        }, allow_redirects=False, timeout=60)
+
+    def _scrape(self):
+        # Mostly new pages, some re-shares of pages already imported
+        if self.scraped and self.rng.random() < 0.2:
+            url = self.rng.choice(self.scraped)
+        else:
+            url = self.site.url(uuid.uuid4().hex)
+            self.scraped.append(url)
+        return self.http.post(f"{self.base_url}/api/recipes/url", json={'url': url}, timeout=60)
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest rank; rounded first so 0.9 * 10 (9.000000000000002) is rank 9, not 10
+    rank = math.ceil(round(fraction * len(sorted_values), 9))
+    index = min(len(sorted_values) - 1, max(0, rank - 1))
+    return sorted_values[index]
+
+
+def run_load(base_url, site, recipe_count, mix, concurrency, duration, warmup):
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    stop_at = time.monotonic() + warmup + duration
+    measure_from = time.monotonic() + warmup
+
+    def client(worker_id):
+        workload = Workload(base_url, site, recipe_count, mix, seed=worker_id)
+        while time.monotonic() < stop_at:
+            route, elapsed, ok = workload.run_one()
+            if time.monotonic() < measure_from:
+                continue
+            with lock:
+                samples[route].append(elapsed)
+                if not ok:
+                    errors[route] += 1
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    report = {}
+    for route in sorted(samples):
+        values = sorted(samples[route])
+        report[route] = {
+            'requests': len(values),
+            'errors': errors[route],
+            'throughput_rps': len(values) / duration,
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+        }
+    total = sum(len(values) for values in samples.values())
+    report['_total'] = {
+        'requests': total,
+        'errors': sum(errors.values()),
+        'throughput_rps': total / duration,
+    }
+    return report
+
+
+def print_report(mode: str, report: dict) -> None:
+    print(f"\n📊 {mode}")
+    print(f"{'route':<20}{'reqs':>8}{'errs':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, row in report.items():
+        if route.startswith('_'):
+            continue
+        print(f"{route:<20}{row['requests']:>8}{row['errors']:>6}{row['throughput_rps']:>9.1f}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+    total = report['_total']
+    print(f"{'TOTAL':<20}{total['requests']:>8}{total['errors']:>6}{total['throughput_rps']:>9.1f}")
+
+
+def run_mode(mode, args, site, mix):
+    workdir = tempfile.mkdtemp(prefix='quickbasket-load-')
+    try:
+        db_path = os.path.join(workdir, 'load.db')
+        database_url = f"sqlite:///{db_path}"
+        print(f"🌱 Seeding {args.recipes} recipes for {mode}...")
+        bulk_load(db_path, args.recipes, progress=False)
+
+        port = free_port()
+        # One client address sends everything, so rate limits would cap the
+        # measurement; benchmarks/overload.py covers them
+        env = dict(os.environ, DATABASE_URL=database_url,
+                   METRICS_DIR=os.path.join(workdir, 'metrics'), PYTHONUNBUFFERED='1',
+                   RATE_LIMIT_ENABLED=os.environ.get('RATE_LIMIT_ENABLED', '0'))
+        server = AppServer(mode, port, env, args.workers, args.threads, os.path.join(workdir, 'server.log'))
+        print(f"🚀 Starting {mode} on port {port}...")
+        server.start()
+        try:
+            report = run_load(f"http://127.0.0.1:{port}", site, args.recipes, mix,
+                              args.concurrency, args.duration, args.warmup)
+        finally:
+            server.stop()
+        report['_config'] = {'server': mode, 'workers': args.workers, 'threads': args.threads,
+                             'concurrency': args.concurrency, 'recipes': args.recipes,
+                             'duration': args.duration}
+        return report
+    finally:
+        if args.keep:
+            print(f"📁 Kept work directory {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def parse_mix(text: str) -> dict:
+    """'list_recipes_json=50,scrape=10' -> weights; unknown routes are rejected"""
+    mix = {}
+    for part in text.split(','):
+        route, _, weight = part.partition('=')
+        route = route.strip()
+        if route not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown route '{route}', choose from {', '.join(DEFAULT_MIX)}")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test QuickBasket against a seeded temporary database')
+    parser.add_argument('--server', default='waitress',
+                        choices=['waitress', 'gunicorn', 'gunicorn-gthread', 'both'],
+                        help="server to test; 'both' runs waitress and gunicorn back to back")
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=6, help='threads per worker')
+    parser.add_argument('--recipes', type=int, default=2000, help='synthetic recipes to seed')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent client threads')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds per server')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before measuring')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                        help='route weights, e.g. list_recipes_json=50,scrape=10')
+    parser.add_argument('--site-latency', type=float, default=0.05,
+                        help='seconds the stand-in recipe site waits before answering')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    parser.add_argument('--keep', action='store_true', help='keep the temporary database and logs')
+    args = parser.parse_args()
+
+    modes = ['waitress', 'gunicorn'] if args.server == 'both' else [args.server]
+    site = StandInSite(latency=args.site_latency).start()
+    results = {}
+    try:
+        for mode in modes:
+            results[mode] = run_mode(mode, args, site, args.mix)
+            print_report(mode, results[mode])
+    finally:
+        site.stop()
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
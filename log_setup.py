@@ -0,0 +1,227 @@
+"""
+Logging for the server: request threads only put records on a queue and one
+listener thread writes them out, so a slow stdout (Heroku, Render) never
+adds to request latency.
+
+configure_logging() replaces logging.basicConfig for the app and server;
+install_request_logging(app) gives each request an id (the incoming
+X-Request-ID when the platform sets one, as Heroku does) that is added to
+every record logged while handling it, scrapes on the scraper's event loop
+included, and logs one line per request with its status and duration.
+
+Records the queue has no room for are dropped rather than waiting, and only
+a share of DEBUG records is kept; both are counted in
+quickbasket_log_records_dropped_total on /metrics.
+
+Settings (environment):
+- LOG_LEVEL: DEBUG, INFO, WARNING ... (default INFO)
+- LOG_FORMAT: json (one object per line) or text (default json on cloud
+  platforms, text elsewhere)
+- LOG_DEBUG_SAMPLE_RATE: share of DEBUG records kept (default 0.01)
+- LOG_QUEUE_SIZE: records waiting to be written before new ones are dropped (default 10000)
+- LOG_REQUESTS: 0 turns off the per-request line (default 1)
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('request_id', default=None)
+
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s%(request_tag)s: %(message)s'
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_tag', 'request_id'}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional['NonBlockingQueueHandler'] = None
+_lock = threading.Lock()
+
+
+def _count_drop(reason: str) -> None:
+    # Not imported here: server.py configures logging before it sets up
+    # METRICS_DIR and imports the app, which creates the registry
+    metrics = sys.modules.get('metrics')
+    if metrics is not None:
+        metrics.LOG_RECORDS_DROPPED.inc(reason=reason)
+
+
+def _is_cloud() -> bool:
+    return bool(os.environ.get('DYNO') or os.environ.get('RAILWAY_ENVIRONMENT') or os.environ.get('RENDER'))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, extra={...} fields included"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The usual one-line format, with the request id in brackets when there is one"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        request_id = getattr(record, 'request_id', None)
+        record.request_tag = f" [{request_id}]" if request_id else ''
+        return super().format(record)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queues records without ever waiting; tags them with the request id and
+    samples DEBUG records on the way in, before any formatting work"""
+
+    def __init__(self, log_queue: queue.Queue, debug_sample_rate: float):
+        super().__init__(log_queue)
+        self.debug_sample_rate = debug_sample_rate
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG and random.random() >= self.debug_sample_rate:
+            _count_drop('sampled')
+            return False
+        record.request_id = request_id_var.get()
+        return super().handle(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback here, as the arguments may change or
+        # not pickle, but leave the formatting to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _count_drop('queue_full')
+
+
+def _output_handler(log_format: str) -> logging.Handler:
+    handler = logging.StreamHandler(sys.stderr)
+    if log_format == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter(TEXT_FORMAT))
+    return handler
+
+
+def _start_listener(output: logging.Handler, queue_size: int) -> None:
+    global _listener
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_in_child() -> None:
+    # A forked worker (gunicorn with preload_app) has no listener thread, and
+    # the inherited queue's lock may have been held mid-fork: start afresh
+    if _listener is not None:
+        _start_listener(_listener.handlers[0], _queue_handler.queue.maxsize)
+
+
+def _stop_listener() -> None:
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()  # Writes out what is still queued
+
+
+def configure_logging(level: Optional[str] = None) -> None:
+    """Send every record through the queue to the listener thread (once per process)"""
+    global _queue_handler
+    with _lock:
+        if _queue_handler is not None:
+            return
+        level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+        log_format = os.environ.get('LOG_FORMAT', 'json' if _is_cloud() else 'text').lower()
+        _queue_handler = NonBlockingQueueHandler(
+            queue.Queue(), float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 0.01)))
+        _start_listener(_output_handler(log_format), int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+        atexit.register(_stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_in_child)
+
+
+def install_request_logging(app) -> None:
+    """Tag each request's records with a request id and log one line per request"""
+    from flask import g, request
+
+    access_logger = logging.getLogger('quickbasket.requests')
+    log_requests = os.environ.get('LOG_REQUESTS', '1') != '0'
+
+    @app.before_request
+    def _start_request_log():
+        incoming = request.headers.get('X-Request-ID', '')
+        request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex[:16]
+        g.request_id = request_id
+        g.request_log_token = request_id_var.set(request_id)
+        g.request_log_started = time.perf_counter()
+
+    @app.after_request
+    def _tag_response(response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+            g.request_log_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_request_log(exc):
+        token = g.pop('request_log_token', None)
+        if token is None:
+            return
+        if log_requests:
+            sql = g.get('sql_profile')
+            duration_ms = round((time.perf_counter() - g.request_log_started) * 1000, 2)
+            status = g.get('request_log_status', 500)
+            access_logger.info(f"{request.method} {request.path} {status} {duration_ms:.1f}ms", extra={
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': status,
+                'duration_ms': duration_ms,
+                'sql_queries': sql.count if sql is not None else None,
+                'remote_addr': request.remote_addr,
+            })
+        try:
+            request_id_var.reset(token)
+        except ValueError:  # Torn down from another context (a streamed response)
+            request_id_var.set(None)
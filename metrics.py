@@ -0,0 +1,389 @@
+"""
+Built-in metrics registry served on /metrics in Prometheus text format.
+
+Counters, gauges and histograms are kept in-process behind one lock, so they
+are safe to update from every waitress thread. When METRICS_DIR is set (as
+it must be for gunicorn with several workers) each process also dumps its
+values to METRICS_DIR/<pid>.json and /metrics merges every worker's file:
+counters and histograms are summed over all files, including workers that
+have since exited, while gauges only count live processes.
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+
+class _Metric:
+    metric_type = 'untyped'
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = registry.lock
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def dump(self) -> Dict:
+        with self._lock:
+            samples = [[list(key), _copy_value(value)] for key, value in self._values.items()]
+        return {'type': self.metric_type, 'help': self.documentation,
+                'labelnames': list(self.labelnames), 'samples': samples}
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = 'gauge'
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                self._values[key] = entry
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['buckets'][index] += 1
+                    break
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def dump(self) -> Dict:
+        data = super().dump()
+        data['buckets'] = list(self.buckets)
+        return data
+
+
+def _copy_value(value):
+    if isinstance(value, dict):
+        return {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+    return value
+
+
+class MetricsRegistry:
+    def __init__(self, multiprocess_dir: Optional[str] = None, flush_interval: float = 1.0):
+        self.lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self.multiprocess_dir = multiprocess_dir
+        self.flush_interval = flush_interval
+        self._last_flush = 0.0
+        if multiprocess_dir:
+            os.makedirs(multiprocess_dir, exist_ok=True)
+            atexit.register(self.flush)
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def dump(self) -> Dict[str, Dict]:
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+    # ----- multi-process support -----
+
+    def maybe_flush(self) -> None:
+        """Write this process's values if the last write is older than flush_interval"""
+        if self.multiprocess_dir and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.multiprocess_dir:
+            return
+        self._last_flush = time.monotonic()
+        path = os.path.join(self.multiprocess_dir, f"{os.getpid()}.json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as handle:
+                json.dump({'pid': os.getpid(), 'metrics': self.dump()}, handle)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def collect(self) -> Dict[str, Dict]:
+        """Current values, merged across worker processes in multi-process mode"""
+        if not self.multiprocess_dir:
+            return self.dump()
+
+        self.flush()
+        merged: Dict[str, Dict] = {}
+        for filename in os.listdir(self.multiprocess_dir):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.multiprocess_dir, filename)) as handle:
+                    snapshot = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(snapshot.get('pid'))
+            for name, data in snapshot.get('metrics', {}).items():
+                if data['type'] == 'gauge' and not alive:
+                    continue
+                target = merged.setdefault(name, {**data, 'samples': {}})
+                for labels, value in data['samples']:
+                    key = tuple(labels)
+                    target['samples'][key] = _merge_values(target['samples'].get(key), value)
+        for data in merged.values():
+            data['samples'] = [[list(key), value] for key, value in data['samples'].items()]
+        return merged
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        collected = self.collect()
+        for name in sorted(collected):
+            data = collected[name]
+            lines.append(f"# HELP {name} {_escape_help(data['help'])}")
+            lines.append(f"# TYPE {name} {data['type']}")
+            labelnames = data['labelnames']
+            for labels, value in sorted(data['samples'], key=lambda sample: sample[0]):
+                pairs = list(zip(labelnames, labels))
+                if data['type'] == 'histogram':
+                    cumulative = 0
+                    for bound, count in zip(data['buckets'], value['buckets']):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(pairs + [('le', _format_value(bound))])} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(pairs + [('le', '+Inf')])} {value['count']}")
+                    lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(value['sum'])}")
+                    lines.append(f"{name}_count{_format_labels(pairs)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+        lines.extend(_cache_hit_ratios(collected))
+        lines.extend(_coalesce_ratios(collected))
+        return '\n'.join(lines) + '\n'
+
+
+def _merge_values(current, value):
+    if current is None:
+        return _copy_value(value)
+    if isinstance(value, dict):
+        return {
+            'buckets': [a + b for a, b in zip(current['buckets'], value['buckets'])],
+            'sum': current['sum'] + value['sum'],
+            'count': current['count'] + value['count'],
+        }
+    return current + value
+
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _cache_hit_ratios(collected: Dict[str, Dict]) -> List[str]:
+    """Derive quickbasket_cache_hit_ratio from the merged cache lookup counters"""
+    data = collected.get('quickbasket_cache_lookups_total')
+    if not data:
+        return []
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), value in ((tuple(labels), value) for labels, value in data['samples']):
+        hits_and_total = totals.setdefault(cache, [0.0, 0.0])
+        hits_and_total[1] += value
+        if result == 'hit':
+            hits_and_total[0] += value
+    lines = ['# HELP quickbasket_cache_hit_ratio Share of cache lookups that were hits since start',
+             '# TYPE quickbasket_cache_hit_ratio gauge']
+    for cache in sorted(totals):
+        hits, total = totals[cache]
+        ratio = hits / total if total else 0.0
+        lines.append(f"quickbasket_cache_hit_ratio{_format_labels([('cache', cache)])} {_format_value(ratio)}")
+    return lines
+
+
+def _coalesce_ratios(collected: Dict[str, Dict]) -> List[str]:
+    """Derive quickbasket_scrape_coalesce_ratio from the merged single-flight counters"""
+    data = collected.get('quickbasket_scrape_flights_total')
+    if not data:
+        return []
+    totals: Dict[str, List[float]] = {}
+    for (flight, role), value in ((tuple(labels), value) for labels, value in data['samples']):
+        followers_and_total = totals.setdefault(flight, [0.0, 0.0])
+        followers_and_total[1] += value
+        if role == 'follower':
+            followers_and_total[0] += value
+    lines = ['# HELP quickbasket_scrape_coalesce_ratio Share of scrape calls that shared another call\'s fetch',
+             '# TYPE quickbasket_scrape_coalesce_ratio gauge']
+    for flight in sorted(totals):
+        followers, total = totals[flight]
+        ratio = followers / total if total else 0.0
+        lines.append(f"quickbasket_scrape_coalesce_ratio{_format_labels([('flight', flight)])} {_format_value(ratio)}")
+    return lines
+
+
+def _escape_help(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ''
+    escaped = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        if value.is_integer():
+            return str(int(value))
+        return repr(value)
+    return str(value)
+
+
+REGISTRY = MetricsRegistry(multiprocess_dir=os.environ.get('METRICS_DIR') or None)
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'quickbasket_http_requests_total', 'HTTP requests handled', ['endpoint', 'method', 'status'])
+HTTP_LATENCY = REGISTRY.histogram(
+    'quickbasket_http_request_duration_seconds', 'Time spent handling a request', ['endpoint'])
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'quickbasket_http_requests_in_flight', 'Requests currently being handled')
+HTTP_RESPONSE_SIZE = REGISTRY.histogram(
+    'quickbasket_http_response_size_bytes', 'Size of response bodies', ['endpoint'], buckets=SIZE_BUCKETS)
+DB_QUERIES = REGISTRY.histogram(
+    'quickbasket_db_queries_per_request', 'SQL statements executed per request', ['endpoint'],
+    buckets=COUNT_BUCKETS)
+DB_DURATION = REGISTRY.histogram(
+    'quickbasket_db_duration_seconds_per_request', 'Time spent in SQL statements per request', ['endpoint'])
+SCRAPES = REGISTRY.counter(
+    'quickbasket_scrapes_total',
+    'Recipe scrape attempts by outcome (success, host_failure, page_failure, circuit_open, negative_cache)',
+    ['outcome'])
+SCRAPE_DURATION = REGISTRY.histogram(
+    'quickbasket_scrape_duration_seconds', 'Time spent fetching and extracting a recipe page', ['outcome'])
+SCRAPE_EXTRACTIONS = REGISTRY.counter(
+    'quickbasket_scrape_extractions_total',
+    'Extraction results by path (json_ld_stream, site, json_ld, microdata, html, failed)', ['path'])
+SCRAPE_FLIGHTS = REGISTRY.counter(
+    'quickbasket_scrape_flights_total',
+    'Scrape calls by single-flight role (leader fetched the page, follower shared a fetch in progress)',
+    ['flight', 'role'])
+EXTRACTION_ATTEMPTS = REGISTRY.counter(
+    'quickbasket_extraction_attempts_total',
+    'Extraction strategies tried by stage (page, ingredients, instructions) and result (hit, miss)',
+    ['stage', 'result'])
+CACHE_LOOKUPS = REGISTRY.counter(
+    'quickbasket_cache_lookups_total', 'Cache lookups by cache and result (hit, miss)', ['cache', 'result'])
+RATE_LIMITED = REGISTRY.counter(
+    'quickbasket_rate_limited_total',
+    'Requests turned away by route class and reason (client, global, in_flight, queue)', ['limit', 'reason'])
+IMAGE_CAPTURES = REGISTRY.counter(
+    'quickbasket_image_captures_total',
+    'Recipe photo captures by outcome (stored, shared, failed, dropped)', ['outcome'])
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    'quickbasket_log_records_dropped_total',
+    'Log records not written by reason (queue_full, sampled)', ['reason'])
+
+
+def install_metrics(app) -> None:
+    """Record request metrics for a Flask app and serve them on /metrics.
+    Per-request DB numbers come from the query profiler (g.sql_profile)."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+
+    @app.after_request
+    def _record_response_metrics(response):
+        if 'metrics_started' in g:
+            endpoint = request.endpoint or 'unmatched'
+            HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=str(response.status_code))
+            g.metrics_counted = True
+            if response.content_length is not None:
+                HTTP_RESPONSE_SIZE.observe(response.content_length, endpoint=endpoint)
+        return response
+
+    @app.teardown_request
+    def _finish_request_metrics(exc):
+        if 'metrics_started' not in g:
+            return
+        endpoint = request.endpoint or 'unmatched'
+        if not g.pop('metrics_counted', False):
+            # The response never made it through after_request
+            HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status='500')
+        HTTP_LATENCY.observe(time.perf_counter() - g.metrics_started, endpoint=endpoint)
+        profile = g.get('sql_profile')
+        if profile is not None:
+            DB_QUERIES.observe(profile.count, endpoint=endpoint)
+            DB_DURATION.observe(profile.duration, endpoint=endpoint)
+        HTTP_IN_FLIGHT.dec()
+        g.pop('metrics_started')
+        REGISTRY.maybe_flush()
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus scrape endpoint"""
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
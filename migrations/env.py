@@ -16,9 +16,12 @@ if config.config_file_name is not None:
 
 # add your model's MetaData object here
 # for 'autogenerate' support
-from models import Base
+from models import Base, database_url
 target_metadata = Base.metadata
 
+# Migrate the database the app uses: DATABASE_URL, or the app's SQLite file
+config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -64,7 +67,10 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite can't ALTER most things in place; other databases can
+            render_as_batch=connection.dialect.name == "sqlite",
         )
 
         with context.begin_transaction():
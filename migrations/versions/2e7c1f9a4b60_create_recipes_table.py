@@ -0,0 +1,42 @@
+"""create_recipes_table
+
+Revision ID: 2e7c1f9a4b60
+Revises: 
+Create Date: 2026-10-19 18:22:05.914730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e7c1f9a4b60'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The table as the first version of the app made it; the revisions after
+    # this one add the rest. Databases the app already created keep theirs.
+    # Offline (--sql) runs can't inspect and always emit the table.
+    if not op.get_context().as_sql and sa.inspect(op.get_bind()).has_table('recipes'):
+        return
+    op.create_table(
+        'recipes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(200), nullable=False),
+        sa.Column('ingredients', sa.Text(), nullable=False),
+        sa.Column('instructions', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('recipes')
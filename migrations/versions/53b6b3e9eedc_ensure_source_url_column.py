@@ -20,14 +20,16 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # Check if source_url column exists, if not add it
-    try:
-        # Try to add the column, will fail silently if it already exists
+    # Check if source_url column exists, if not add it. Inspecting instead of
+    # catching the error keeps PostgreSQL's transactional DDL usable afterwards.
+    # Offline (--sql) runs can't inspect and always emit the column.
+    if op.get_context().as_sql:
+        columns = set()
+    else:
+        columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('recipes')}
+    if 'source_url' not in columns:
         with op.batch_alter_table('recipes') as batch_op:
             batch_op.add_column(sa.Column('source_url', sa.String(500), nullable=True))
-    except Exception:
-        # Column already exists, ignore the error
-        pass
 
 
 def downgrade() -> None:
@@ -1,7 +1,7 @@
 """Add last_added_to_grocery field
 
 Revision ID: 5f9b7831c805
-Revises: 
+Revises: 2e7c1f9a4b60
 Create Date: 2025-09-15 21:41:16.120303
 
 """
@@ -13,16 +13,20 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = '5f9b7831c805'
-down_revision: Union[str, Sequence[str], None] = None
+down_revision: Union[str, Sequence[str], None] = '2e7c1f9a4b60'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.add_column('recipes', sa.Column('last_added_to_grocery', sa.DateTime(), nullable=True))
-    # ### end Alembic commands ###
+    # Databases the app created already have the column (see 53b6b3e9eedc)
+    if op.get_context().as_sql:
+        columns = set()
+    else:
+        columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('recipes')}
+    if 'last_added_to_grocery' not in columns:
+        op.add_column('recipes', sa.Column('last_added_to_grocery', sa.DateTime(), nullable=True))
 
 
 def downgrade() -> None:
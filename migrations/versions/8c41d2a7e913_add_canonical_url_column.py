@@ -0,0 +1,53 @@
+"""add_canonical_url_column
+
+Revision ID: 8c41d2a7e913
+Revises: 53b6b3e9eedc
+Create Date: 2026-10-19 09:12:44.310552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41d2a7e913'
+down_revision: Union[str, Sequence[str], None] = '53b6b3e9eedc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from models import backfill_canonical_urls
+
+    # The app adds the column and index itself at startup (models._upgrade_schema),
+    # so either may be there already. Offline (--sql) runs can't inspect and
+    # always emit both.
+    if op.get_context().as_sql:
+        columns, indexes = set(), set()
+    else:
+        inspector = sa.inspect(op.get_bind())
+        columns = {column['name'] for column in inspector.get_columns('recipes')}
+        indexes = {index['name'] for index in inspector.get_indexes('recipes')}
+
+    if 'canonical_url' not in columns:
+        with op.batch_alter_table('recipes') as batch_op:
+            batch_op.add_column(sa.Column('canonical_url', sa.String(500), nullable=True))
+
+        # Backfill before the unique index so older duplicate rows keep a NULL key.
+        # It reads rows, so offline (--sql) scripts leave every key NULL.
+        if not op.get_context().as_sql:
+            backfill_canonical_urls(op.get_bind())
+
+    if 'ix_recipes_canonical_url' not in indexes:
+        with op.batch_alter_table('recipes') as batch_op:
+            batch_op.create_index('ix_recipes_canonical_url', ['canonical_url'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('recipes') as batch_op:
+        batch_op.drop_index('ix_recipes_canonical_url')
+        batch_op.drop_column('canonical_url')
@@ -0,0 +1,46 @@
+"""add_extraction_stats_table
+
+Revision ID: a3f1c6d9b274
+Revises: 8c41d2a7e913
+Create Date: 2026-10-19 14:03:27.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c6d9b274'
+down_revision: Union[str, Sequence[str], None] = '8c41d2a7e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # init_db's create_all makes the table on databases the app has opened.
+    # Offline (--sql) runs can't inspect and always emit it.
+    if not op.get_context().as_sql and sa.inspect(op.get_bind()).has_table('extraction_stats'):
+        return
+    op.create_table(
+        'extraction_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('host', sa.String(255), nullable=False),
+        sa.Column('stage', sa.String(20), nullable=False),
+        sa.Column('path', sa.String(20), nullable=False),
+        sa.Column('pattern_index', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('successes', sa.Integer(), nullable=False),
+        sa.Column('total_seconds', sa.Float(), nullable=False),
+        sa.Column('last_success_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('host', 'stage', 'path', 'pattern_index', name='uq_extraction_stats_strategy'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('extraction_stats')
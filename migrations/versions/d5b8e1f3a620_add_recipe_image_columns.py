@@ -0,0 +1,42 @@
+"""add_recipe_image_columns
+
+Revision ID: d5b8e1f3a620
+Revises: a3f1c6d9b274
+Create Date: 2026-10-19 16:41:08.203917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b8e1f3a620'
+down_revision: Union[str, Sequence[str], None] = 'a3f1c6d9b274'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # models._upgrade_schema adds both at startup, so they may be there already.
+    # Offline (--sql) runs can't inspect and always emit them.
+    if op.get_context().as_sql:
+        columns = set()
+    else:
+        columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('recipes')}
+    missing = [column for column in (sa.Column('image_url', sa.String(1000), nullable=True),
+                                     sa.Column('image_hash', sa.String(64), nullable=True))
+               if column.name not in columns]
+    if missing:
+        with op.batch_alter_table('recipes') as batch_op:
+            for column in missing:
+                batch_op.add_column(column)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('recipes') as batch_op:
+        batch_op.drop_column('image_hash')
+        batch_op.drop_column('image_url')
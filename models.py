@@ -1,7 +1,15 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
-from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy import create_engine, inspect, insert, make_url, text, Column, Integer, Float, String, Text, DateTime, UniqueConstraint
+from sqlalchemy.orm import DeclarativeBase, Session, deferred, sessionmaker
+from sqlalchemy.pool import StaticPool
 from datetime import datetime
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional
 import os
+import re
+import threading
+
+from image_store import thumbnail_url
 
 # Create the base class for declarative models
 class Base(DeclarativeBase):
@@ -12,12 +20,16 @@ class Recipe(Base):
 
     id = Column(Integer, primary_key=True)
     title = Column(String(200), nullable=False)
-    ingredients = Column(Text, nullable=False)
-    instructions = Column(Text, nullable=True)  # Make instructions optional
+    # The bodies are loaded (together) only when first used; undefer_group('body') to load them up front
+    ingredients = deferred(Column(Text, nullable=False), group='body')
+    instructions = deferred(Column(Text, nullable=True), group='body')  # Make instructions optional
     source_url = Column(String(500))
+    canonical_url = Column(String(500), unique=True, index=True, nullable=True)  # Dedupe key, see recipe_scraper.canonicalize_url
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_added_to_grocery = Column(DateTime, nullable=True)  # Track when recipe was last added to grocery list
+    image_url = Column(String(1000), nullable=True)  # The recipe's photo on its site; never shown to browsers
+    image_hash = Column(String(64), nullable=True)  # Its thumbnail in the image store (image_store.py), once made
 
     def to_dict(self):
         return {
@@ -28,9 +40,46 @@ class Recipe(Base):
             'source_url': self.source_url,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'last_added_to_grocery': self.last_added_to_grocery.isoformat() if self.last_added_to_grocery else None
+            'last_added_to_grocery': self.last_added_to_grocery.isoformat() if self.last_added_to_grocery else None,
+            'thumbnail_url': thumbnail_url(self.image_hash)
         }
 
+class RecipeSummary:
+    """What a recipe list shows of a recipe, read with a column-only select:
+    no ingredients or instructions, no ORM instance, and no per-row __dict__"""
+    __slots__ = ('id', 'title', 'source_url', 'last_added_to_grocery', 'thumbnail_url')
+
+    COLUMNS = (Recipe.id, Recipe.title, Recipe.source_url, Recipe.last_added_to_grocery, Recipe.image_hash)
+
+    def __init__(self, id, title, source_url, last_added_to_grocery, image_hash):
+        self.id = id
+        self.title = title
+        self.source_url = source_url
+        # ISO strings, like Recipe.to_dict(), so templates can take either
+        self.last_added_to_grocery = last_added_to_grocery.isoformat() if last_added_to_grocery else None
+        self.thumbnail_url = thumbnail_url(image_hash)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class ExtractionStat(Base):
+    """How often one extraction strategy was tried and worked on a host, see extraction_memory.py"""
+    __tablename__ = 'extraction_stats'
+    __table_args__ = (
+        UniqueConstraint('host', 'stage', 'path', 'pattern_index', name='uq_extraction_stats_strategy'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    host = Column(String(255), nullable=False)
+    stage = Column(String(20), nullable=False)  # page, ingredients or instructions
+    path = Column(String(20), nullable=False)  # json_ld, fields, microdata or pattern
+    pattern_index = Column(Integer, nullable=False, default=-1)  # Position in the pattern list, -1 for other paths
+    attempts = Column(Integer, nullable=False, default=0)
+    successes = Column(Integer, nullable=False, default=0)
+    total_seconds = Column(Float, nullable=False, default=0.0)
+    last_success_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 # Create database engine
 def get_base_path():
     """Get the base path for the application, handling PyInstaller bundling"""
@@ -43,15 +92,292 @@ def get_base_path():
 
 import sys
 db_path = os.path.join(get_base_path(), 'recipes.db')
-engine = create_engine(f'sqlite:///{db_path}')
+
+def normalize_database_url(url: str) -> str:
+    """Heroku-style postgres:// URLs are rejected by SQLAlchemy; use postgresql://"""
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def _is_memory_sqlite(url) -> bool:
+    return url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'
+
+def engine_options(url: str) -> Dict:
+    """create_engine() arguments for a database URL, tuned per dialect.
+
+    SQLite files keep SQLAlchemy's default pool; in-memory SQLite shares one
+    connection, or every session would see its own empty database. Server
+    databases get a bounded pool that checks connections before use and
+    replaces them before the server's idle timeout can drop them:
+        DB_POOL_SIZE (5), DB_MAX_OVERFLOW (10), DB_POOL_TIMEOUT (30 s),
+        DB_POOL_RECYCLE (1800 s), DB_POOL_PRE_PING (1), DB_INSERT_PAGE_SIZE (1000)
+    """
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        if _is_memory_sqlite(url):
+            return {'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}}
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1').lower() not in ('0', 'false', 'no'),
+        # Rows per multi-row INSERT when executemany() is batched into VALUES lists
+        'insertmanyvalues_page_size': int(os.environ.get('DB_INSERT_PAGE_SIZE', 1000)),
+    }
+
+def build_engine(url: str, **overrides):
+    """Engine for a database URL with the per-dialect options above"""
+    url = normalize_database_url(url)
+    options = engine_options(url)
+    options.update(overrides)
+    return create_engine(url, **options)
+
+# DATABASE_URL points the app at another database: a server database such as
+# PostgreSQL (install its driver, e.g. psycopg2-binary) or a SQLite file for
+# load tests and capacity runs. alembic uses the same URL.
+database_url = normalize_database_url(os.environ.get('DATABASE_URL') or f'sqlite:///{db_path}')
+engine = build_engine(database_url)
 
 # Create session factory
 Session = sessionmaker(bind=engine)
 
+def backfill_canonical_urls(connection):
+    """Fill canonical_url for recipes saved before the column existed.
+    When several old rows map to the same canonical URL only the oldest gets
+    the key, so the unique index never blocks the upgrade."""
+    from recipe_scraper import canonicalize_url
+
+    rows = connection.execute(text(
+        "SELECT id, source_url FROM recipes "
+        "WHERE canonical_url IS NULL AND source_url IS NOT NULL ORDER BY id"
+    )).fetchall()
+    taken = {row[0] for row in connection.execute(text(
+        "SELECT canonical_url FROM recipes WHERE canonical_url IS NOT NULL"
+    ))}
+    updates = []
+    for recipe_id, source_url in rows:
+        canonical_url = canonicalize_url(source_url)
+        if canonical_url and canonical_url not in taken:
+            taken.add(canonical_url)
+            updates.append({'id': recipe_id, 'canonical_url': canonical_url})
+    if updates:
+        connection.execute(
+            text("UPDATE recipes SET canonical_url = :canonical_url WHERE id = :id"),
+            updates
+        )
+    return len(updates)
+
+def _upgrade_schema(engine):
+    """Bring databases created by older versions up to the current columns"""
+    columns = {column['name'] for column in inspect(engine).get_columns('recipes')}
+    if 'canonical_url' not in columns:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE recipes ADD COLUMN canonical_url VARCHAR(500)"))
+            backfill_canonical_urls(connection)
+            for index in Recipe.__table__.indexes:
+                if index.name == 'ix_recipes_canonical_url':
+                    index.create(connection, checkfirst=True)
+    if 'image_url' not in columns:
+        with engine.begin() as connection:
+            connection.execute(text("ALTER TABLE recipes ADD COLUMN image_url VARCHAR(1000)"))
+            connection.execute(text("ALTER TABLE recipes ADD COLUMN image_hash VARCHAR(64)"))
+
+def _set_journal_mode(engine):
+    """Use WAL on SQLite so readers, writers and online backups don't block each other.
+    SQLITE_JOURNAL_MODE=delete keeps the old rollback journal (e.g. on network drives)."""
+    if engine.url.get_backend_name() != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        return
+    journal_mode = os.environ.get('SQLITE_JOURNAL_MODE', 'wal')
+    with engine.connect() as connection:
+        connection.exec_driver_sql(f"PRAGMA journal_mode = {journal_mode}")
+
+def prepare_database(engine):
+    """Create missing tables and upgrade an existing database in place"""
+    Base.metadata.create_all(engine)
+    _upgrade_schema(engine)
+    _set_journal_mode(engine)
+
 def init_db():
     """Initialize the database, creating all tables"""
-    Base.metadata.create_all(engine)
+    prepare_database(engine)
+
+def bulk_insert(connection, table, rows: Iterable[Dict], chunk_size: int = 1000) -> int:
+    """Insert rows (dicts of column values) with one executemany() per chunk.
+    SQLite's executemany is already fast; on PostgreSQL and MySQL SQLAlchemy
+    batches each chunk into multi-row INSERT statements. Returns rows inserted."""
+    statement = insert(table)
+    inserted = 0
+    chunk: List[Dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            connection.execute(statement, chunk)
+            inserted += len(chunk)
+            chunk = []
+    if chunk:
+        connection.execute(statement, chunk)
+        inserted += len(chunk)
+    return inserted
+
+# ----- Households -----
+# Each household (family) can get its own SQLite file, so recipes and grocery
+# lists are never shared. Requests without a household use the main database.
+# Household databases are made by an operator (POST /admin/households); set
+# HOUSEHOLD_AUTO_CREATE=1 to let any request make one, e.g. in development.
+
+HOUSEHOLD_ID_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$')
+
+class UnknownHousehold(LookupError):
+    """The household has no database (or households are not set up) and auto-creation is off"""
+
+class HouseholdEngines:
+    """Engines and sessionmakers for household databases, LRU-bounded.
+    Evicted engines are disposed, closing their pooled connections, and are
+    recreated on the next request for that household."""
+
+    def __init__(self, directory: Optional[str], max_engines: int = 128, auto_create: bool = False):
+        self.directory = directory
+        self.max_engines = max_engines
+        self.auto_create = auto_create
+        self._lock = threading.Lock()
+        self._prepare_lock = threading.Lock()  # Only taken the first time a household is opened
+        self._entries = OrderedDict()  # household -> (engine, sessionmaker)
+        self._prepared = set()  # Households whose schema is known to be current
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether there is anywhere to keep household databases"""
+        return self.directory is not None
+
+    def path(self, household: str) -> str:
+        if not HOUSEHOLD_ID_RE.match(household):
+            raise ValueError(f"Invalid household id: {household!r}")
+        if self.directory is None:
+            raise UnknownHousehold(household)
+        return os.path.join(self.directory, f"{household}.db")
+
+    def exists(self, household: str) -> bool:
+        return os.path.exists(self.path(household))
+
+    def ids(self) -> List[str]:
+        """Households that have a database"""
+        if self.directory is None or not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-3] for name in os.listdir(self.directory)
+                      if name.endswith('.db') and HOUSEHOLD_ID_RE.match(name[:-3]))
+
+    def create(self, household: str) -> bool:
+        """Make a household's database; False if it already had one"""
+        path = self.path(household)
+        if os.path.exists(path):
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        self._open(household, path).dispose()
+        # Only open households are remembered as prepared
+        self._prepared.discard(household)
+        return True
+
+    def _open(self, household: str, path: str):
+        household_engine = build_engine(f"sqlite:///{path}")
+        if household not in self._prepared:
+            with self._prepare_lock:
+                if household not in self._prepared:
+                    prepare_database(household_engine)
+                    self._prepared.add(household)
+        return household_engine
+
+    def get(self, household: str):
+        """Returns (engine, sessionmaker) for a household, opening it if needed"""
+        with self._lock:
+            entry = self._entries.get(household)
+            if entry is not None:
+                self._entries.move_to_end(household)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Open outside the lock so one slow disk doesn't stall every household
+        path = self.path(household)
+        if not self.auto_create and not os.path.exists(path):
+            raise UnknownHousehold(household)
+        os.makedirs(self.directory, exist_ok=True)
+        household_engine = self._open(household, path)
+        entry = (household_engine, sessionmaker(bind=household_engine))
+
+        evicted = []
+        with self._lock:
+            existing = self._entries.get(household)
+            if existing is not None:
+                # Another thread opened it first; use theirs
+                evicted.append(household_engine)
+                entry = existing
+            else:
+                self._entries[household] = entry
+            self._entries.move_to_end(household)
+            while len(self._entries) > self.max_engines:
+                old_household, (old_engine, _) = self._entries.popitem(last=False)
+                # Checked again when it is next opened, so the set stays as small as the cache
+                self._prepared.discard(old_household)
+                evicted.append(old_engine)
+                self.evictions += 1
+        for old_engine in evicted:
+            # Connections still checked out finish normally and are closed when returned
+            old_engine.dispose()
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            entries, self._entries = list(self._entries.values()), OrderedDict()
+            self._prepared.clear()
+        for household_engine, _ in entries:
+            household_engine.dispose()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'directory': self.directory,
+                'auto_create': self.auto_create,
+                'open_engines': len(self._entries),
+                'max_engines': self.max_engines,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+def household_directory() -> Optional[str]:
+    """HOUSEHOLD_DB_DIR, or households/ next to the configured SQLite database.
+    None (households off) for server databases without HOUSEHOLD_DB_DIR."""
+    if os.environ.get('HOUSEHOLD_DB_DIR'):
+        return os.environ['HOUSEHOLD_DB_DIR']
+    url = make_url(database_url)
+    if url.get_backend_name() != 'sqlite' or _is_memory_sqlite(url):
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(url.database)), 'households')
+
+households = HouseholdEngines(
+    directory=household_directory(),
+    max_engines=int(os.environ.get('HOUSEHOLD_ENGINE_CACHE', 128)),
+    auto_create=os.environ.get('HOUSEHOLD_AUTO_CREATE', '0').lower() in ('1', 'true', 'yes'),
+)
+
+# Household of the current request; set by the web layer, None means the main database
+current_household: ContextVar[Optional[str]] = ContextVar('current_household', default=None)
+
+def get_engine():
+    """Engine for the current household (or the main database)"""
+    household = current_household.get()
+    if household is None:
+        return engine
+    return households.get(household)[0]
 
 def get_session():
-    """Get a new database session"""
-    return Session()
\ No newline at end of file
+    """Get a new database session for the current household (or the main database)"""
+    household = current_household.get()
+    if household is None:
+        return Session()
+    return households.get(household)[1]()
@@ -0,0 +1,152 @@
+"""
+Per-request SQL profiling on the models engine.
+
+Every statement run while a request is active is counted and timed, and
+statements are grouped by shape (the SQL with literals and IN-lists folded)
+so a route that runs the same query once per row is reported as N+1.
+
+Settings (app.config, defaulting from the environment):
+- SQL_PROFILER_SERVER_TIMING: add a Server-Timing header (on in debug mode)
+- SQL_N_PLUS_ONE_THRESHOLD: repeats of one shape that count as N+1 (default 5)
+- SQL_QUERY_BUDGET: max statements per request; with SQL_PROFILER_ENFORCE
+  (on when app.testing) a request over budget raises QueryBudgetExceeded
+"""
+
+import logging
+import os
+import re
+import time
+from collections import Counter
+from functools import wraps
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in test mode when a request runs more SQL statements than allowed"""
+
+
+def statement_shape(statement: str) -> str:
+    """Fold literals and IN-lists so repeats of one query compare equal"""
+    shape = _STRING_LITERAL_RE.sub('?', statement)
+    shape = _NUMBER_LITERAL_RE.sub('?', shape)
+    shape = _PLACEHOLDER_LIST_RE.sub('(?)', shape)
+    return _WHITESPACE_RE.sub(' ', shape).strip()
+
+
+class QueryProfile:
+    """Statements seen during one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, duration: float, executemany: bool) -> None:
+        self.count += 1
+        self.duration += duration
+        if not executemany:
+            self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int) -> List[Tuple[str, int]]:
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def query_budget(max_queries: int):
+    """Give one view its own statement budget, overriding SQL_QUERY_BUDGET"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            return view(*args, **kwargs)
+        wrapper.sql_query_budget = max_queries
+        return wrapper
+    return decorator
+
+
+def _env_flag(name: str) -> Optional[bool]:
+    value = os.environ.get(name)
+    if value is None:
+        return None
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def install_query_profiler(app, engine) -> None:
+    """Attach the profiler to a Flask app and the SQLAlchemy engine it uses
+    (or the Engine class, to cover every engine the app creates)"""
+    from flask import g, has_request_context, request
+    from sqlalchemy import event
+
+    app.config.setdefault('SQL_PROFILER_SERVER_TIMING', _env_flag('SQL_PROFILER_SERVER_TIMING'))
+    app.config.setdefault('SQL_N_PLUS_ONE_THRESHOLD', int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5)))
+    app.config.setdefault('SQL_QUERY_BUDGET', int(os.environ['SQL_QUERY_BUDGET'])
+                          if os.environ.get('SQL_QUERY_BUDGET') else None)
+    app.config.setdefault('SQL_PROFILER_ENFORCE', _env_flag('SQL_PROFILER_ENFORCE'))
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiler_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['profiler_query_start'].pop()
+        if has_request_context():
+            profile = g.get('sql_profile')
+            if profile is not None:
+                profile.record(statement, time.perf_counter() - started, executemany)
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(exception_context):
+        # Keep the start-time stack balanced when a statement fails
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('profiler_query_start'):
+            connection.info['profiler_query_start'].pop()
+
+    def _budget_for_request() -> Optional[int]:
+        view = app.view_functions.get(request.endpoint) if request.endpoint else None
+        return getattr(view, 'sql_query_budget', app.config['SQL_QUERY_BUDGET'])
+
+    @app.before_request
+    def _start_sql_profile():
+        g.sql_profile = QueryProfile()
+
+    @app.after_request
+    def _finish_sql_profile(response):
+        profile = g.get('sql_profile')
+        if profile is None:
+            return response
+        endpoint = request.endpoint or request.path
+
+        repeated = profile.repeated_shapes(app.config['SQL_N_PLUS_ONE_THRESHOLD'])
+        for shape, count in repeated:
+            logger.warning(f"Possible N+1 in {endpoint}: {count}x {shape}")
+
+        server_timing = app.config['SQL_PROFILER_SERVER_TIMING']
+        if server_timing is None:
+            server_timing = app.debug
+        if server_timing:
+            total_ms = (time.perf_counter() - profile.started) * 1000
+            timing = [
+                f'db;dur={profile.duration * 1000:.2f};desc="{profile.count} queries"',
+                f'app;dur={total_ms:.2f}',
+            ]
+            if repeated:
+                timing.append(f'nplusone;desc="{len(repeated)} repeated statement(s)"')
+            response.headers.add('Server-Timing', ', '.join(timing))
+
+        enforce = app.config['SQL_PROFILER_ENFORCE']
+        if enforce is None:
+            enforce = app.testing
+        budget = _budget_for_request()
+        if enforce and budget is not None and profile.count > budget:
+            shapes = '; '.join(f"{count}x {shape}" for shape, count in profile.shapes.most_common(5))
+            raise QueryBudgetExceeded(
+                f"{endpoint} ran {profile.count} SQL statements, budget is {budget} ({shapes})"
+            )
+        return response
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+QuickBasket Rate Limiting and Admission Control
+Keeps expensive routes (recipe scrapes, writes) from taking every server
+thread, so cheap reads stay fast under overload.
+
+- Token buckets: each client gets a bucket per route class, and the class
+  has one global bucket on top. An empty client bucket is a 429, an empty
+  global bucket a 503; both say when to retry.
+- Admission control: scrapes are turned away with a 503 while too many are
+  already running, or while too many requests wait for a server thread
+  (waitress's queue, wired up by server.py), before any work starts.
+
+Limits are per process: under gunicorn every worker enforces its own.
+
+Settings (environment), <CLASS> being SCRAPE or WRITE:
+    RATE_LIMIT_<CLASS>_PER_MINUTE         per-client refill rate (scrape 10, write 120)
+    RATE_LIMIT_<CLASS>_BURST              per-client bucket size (scrape 5, write 30)
+    RATE_LIMIT_<CLASS>_GLOBAL_PER_MINUTE  all clients together (scrape 120, write 1200)
+    MAX_INFLIGHT_SCRAPES                  concurrent scrapes (default: half the server threads)
+    MAX_QUEUE_DEPTH                       requests waiting for a thread before scrapes are refused
+                                          (default: the thread count)
+    RATE_LIMIT_TRUST_PROXY                1 to identify clients by X-Forwarded-For (behind a proxy)
+    RATE_LIMIT_ENABLED                    0 turns all of it off
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """rate tokens per second, holding at most capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, now: float, cost: float = 1.0) -> float:
+        """Take cost tokens; returns 0 if they were available, else seconds until they will be.
+        A cost above capacity (a big batch) is taken from a full bucket and leaves
+        it in debt, so every unit is still paid for at the refill rate."""
+        # now may predate a bucket created during the same check
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(now, self.updated)
+        needed = min(cost, self.capacity)
+        if self.tokens >= needed:
+            self.tokens -= cost
+            return 0.0
+        return (needed - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+    def give_back(self, cost: float = 1.0) -> None:
+        self.tokens = min(self.capacity, self.tokens + cost)
+
+
+class RateLimiter:
+    """Per-client token buckets plus one global bucket for a class of routes"""
+
+    def __init__(self, name: str, per_minute: float, burst: float, global_per_minute: float,
+                 max_clients: int = 10000):
+        self.name = name
+        self.per_second = per_minute / 60.0
+        self.burst = burst
+        self.global_bucket = TokenBucket(global_per_minute / 60.0, max(burst, global_per_minute / 6.0))
+        self.max_clients = max_clients
+        self._clients: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client: str, cost: float = 1.0) -> Tuple[Optional[str], float]:
+        """Spend cost tokens for client. Returns (None, 0) if allowed, otherwise
+        ('client' or 'global', seconds to wait)"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._clients.get(client)
+            if bucket is None:
+                bucket = self._clients[client] = TokenBucket(self.per_second, self.burst)
+                while len(self._clients) > self.max_clients:
+                    # The least recently seen client; it would have refilled by now anyway
+                    self._clients.popitem(last=False)
+            self._clients.move_to_end(client)
+
+            wait = bucket.take(now, cost)
+            if wait:
+                return 'client', wait
+            wait = self.global_bucket.take(now, cost)
+            if wait:
+                # The client shouldn't pay for a request that never ran
+                bucket.give_back(cost)
+                return 'global', wait
+        return None, 0.0
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'per_minute': round(self.per_second * 60, 1),
+                'burst': self.burst,
+                'global_tokens': round(self.global_bucket.tokens, 1),
+            }
+
+
+class AdmissionControl:
+    """Caps concurrent requests of one kind and refuses them while the server is backed up"""
+
+    def __init__(self, name: str, max_in_flight: int, max_queue_depth: Optional[int] = None,
+                 retry_after: float = 2.0):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue_depth = max_queue_depth
+        self.retry_after = retry_after
+        # Set by server.py when the server can report requests waiting for a thread
+        self.queue_depth: Optional[Callable[[], int]] = None
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self) -> Optional[str]:
+        """None if admitted (call leave() when done), else why not: 'in_flight' or 'queue'"""
+        if self.queue_depth is not None and self.max_queue_depth is not None \
+                and self.queue_depth() > self.max_queue_depth:
+            return 'queue'
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                return 'in_flight'
+            self.in_flight += 1
+        return None
+
+    def leave(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def snapshot(self) -> Dict:
+        return {
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'queue_depth': self.queue_depth() if self.queue_depth else None,
+            'max_queue_depth': self.max_queue_depth,
+        }
+
+
+def enabled() -> bool:
+    return os.environ.get('RATE_LIMIT_ENABLED', '1').lower() not in ('0', 'false', 'no')
+
+
+def limiter_from_env(name: str, per_minute: float, burst: float, global_per_minute: float) -> RateLimiter:
+    prefix = f"RATE_LIMIT_{name.upper()}"
+    return RateLimiter(
+        name,
+        per_minute=float(os.environ.get(f"{prefix}_PER_MINUTE", per_minute)),
+        burst=float(os.environ.get(f"{prefix}_BURST", burst)),
+        global_per_minute=float(os.environ.get(f"{prefix}_GLOBAL_PER_MINUTE", global_per_minute)),
+    )
+
+
+def size_admission(admission: AdmissionControl, threads: int,
+                   queue_depth: Optional[Callable[[], int]] = None) -> None:
+    """Fit the defaults to the server's thread count, leaving room for reads;
+    MAX_INFLIGHT_SCRAPES / MAX_QUEUE_DEPTH still win"""
+    if not os.environ.get('MAX_INFLIGHT_SCRAPES'):
+        admission.max_in_flight = max(1, threads // 2)
+    if not os.environ.get('MAX_QUEUE_DEPTH'):
+        admission.max_queue_depth = threads
+    admission.queue_depth = queue_depth
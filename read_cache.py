@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+QuickBasket Read Cache
+In-process read-through cache for the hot list queries (all recipes, the
+grocery list), kept correct across gunicorn workers without a cache server.
+
+SQLite's PRAGMA data_version changes on a connection whenever *another*
+connection commits to the database, in this process or any other. The
+cache keeps one dedicated connection per database file that only ever
+runs that pragma. Every entry is tagged with the version read before its
+query ran and is served only while the version is unchanged, so a write
+from any worker or thread invalidates every worker's copy on its next
+read. The check is a few microseconds; the queries it replaces are not.
+
+Only SQLite files are cached. In-memory and server databases pass through
+to the loader every time.
+
+Settings (environment):
+    READ_CACHE_ENTRIES  cached results kept per process (default 256; 0 disables)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()  # No cached value
+
+
+class _VersionWatch:
+    """A connection that is never written through, so its data_version moves on every commit"""
+
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+
+    def version(self) -> int:
+        with self.lock:
+            return self.connection.execute('PRAGMA data_version').fetchone()[0]
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+class ReadCache:
+    """Query results keyed by (database file, key), invalidated through data_version"""
+
+    def __init__(self, max_entries: int = 256, max_databases: int = 130):
+        self.max_entries = max_entries
+        self.max_databases = max_databases
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[tuple, tuple]' = OrderedDict()  # (path, key) -> (version, value)
+        self._watches: 'OrderedDict[str, _VersionWatch]' = OrderedDict()
+        self._pid = os.getpid()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def database_path(engine) -> Optional[str]:
+        url = engine.url
+        if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:') \
+                or url.query.get('mode') == 'memory':
+            return None
+        return os.path.abspath(url.database)
+
+    def _watch(self, path: str) -> _VersionWatch:
+        closing = []
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked (gunicorn preload): the parent's connections must not be reused
+                self._watches, self._entries, self._pid = OrderedDict(), OrderedDict(), os.getpid()
+            watch = self._watches.get(path)
+            if watch is None:
+                watch = self._watches[path] = _VersionWatch(path)
+            self._watches.move_to_end(path)
+            while len(self._watches) > self.max_databases:
+                old_path, old_watch = self._watches.popitem(last=False)
+                closing.append(old_watch)
+                for cache_key in [cache_key for cache_key in self._entries if cache_key[0] == old_path]:
+                    del self._entries[cache_key]
+        for old_watch in closing:
+            old_watch.close()
+        return watch
+
+    def lookup(self, engine, key: Hashable) -> Tuple[Optional[int], Any]:
+        """(version, value) for a cached result, value being MISSING when there is
+        none for the current version; version is None for databases never cached.
+        Store a freshly loaded value under the version returned here."""
+        path = self.database_path(engine)
+        if path is None or self.max_entries <= 0:
+            return None, MISSING
+
+        version = self._watch(path).version()
+        cache_key = (path, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                hit = True
+            else:
+                self.misses += 1
+                hit = False
+        CACHE_LOOKUPS.inc(cache=f"reads:{key}", result='hit' if hit else 'miss')
+        return version, entry[1] if hit else MISSING
+
+    def store(self, engine, key: Hashable, version: Optional[int], value: Any) -> None:
+        if version is None:
+            return
+        cache_key = (self.database_path(engine), key)
+        with self._lock:
+            self._entries[cache_key] = (version, value)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, engine, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Cached result of loader() for this engine's database, reloading after any commit.
+        Cached values are shared between requests and must not be modified."""
+        version, value = self.lookup(engine, key)
+        if value is MISSING:
+            # Tagged with the version read before the query: a commit that lands
+            # while it runs bumps the version and the next read reloads
+            value = loader()
+            self.store(engine, key, version, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            watches, self._watches, self._entries = list(self._watches.values()), OrderedDict(), OrderedDict()
+        for watch in watches:
+            watch.close()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'databases': len(self._watches),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+read_cache = ReadCache(
+    max_entries=int(os.environ.get('READ_CACHE_ENTRIES', 256)),
+    # Every open household database plus the main one
+    max_databases=int(os.environ.get('HOUSEHOLD_ENGINE_CACHE', 128)) + 1,
+)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+QuickBasket Recipe Export / Import
+Moves the recipe library in and out as NDJSON: one JSON recipe per line,
+with the same fields as Recipe.to_dict() plus canonical_url and the
+recipe's photo URL (image_url; thumbnails are not exported).
+
+Export streams rows off a server-side cursor, so memory stays flat however
+big the library is. Import reads line by line and inserts in chunked
+transactions, skipping recipes whose canonical URL is already saved (or
+appeared earlier in the same file). Recipes without a source URL have no
+dedupe key and are always added.
+
+Examples:
+    python recipe_io.py export recipes.ndjson.gz
+    python recipe_io.py import recipes.ndjson.gz --chunk-size 5000
+    python recipe_io.py export - --db /tmp/capacity.db | head
+    python recipe_io.py import recipes.ndjson.gz --db postgresql://localhost/quickbasket
+"""
+
+import argparse
+import gzip
+import json
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from models import Recipe, bulk_insert
+
+EXPORT_BATCH_SIZE = 1000
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+
+_recipes = Recipe.__table__
+EXPORT_COLUMNS = [
+    _recipes.c.id, _recipes.c.title, _recipes.c.ingredients, _recipes.c.instructions,
+    _recipes.c.source_url, _recipes.c.canonical_url, _recipes.c.created_at,
+    _recipes.c.updated_at, _recipes.c.last_added_to_grocery, _recipes.c.image_url,
+]
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def export_lines(engine, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """Yield every recipe as one NDJSON line, oldest first"""
+    query = select(*EXPORT_COLUMNS).order_by(_recipes.c.id)
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for row in result:
+            yield json.dumps({
+                'id': row.id,
+                'title': row.title,
+                'ingredients': row.ingredients.split('\n') if row.ingredients else [],
+                'instructions': row.instructions.split('\n') if row.instructions else [],
+                'source_url': row.source_url,
+                'canonical_url': row.canonical_url,
+                'created_at': _isoformat(row.created_at),
+                'updated_at': _isoformat(row.updated_at),
+                'last_added_to_grocery': _isoformat(row.last_added_to_grocery),
+                'image_url': row.image_url,
+            }, ensure_ascii=False) + '\n'
+
+
+class ImportReport:
+    """Counts for one import run"""
+
+    def __init__(self):
+        self.lines = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.errors: List[str] = []
+        self.error_count = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def error(self, line_number: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"line {line_number}: {message}")
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.inserted / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'lines': self.lines,
+            'inserted': self.inserted,
+            'duplicates': self.duplicates,
+            'errors': self.error_count,
+            'error_samples': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+def _parse_datetime(record: Dict, field: str) -> Optional[datetime]:
+    value = record.get(field)
+    if not value:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be an ISO date string")
+    return datetime.fromisoformat(value)
+
+
+def _string(record: Dict, field: str) -> str:
+    value = record.get(field)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    return value.strip()
+
+
+def _join_lines(record: Dict, field: str) -> str:
+    """A list of lines or newline-separated text, as newline-separated text"""
+    value = record.get(field)
+    if isinstance(value, list):
+        if not all(isinstance(item, str) for item in value):
+            raise ValueError(f"{field} must be a list of strings")
+        return '\n'.join(item.strip() for item in value if item.strip())
+    return _string(record, field)
+
+
+def record_to_row(record: Dict, now: datetime) -> Dict:
+    """Validate one decoded NDJSON record and turn it into a recipes row"""
+    from recipe_scraper import canonicalize_url
+
+    if not isinstance(record, dict):
+        raise ValueError("expected a JSON object")
+    title = _string(record, 'title')
+    ingredients = _join_lines(record, 'ingredients')
+    if not title:
+        raise ValueError("missing title")
+    if not ingredients:
+        raise ValueError("missing ingredients")
+
+    source_url = _string(record, 'source_url') or None
+    # Recompute rather than trust the file, so older exports dedupe the same way
+    canonical_url = canonicalize_url(source_url) if source_url else None
+    created_at = _parse_datetime(record, 'created_at') or now
+    return {
+        'title': title[:200],
+        'ingredients': ingredients,
+        'instructions': _join_lines(record, 'instructions') or None,
+        'source_url': source_url,
+        'canonical_url': canonical_url,
+        'created_at': created_at,
+        'updated_at': _parse_datetime(record, 'updated_at') or created_at,
+        'last_added_to_grocery': _parse_datetime(record, 'last_added_to_grocery'),
+        # Thumbnails aren't exported; `python image_store.py backfill` makes them again
+        'image_url': _string(record, 'image_url')[:1000] or None,
+    }
+
+
+def _existing_canonical_urls(connection, canonical_urls: List[str]) -> set:
+    if not canonical_urls:
+        return set()
+    return set(connection.execute(
+        select(_recipes.c.canonical_url).where(_recipes.c.canonical_url.in_(canonical_urls))
+    ).scalars())
+
+
+def _insert_chunk(engine, rows: List[Dict], report: ImportReport) -> None:
+    """Insert one chunk in its own transaction, dropping rows already in the database"""
+    for attempt in range(2):
+        try:
+            with engine.begin() as connection:
+                urls = [row['canonical_url'] for row in rows if row['canonical_url']]
+                existing = _existing_canonical_urls(connection, urls)
+                fresh = [row for row in rows if row['canonical_url'] not in existing]
+                if fresh:
+                    bulk_insert(connection, _recipes, fresh)
+            report.inserted += len(fresh)
+            report.duplicates += len(rows) - len(fresh)
+            return
+        except IntegrityError:
+            # Someone saved one of these URLs between our check and the insert; check again
+            if attempt:
+                raise
+
+
+def import_lines(engine, lines: Iterable[Union[str, bytes]], chunk_size: int = IMPORT_CHUNK_SIZE) -> ImportReport:
+    """Insert NDJSON recipes from lines, chunk_size rows per transaction"""
+    report = ImportReport()
+    now = datetime.utcnow()
+    # Earlier chunks are already committed and caught by the database check,
+    # so only the pending chunk needs remembering
+    seen = set()
+    chunk: List[Dict] = []
+
+    for line_number, line in enumerate(lines, start=1):
+        report.lines = line_number
+        try:
+            # Decoded line by line, so one badly encoded line is just one bad line
+            if isinstance(line, bytes):
+                line = line.decode('utf-8-sig' if line_number == 1 else 'utf-8')
+            line = line.strip()
+            if not line:
+                continue
+            row = record_to_row(json.loads(line), now)
+        except (ValueError, TypeError) as e:
+            report.error(line_number, str(e))
+            continue
+
+        canonical_url = row['canonical_url']
+        if canonical_url:
+            if canonical_url in seen:
+                report.duplicates += 1
+                continue
+            seen.add(canonical_url)
+
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _insert_chunk(engine, chunk, report)
+            chunk = []
+            seen.clear()
+
+    if chunk:
+        _insert_chunk(engine, chunk, report)
+    report.seconds = time.perf_counter() - report.started
+    return report
+
+
+def _open_text(path: str, mode: str):
+    """Open path for writing text, or for reading bytes (import_lines decodes
+    each line itself); '-' is stdin/stdout and .gz files are (de)compressed"""
+    if path == '-':
+        return sys.stdin.buffer if mode == 'r' else sys.stdout
+    if path.endswith('.gz'):
+        if mode == 'r':
+            return gzip.open(path, 'rb')
+        return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+    if mode == 'r':
+        return open(path, 'rb')
+    return open(path, mode, encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export or import the QuickBasket recipe library as NDJSON')
+    parser.add_argument('--db', help='SQLite database file or database URL (default: the app database / DATABASE_URL)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help='write every recipe to an NDJSON file')
+    export_parser.add_argument('path', help="output file, .gz to compress, '-' for stdout")
+    import_parser = commands.add_parser('import', help='add recipes from an NDJSON file')
+    import_parser.add_argument('path', help="input file, .gz is decompressed, '-' for stdin")
+    import_parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='rows per transaction')
+    args = parser.parse_args()
+
+    if args.db:
+        from models import build_engine, prepare_database
+        engine = build_engine(args.db if '://' in args.db else f"sqlite:///{args.db}")
+        prepare_database(engine)
+    else:
+        from models import engine, init_db
+        init_db()
+
+    # Progress goes to stderr so `export -` can be piped
+    log = sys.stderr
+    if args.command == 'export':
+        started = time.perf_counter()
+        count = 0
+        with _open_text(args.path, 'w') as handle:
+            for line in export_lines(engine):
+                handle.write(line)
+                count += 1
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed if elapsed else 0.0
+        print(f"✅ Exported {count:,} recipes in {elapsed:.2f}s ({rate:,.0f} rows/s)", file=log)
+        return
+
+    with _open_text(args.path, 'r') as handle:
+        report = import_lines(engine, handle, chunk_size=args.chunk_size)
+    print(f"✅ Imported {report.inserted:,} recipes in {report.seconds:.2f}s "
+          f"({report.rows_per_second:,.0f} rows/s)", file=log)
+    print(f"   {report.duplicates:,} duplicates skipped, {report.error_count:,} bad lines", file=log)
+    for message in report.errors:
+        print(f"   ❌ {message}", file=log)
+    if report.error_count:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,24 @@
 import requests
 from bs4 import BeautifulSoup
 from typing import Dict, List, Optional, Tuple, Any, TypeVar, Callable, Union
-from urllib.parse import urlparse
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
 import re
 import logging
+import codecs
+import html as html_module
 import json
+import math
 import random
 import time
 from functools import wraps
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from circuit_breaker import CircuitBreaker, HostCircuitBreakers, NegativeCache
+from extraction_memory import ExtractionMemory
+from metrics import SCRAPES, SCRAPE_DURATION, SCRAPE_EXTRACTIONS, EXTRACTION_ATTEMPTS, CACHE_LOOKUPS
+from single_flight import SingleFlight
+from site_extractors import SiteExtractor, SiteExtractorRegistry, load_registry
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
@@ -21,6 +28,9 @@ def log_operation(operation_name: str) -> Callable:
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
         @wraps(func)
         def wrapper(*args, **kwargs) -> T:
+            # The messages repr whole soups, so don't build them unless they can be logged
+            if not logger.isEnabledFor(logging.DEBUG):
+                return func(*args, **kwargs)
             logger.debug(f"{operation_name} input: args={args[1:]}, kwargs={kwargs}")
             result = func(*args, **kwargs)
             logger.debug(f"{operation_name} output: {result}")
@@ -28,6 +38,51 @@ def log_operation(operation_name: str) -> Callable:
         return wrapper
     return decorator
 
+def json_ld_image_url(value: Any) -> Optional[str]:
+    """First photo URL from a JSON-LD image: a URL, an ImageObject or a list of either"""
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, dict):
+        return json_ld_image_url(value.get('url') or value.get('contentUrl'))
+    if isinstance(value, list):
+        for item in value:
+            image_url = json_ld_image_url(item)
+            if image_url:
+                return image_url
+    return None
+
+META_TAG_RE = re.compile(r'<meta\b[^>]*>', re.I)
+META_ATTRIBUTE_RE = re.compile(r'([a-zA-Z:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+# In order of preference, as in RecipeScrapingService._extract_og_image
+OG_IMAGE_META = (('property', 'og:image'), ('property', 'og:image:url'), ('name', 'twitter:image'))
+
+def og_image_from_html(html: str) -> Optional[str]:
+    """The og:image (or twitter:image) photo URL from a page's meta tags, found
+    without parsing the page; for the streamed JSON-LD path, which never does"""
+    found = {}
+    for tag in META_TAG_RE.finditer(html):
+        # Only one of the three value groups matches; the others are ''
+        attributes = {name.lower(): ''.join(values) for name, *values in META_ATTRIBUTE_RE.findall(tag.group(0))}
+        content = html_module.unescape(attributes.get('content', '')).strip()
+        if not content:
+            continue
+        for attribute, name in OG_IMAGE_META:
+            if attributes.get(attribute, '').lower() == name:
+                found.setdefault(name, content)
+    for _, name in OG_IMAGE_META:
+        if name in found:
+            return found[name]
+    return None
+
+def resolve_image_url(image_url: Optional[str], page_url: str) -> Optional[str]:
+    """Absolute http(s) URL of a photo found on page_url, or None"""
+    if not image_url:
+        return None
+    image_url = urljoin(page_url, image_url)
+    if urlparse(image_url).scheme not in ('http', 'https') or len(image_url) > 1000:
+        return None
+    return image_url
+
 def clean_text(text: str) -> str:
     """Clean text by removing parentheses content and extra whitespace."""
     cleaned = text.strip()
@@ -66,6 +121,98 @@ def clean_and_deduplicate(items: List[str], item_type: str = "item") -> List[str
     logger.debug(f"Found {len(cleaned_items)} unique {item_type}s")
     return cleaned_items
 
+# Query parameters set by known trackers (plus utm_*), which never change the page.
+# Generic names such as ref or share stay: some sites use them for real content,
+# and dropping them would merge different recipes under one dedupe key.
+TRACKING_QUERY_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid',
+    'mc_cid', 'mc_eid', 'igshid', '_ga', '_gl', 'ref_src', 'cmpid',
+}
+# AMP variants of a page, alongside the /amp path forms handled below
+AMP_QUERY_PARAMS = {'amp', 'outputtype'}
+
+def canonicalize_url(url: str) -> Optional[str]:
+    """
+    Normalize a recipe URL into the key used to detect re-imports.
+    Drops tracking params, fragments, AMP variants, 'www.', default ports and
+    trailing slashes so that every shared variant of a page maps to one key.
+    Returns None if the URL is not a usable http(s) URL.
+    """
+    if not url:
+        return None
+    try:
+        parsed = urlparse(url.strip())
+    except ValueError:
+        return None
+    if parsed.scheme.lower() not in ('http', 'https') or not parsed.hostname:
+        return None
+
+    host = parsed.hostname.lower().rstrip('.')
+    for prefix in ('www.', 'amp.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    try:
+        port = parsed.port
+    except ValueError:
+        return None
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    # Collapse duplicate slashes and strip AMP path variants (/amp/..., .../amp)
+    segments = [segment for segment in parsed.path.split('/') if segment]
+    if segments and segments[0].lower() == 'amp':
+        segments = segments[1:]
+    if segments and segments[-1].lower() == 'amp':
+        segments = segments[:-1]
+    path = '/' + '/'.join(segments)
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_')
+        and key.lower() not in TRACKING_QUERY_PARAMS
+        and key.lower() not in AMP_QUERY_PARAMS
+    )
+
+    # The scheme is part of the key only in normalized form; http and https
+    # variants of the same page are the same recipe.
+    return urlunparse(('https', host, path, '', urlencode(query), ''))
+
+# Opening tag of a JSON-LD block, matched against raw response bytes while streaming
+JSON_LD_OPEN_RE = re.compile(rb'<script[^>]*application/ld\+json[^>]*>', re.I)
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.I)
+HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([a-zA-Z0-9_.:-]+)', re.I)
+
+def sniff_charset(content_type: str, head: bytes) -> str:
+    """
+    Pick the page encoding from a BOM, the Content-Type header or a <meta>
+    charset in the first few KB, in that order (as browsers do). Falls back
+    to UTF-8 instead of running statistical detection over the whole body.
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8'
+    if head.startswith(codecs.BOM_UTF16_LE):
+        return 'utf-16-le'
+    if head.startswith(codecs.BOM_UTF16_BE):
+        return 'utf-16-be'
+
+    candidates = []
+    header_match = HEADER_CHARSET_RE.search(content_type or '')
+    if header_match:
+        candidates.append(header_match.group(1))
+    meta_match = META_CHARSET_RE.search(head)
+    if meta_match:
+        candidates.append(meta_match.group(1).decode('ascii', errors='ignore'))
+
+    for candidate in candidates:
+        try:
+            name = codecs.lookup(candidate).name
+        except LookupError:
+            continue
+        # Pages labelled latin-1 are almost always really windows-1252
+        return 'cp1252' if name == 'iso8859-1' else name
+    return 'utf-8'
+
 def split_text_to_list(text: Union[str, List[str]], separator: str = '\n') -> List[str]:
     """Convert text to list, handling both string and list inputs."""
     if isinstance(text, str):
@@ -74,8 +221,66 @@ def split_text_to_list(text: Union[str, List[str]], separator: str = '\n') -> Li
         return [item.strip() for item in text if item.strip()]
     return []
 
+class StreamedPage:
+    """
+    Incremental page download shared by the blocking and asyncio fetchers:
+    feed() chunks as they arrive until it returns True, then finish().
+    """
+
+    def __init__(self, service: 'RecipeScrapingService', url: str, content_type: str):
+        self.service = service
+        self.url = url
+        self.content_type = content_type.lower()
+        self.is_webpage = any(t in self.content_type for t in ['text/html', 'application/xhtml', 'application/xml'])
+        self.body = bytearray()
+        self.encoding = None
+        self.scan_pos = 0
+        self.recipe_ld = None
+
+    def feed(self, chunk: bytes) -> bool:
+        """Add a chunk; True means stop reading (recipe found or size cap hit)"""
+        service = self.service
+        body = self.body
+        body.extend(chunk)
+        if self.encoding is None and (len(body) >= service.CHARSET_SNIFF_BYTES):
+            self.encoding = sniff_charset(self.content_type, bytes(body[:service.CHARSET_SNIFF_BYTES]))
+        if self.encoding is not None and not self.encoding.startswith('utf-16'):
+            self.recipe_ld, self.scan_pos = service._scan_json_ld(body, self.scan_pos, self.encoding)
+            if self.recipe_ld:
+                return True
+        if len(body) >= service.max_page_bytes:
+            logger.warning(f"Page {self.url} exceeds {service.max_page_bytes} bytes, parsing the first part only")
+            del body[service.max_page_bytes:]
+            return True
+        return False
+
+    def finish(self) -> Tuple[str, Optional[Dict]]:
+        """Returns (html, recipe_ld) for everything fed so far"""
+        body = self.body
+        encoding = self.encoding
+        if encoding is None:
+            encoding = sniff_charset(self.content_type, bytes(body[:self.service.CHARSET_SNIFF_BYTES]))
+        recipe_ld = self.recipe_ld
+        if recipe_ld is None and not encoding.startswith('utf-16'):
+            recipe_ld, _ = self.service._scan_json_ld(body, self.scan_pos, encoding)
+        html = body.decode(encoding, errors='replace')
+        if html.startswith('\ufeff'):
+            html = html[1:]
+        return html, recipe_ld
+
 class RecipeScrapingService:
-    def __init__(self):
+    # Outcomes of a single page scrape, used to feed the breaker and negative cache
+    SUCCESS = 'success'
+    HOST_FAILURE = 'host_failure'
+    PAGE_FAILURE = 'page_failure'
+
+    FETCH_CHUNK_SIZE = 16 * 1024
+    CHARSET_SNIFF_BYTES = 4096  # Same window browsers use for <meta charset> prescan
+
+    def __init__(self, breaker_failure_threshold: int = 5, breaker_recovery_timeout: float = 60.0,
+                 negative_cache_ttl: float = 600.0, max_page_bytes: int = 5 * 1024 * 1024,
+                 extraction_memory: Optional[ExtractionMemory] = None,
+                 site_extractors: Optional[SiteExtractorRegistry] = None):
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0',
@@ -94,204 +299,354 @@ class RecipeScrapingService:
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
 
+        # Fail fast on hosts that are down or blocking us, and on pages that
+        # recently failed extraction
+        self.breakers = HostCircuitBreakers(
+            failure_threshold=breaker_failure_threshold,
+            recovery_timeout=breaker_recovery_timeout
+        )
+        self.negative_cache = NegativeCache(ttl=negative_cache_ttl)
+
+        # Pages are streamed and cut off here; recipe markup is near the top
+        self.max_page_bytes = max_page_bytes
+
+        # Concurrent imports of the same recipe share one fetch and parse
+        self.flights = SingleFlight('scrape')
+
+        # Which extraction strategies work on which host; kept in memory only
+        # unless the caller passes one backed by the database
+        self.extraction_memory = extraction_memory or ExtractionMemory()
+
+        # Targeted selectors for known sites, compiled once here
+        self.site_extractors = site_extractors if site_extractors is not None else load_registry()
+
     def scrape_recipe(self, url: str) -> Tuple[Optional[Dict], Optional[str]]:
         """
         Scrape recipe information from a given URL.
         Returns a tuple of (recipe_data, error_message).
         recipe_data contains title, ingredients, and instructions if successful.
+        Concurrent calls for the same recipe (by canonical URL) share one scrape.
+        """
+        key = self.flight_key(url)
+        if key is None:
+            return self._scrape_recipe(url)
+        return self.flights.do(key, lambda: self._scrape_recipe(url))
+
+    @staticmethod
+    def flight_key(url: str) -> Optional[str]:
+        """Single-flight key for url; None for URLs _admit rejects anyway"""
+        if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+            return None
+        return canonicalize_url(url)
+
+    def _scrape_recipe(self, url: str) -> Tuple[Optional[Dict], Optional[str]]:
+        rejection, cache_key, breaker = self._admit(url)
+        if rejection:
+            return None, rejection
+
+        started = time.perf_counter()
+        recipe_data, error, outcome = self._scrape_page(url)
+        return self._settle(cache_key, breaker, started, recipe_data, error, outcome)
+
+    def _admit(self, url: str) -> Tuple[Optional[str], Optional[str], Optional[CircuitBreaker]]:
         """
+        Checks that run before any fetch: URL validity, the negative cache and
+        the host's circuit breaker.
+        Returns (error_message, cache_key, breaker); error_message is set when
+        the URL should not be fetched.
+        """
+        # Validate URL
+        if not url.startswith(('http://', 'https://')):
+            return "Invalid URL. Please include http:// or https://", None, None
+
+        # Parse URL to check validity
         try:
-            # Validate URL
-            if not url.startswith(('http://', 'https://')):
-                return None, "Invalid URL. Please include http:// or https://"
+            parsed_url = urlparse(url)
+            if not all([parsed_url.scheme, parsed_url.netloc]) or not parsed_url.hostname:
+                return "Invalid URL format. Please check the URL and try again.", None, None
+        except Exception as e:
+            logger.error(f"URL parsing error: {str(e)}")
+            return "Invalid URL format. Please check the URL and try again.", None, None
 
-            # Parse URL to check validity
-            try:
-                parsed_url = urlparse(url)
-                if not all([parsed_url.scheme, parsed_url.netloc]):
-                    return None, "Invalid URL format. Please check the URL and try again."
-            except Exception as e:
-                logger.error(f"URL parsing error: {str(e)}")
-                return None, "Invalid URL format. Please check the URL and try again."
+        # Pages that recently failed extraction fail again without a fetch
+        cache_key = canonicalize_url(url) or url
+        cached_error = self.negative_cache.get(cache_key)
+        CACHE_LOOKUPS.inc(cache='negative_url', result='hit' if cached_error else 'miss')
+        if cached_error:
+            logger.info(f"Negative cache hit for {url}")
+            SCRAPES.inc(outcome='negative_cache')
+            return cached_error, cache_key, None
+
+        # Hosts that keep failing are skipped until their breaker lets a probe through
+        host = parsed_url.hostname
+        breaker = self.breakers.get(host)
+        if not breaker.allow_request():
+            retry_after = max(1, math.ceil(breaker.retry_after()))
+            logger.warning(f"Circuit open for {host}, skipping fetch of {url}")
+            SCRAPES.inc(outcome='circuit_open')
+            return f"{host} is not responding right now. Please try again in {retry_after} seconds.", cache_key, breaker
+        return None, cache_key, breaker
 
+    def _settle(self, cache_key: str, breaker: CircuitBreaker, started: float, recipe_data: Optional[Dict],
+                error: Optional[str], outcome: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """Record a finished scrape in the metrics, breaker and negative cache"""
+        SCRAPES.inc(outcome=outcome)
+        SCRAPE_DURATION.observe(time.perf_counter() - started, outcome=outcome)
+
+        if outcome == self.HOST_FAILURE:
+            breaker.record_failure(error)
+        else:
+            breaker.record_success()
+        if outcome == self.PAGE_FAILURE:
+            self.negative_cache.add(cache_key, error)
+        elif recipe_data:
+            self.negative_cache.discard(cache_key)
+        return recipe_data, error
+
+    def request_headers(self) -> Dict[str, str]:
+        """Browser-like headers with a random user agent"""
+        return {
+            'User-Agent': random.choice(self.user_agents),
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'DNT': '1',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+        }
+
+    def _scrape_page(self, url: str) -> Tuple[Optional[Dict], Optional[str], str]:
+        """
+        Fetch and extract one page.
+        Returns (recipe_data, error_message, outcome) where outcome tells the
+        caller whether a failure was the host's fault or the page's.
+        """
+        try:
             # Make request with timeout and random user agent
-            headers = {
-                'User-Agent': random.choice(self.user_agents),
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-            
+            headers = self.request_headers()
+
             try:
-                response = self.session.get(url, headers=headers, timeout=15)
-                response.raise_for_status()
+                html, recipe_ld = self._fetch_page(url, headers)
             except requests.exceptions.SSLError:
                 logger.warning(f"SSL verification failed for {url}, attempting without verification")
-                response = self.session.get(url, headers=headers, timeout=15, verify=False)
-                response.raise_for_status()
+                html, recipe_ld = self._fetch_page(url, headers, verify=False)
             
-            # Check content type and encoding
-            content_type = response.headers.get('Content-Type', '').lower()
-            if not any(t in content_type for t in ['text/html', 'application/xhtml', 'application/xml']):
-                return None, "URL does not point to a webpage"
+            return self.finish_page(html, recipe_ld, url, self.extract_recipe)
+
+        except requests.Timeout:
+            return None, "Request timed out. Please try again.", self.HOST_FAILURE
+        except requests.HTTPError as e:
+            logger.error(f"Error fetching URL {url}: {str(e)}")
+            error_msg = "Could not access the webpage. Please check the URL and try again."
+            status = e.response.status_code if e.response is not None else None
+            # A missing page is the page's problem; auth walls, rate limits and 5xx are the host's
+            if status in (404, 410):
+                return None, error_msg, self.PAGE_FAILURE
+            return None, error_msg, self.HOST_FAILURE
+        except requests.RequestException as e:
+            logger.error(f"Error fetching URL {url}: {str(e)}")
+            return None, "Could not access the webpage. Please check the URL and try again.", self.HOST_FAILURE
+        except Exception as e:
+            logger.error(f"Unexpected error scraping recipe from {url}: {str(e)}")
+            return None, "An unexpected error occurred while processing the recipe.", self.PAGE_FAILURE
+
+    def finish_page(self, html: Optional[str], recipe_ld: Optional[Dict], url: str,
+                    extract: Callable[[str, str], Tuple[Optional[Dict], Optional[str]]]
+                    ) -> Tuple[Optional[Dict], Optional[str], str]:
+        """Turn a fetched page into (recipe_data, error_message, outcome)"""
+        if html is None:
+            return None, "URL does not point to a webpage", self.PAGE_FAILURE
+
+        # A complete Recipe ld+json block was seen while streaming; no need to parse the page
+        if recipe_ld:
+            logger.info(f"Extracted recipe from streamed JSON-LD for {url}")
+            SCRAPE_EXTRACTIONS.inc(path='json_ld_stream')
+            recipe_ld['image_url'] = resolve_image_url(recipe_ld.get('image_url') or og_image_from_html(html), url)
+            return recipe_ld, None, self.SUCCESS
+
+        recipe_data, error = extract(html, url)
+        if error:
+            return None, error, self.PAGE_FAILURE
+        return recipe_data, None, self.SUCCESS
+
+    def _fetch_page(self, url: str, headers: Dict, verify: bool = True) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        Stream a page body, stopping at max_page_bytes or as soon as a complete
+        Recipe ld+json block has arrived.
+        Returns (html, recipe_ld). html is None if the URL is not a webpage;
+        recipe_ld is set when the streamed JSON-LD already holds a usable recipe.
+        """
+        with self.session.get(url, headers=headers, timeout=15, verify=verify, stream=True) as response:
+            response.raise_for_status()
+
+            # Check content type before downloading anything
+            page = StreamedPage(self, url, response.headers.get('Content-Type', ''))
+            if not page.is_webpage:
+                return None, None
 
-            # Try to detect encoding correctly
-            if response.encoding == 'ISO-8859-1':
-                response.encoding = response.apparent_encoding
+            for chunk in response.iter_content(chunk_size=self.FETCH_CHUNK_SIZE):
+                if page.feed(chunk):
+                    break
+        return page.finish()
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+    def _scan_json_ld(self, body: bytearray, scan_pos: int, encoding: str) -> Tuple[Optional[Dict], int]:
+        """
+        Look for complete ld+json script blocks in body from scan_pos on.
+        Returns (recipe_ld, new_scan_pos); scanning resumes at an unfinished block.
+        """
+        while True:
+            match = JSON_LD_OPEN_RE.search(body, scan_pos)
+            if not match:
+                # Keep a tail so an opening tag split across chunks is still found
+                return None, max(scan_pos, len(body) - 256)
+            close = body.find(b'</script', match.end())
+            if close == -1:
+                return None, match.start()
+            scan_pos = close
+            block = bytes(body[match.end():close])
+            if b'Recipe' not in block:
+                continue
+            recipe_ld = self._recipe_from_json_ld(block.decode(encoding, errors='replace'))
+            if recipe_ld:
+                return recipe_ld, scan_pos
+
+    def extract_recipe(self, html: str, url: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Run the extraction cascade over an already downloaded page.
+        Returns a tuple of (recipe_data, error_message) like scrape_recipe.
+        Strategies that worked on earlier pages from the same host are tried first.
+        """
+        try:
+            soup = BeautifulSoup(html, 'html.parser')
+            host = urlparse(url).hostname or ''
             
             logger.info(f"Starting recipe extraction from {url}")
             
-            # Initialize recipe data containers
-            title = ""
-            ingredients = []
-            instructions = []
-            
-            # Try to extract from JSON-LD first
-            recipe_ld = self._extract_json_ld(soup)
-            if recipe_ld:
+            # A known site's own selectors first, then JSON-LD, then the page's
+            # fields, unless this host's pages never have usable JSON-LD
+            error_messages: List[str] = []
+            strategies = [
+                (('json_ld', -1), lambda: self._extract_json_ld(soup)),
+                (('fields', -1), lambda: self._extract_fields(soup, url, host, error_messages)),
+            ]
+            site = self.site_extractors.for_host(host)
+            if site is not None:
+                strategies.insert(0, (('site', -1), lambda: self._extract_site(soup, url, site)))
+            recipe_data, strategy = self._run_strategies(host, 'page', strategies)
+            if recipe_data:
+                recipe_data['image_url'] = resolve_image_url(
+                    recipe_data.get('image_url') or self._extract_og_image(soup), url)
+            if strategy == ('site', -1):
+                logger.info(f"Extracted recipe with the {site.name} site selectors")
+                SCRAPE_EXTRACTIONS.inc(path='site')
+                return recipe_data, None
+            if strategy == ('json_ld', -1):
                 logger.info("Successfully extracted recipe from JSON-LD data")
-                return recipe_ld, None
-            
-            # Fallback to HTML parsing
-            logger.info("JSON-LD extraction failed, trying HTML parsing")
+                SCRAPE_EXTRACTIONS.inc(path='json_ld')
+                return recipe_data, None
+            if recipe_data:
+                return recipe_data, None
             
-            # Try to extract title from the webpage
-            title = self._extract_title(soup)
-            if title:
-                logger.info(f"Found recipe title: {title}")
-            else:
-                logger.warning("Failed to extract recipe title")
-            
-            # Try to find ingredients first in microdata
-            ingredients = self._extract_microdata_ingredients(soup)
-            if ingredients:
-                logger.info(f"Found {len(ingredients)} ingredients from microdata")
-            else:
-                logger.info("Trying HTML parsing for ingredients")
-                ingredients = self._extract_ingredients(soup)
-                if ingredients:
-                    logger.info(f"Found {len(ingredients)} ingredients from HTML")
-            
-            # Try to find instructions first in microdata
-            instructions = self._extract_microdata_instructions(soup)
-            if instructions:
-                logger.info(f"Found {len(instructions)} instructions from microdata")
-            else:
-                logger.info("Trying HTML parsing for instructions")
-                instructions = self._extract_instructions(soup)
-                if instructions:
-                    logger.info(f"Found {len(instructions)} instructions from HTML")
-            
-            # Enhanced validation with detailed error messages
-            error_messages = []
-            if not title:
-                error_messages.append("Could not find recipe title")
-            if not ingredients:
-                error_messages.append("Could not find recipe ingredients")
-            if not instructions:
-                error_messages.append("Could not find recipe instructions")
-                
-            if error_messages:
-                error_msg = "Failed to extract recipe: " + "; ".join(error_messages)
-                logger.error(error_msg)
-                return None, error_msg
-            
-            recipe_data = {
-                'title': title,
-                'ingredients': ingredients,
-                'instructions': instructions,
-                'source_url': url
-            }
-            
-            return recipe_data, None
+            if not error_messages:
+                return None, "An unexpected error occurred while processing the recipe."
+            error_msg = "Failed to extract recipe: " + "; ".join(error_messages)
+            logger.error(error_msg)
+            SCRAPE_EXTRACTIONS.inc(path='failed')
+            return None, error_msg
 
-        except requests.Timeout:
-            return None, "Request timed out. Please try again."
-        except requests.RequestException as e:
-            logger.error(f"Error fetching URL {url}: {str(e)}")
-            return None, "Could not access the webpage. Please check the URL and try again."
         except Exception as e:
-            logger.error(f"Unexpected error scraping recipe from {url}: {str(e)}")
+            logger.error(f"Unexpected error extracting recipe from {url}: {str(e)}")
             return None, "An unexpected error occurred while processing the recipe."
 
+    def _extract_site(self, soup: BeautifulSoup, url: str, site: SiteExtractor) -> Optional[Dict]:
+        """Recipe from a known site's selectors, or None if they no longer match the page"""
+        fields = site.extract(soup)
+        title = fields['title'][0] if fields['title'] else self._extract_title(soup)
+        ingredients = self._clean_ingredients(fields['ingredients'])
+        instructions = [self._clean_instruction(text) for text in fields['instructions']]
+        instructions = [i for i in instructions if i]
+        if not (title and ingredients and instructions):
+            logger.warning(f"The {site.name} site selectors found no complete recipe on {url}")
+            return None
+        return {
+            'title': title,
+            'ingredients': ingredients,
+            'instructions': instructions,
+            'source_url': url
+        }
+
+    def _extract_fields(self, soup: BeautifulSoup, url: str, host: str,
+                        error_messages: List[str]) -> Optional[Dict]:
+        """Recipe from the page's title, ingredients and instructions; appends what is missing to error_messages"""
+        title = self._extract_title(soup)
+        if title:
+            logger.debug(f"Found recipe title: {title}")
+        else:
+            logger.warning("Failed to extract recipe title")
+        
+        ingredients, ingredients_from = self._extract_ingredients(soup, host)
+        if ingredients:
+            logger.debug(f"Found {len(ingredients)} ingredients from {ingredients_from[0]}")
+        
+        instructions, instructions_from = self._extract_instructions(soup, host)
+        if instructions:
+            logger.debug(f"Found {len(instructions)} instructions from {instructions_from[0]}")
+        
+        # Enhanced validation with detailed error messages
+        if not title:
+            error_messages.append("Could not find recipe title")
+        if not ingredients:
+            error_messages.append("Could not find recipe ingredients")
+        if not instructions:
+            error_messages.append("Could not find recipe instructions")
+        if error_messages:
+            return None
+        
+        used_html_fallback = 'pattern' in (ingredients_from[0], instructions_from[0])
+        SCRAPE_EXTRACTIONS.inc(path='html' if used_html_fallback else 'microdata')
+        return {
+            'title': title,
+            'ingredients': ingredients,
+            'instructions': instructions,
+            'source_url': url
+        }
+
+    def _run_strategies(self, host: str, stage: str,
+                        strategies: List[Tuple[Tuple[str, int], Callable[[], Any]]]) -> Tuple[Any, Optional[Tuple[str, int]]]:
+        """
+        Try each (strategy, find) in the order the extraction memory gives for host
+        and record how each attempt went.
+        Returns (result, strategy) for the first that finds something, else (None, None).
+        """
+        searches = dict(strategies)
+        for strategy in self.extraction_memory.order(host, stage, [name for name, _ in strategies]):
+            started = time.perf_counter()
+            try:
+                result = searches[strategy]()
+            except Exception as e:
+                logger.debug(f"Error in {stage} extraction {strategy}: {str(e)}")
+                result = None
+            found = bool(result)
+            self.extraction_memory.record(host, stage, strategy, found, time.perf_counter() - started)
+            EXTRACTION_ATTEMPTS.inc(stage=stage, result='hit' if found else 'miss')
+            if found:
+                return result, strategy
+        return None, None
+
     def _extract_json_ld(self, soup: BeautifulSoup) -> Optional[Dict]:
         """Extract recipe data from JSON-LD structured data"""
         try:
             scripts = soup.find_all('script', type='application/ld+json')
-            logger.info(f"Found {len(scripts)} JSON-LD scripts")
+            logger.debug(f"Found {len(scripts)} JSON-LD scripts")
             
             for script in scripts:
                 if not script.string:
                     logger.debug("Empty JSON-LD script, skipping")
                     continue
                 
-                try:
-                    data = json.loads(script.string)
-                    recipes = []
-                    
-                    # Handle different JSON-LD formats
-                    if isinstance(data, dict):
-                        if data.get('@type') == 'Recipe':
-                            recipes = [data]
-                        elif '@graph' in data:
-                            recipes = [item for item in data['@graph'] 
-                                     if item.get('@type') == 'Recipe']
-                        elif isinstance(data.get('mainEntity'), dict):
-                            entity = data['mainEntity']
-                            if entity.get('@type') == 'Recipe':
-                                recipes = [entity]
-                    elif isinstance(data, list):
-                        recipes = [item for item in data if item.get('@type') == 'Recipe']
-
-                    if not recipes:
-                        logger.debug("No recipe found in JSON-LD")
-                        continue
-
-                    logger.info(f"Found {len(recipes)} recipes in JSON-LD")
-                    recipe = recipes[0]  # Take the first recipe
-                    
-                    # Extract ingredients
-                    ingredients = recipe.get('recipeIngredient', [])
-                    if not ingredients and 'ingredients' in recipe:
-                        ingredients = recipe.get('ingredients', [])
-                        
-                    # Ensure ingredients is a list
-                    if isinstance(ingredients, str):
-                        ingredients = [ing.strip() for ing in ingredients.split('\n') if ing.strip()]
-                    
-                    # Extract instructions
-                    instructions = []
-                    raw_instructions = recipe.get('recipeInstructions', [])
-                    
-                    if isinstance(raw_instructions, str):
-                        instructions = [step.strip() for step in raw_instructions.split('\n')
-                                     if step.strip()]
-                    elif isinstance(raw_instructions, list):
-                        for instruction in raw_instructions:
-                            if isinstance(instruction, str):
-                                instructions.append(instruction)
-                            elif isinstance(instruction, dict):
-                                text = instruction.get('text', '')
-                                if text:
-                                    instructions.append(text)
-                    
-                    if ingredients and instructions:
-                        recipe_data = {
-                            'title': recipe.get('name', ''),
-                            'ingredients': ingredients,
-                            'instructions': instructions,
-                            'source_url': recipe.get('url', '')
-                        }
-                        logger.info("Successfully extracted recipe from JSON-LD")
-                        return recipe_data
-                except json.JSONDecodeError as decode_error:
-                    logger.debug(f"Invalid JSON in script: {str(decode_error)}")
-                except Exception as script_error:
-                    logger.debug(f"Error processing JSON-LD script: {str(script_error)}")
+                recipe_data = self._recipe_from_json_ld(script.string)
+                if recipe_data:
+                    logger.debug("Successfully extracted recipe from JSON-LD")
+                    return recipe_data
             
             logger.debug("No valid recipe found in any JSON-LD script")
             return None
@@ -300,6 +655,82 @@ class RecipeScrapingService:
             logger.error(f"Error in JSON-LD extraction: {str(extraction_error)}")
             return None
 
+    def _recipe_from_json_ld(self, script_text: str) -> Optional[Dict]:
+        """Build recipe data from one ld+json script body, or None if it holds no usable recipe"""
+        try:
+            data = json.loads(script_text)
+            recipes = []
+            
+            # Handle different JSON-LD formats
+            if isinstance(data, dict):
+                if data.get('@type') == 'Recipe':
+                    recipes = [data]
+                elif '@graph' in data:
+                    recipes = [item for item in data['@graph'] 
+                             if item.get('@type') == 'Recipe']
+                elif isinstance(data.get('mainEntity'), dict):
+                    entity = data['mainEntity']
+                    if entity.get('@type') == 'Recipe':
+                        recipes = [entity]
+            elif isinstance(data, list):
+                recipes = [item for item in data if item.get('@type') == 'Recipe']
+
+            if not recipes:
+                logger.debug("No recipe found in JSON-LD")
+                return None
+
+            logger.debug(f"Found {len(recipes)} recipes in JSON-LD")
+            recipe = recipes[0]  # Take the first recipe
+            
+            # Extract ingredients
+            ingredients = recipe.get('recipeIngredient', [])
+            if not ingredients and 'ingredients' in recipe:
+                ingredients = recipe.get('ingredients', [])
+                
+            # Ensure ingredients is a list
+            if isinstance(ingredients, str):
+                ingredients = [ing.strip() for ing in ingredients.split('\n') if ing.strip()]
+            
+            # Extract instructions
+            instructions = []
+            raw_instructions = recipe.get('recipeInstructions', [])
+            
+            if isinstance(raw_instructions, str):
+                instructions = [step.strip() for step in raw_instructions.split('\n')
+                             if step.strip()]
+            elif isinstance(raw_instructions, list):
+                for instruction in raw_instructions:
+                    if isinstance(instruction, str):
+                        instructions.append(instruction)
+                    elif isinstance(instruction, dict):
+                        text = instruction.get('text', '')
+                        if text:
+                            instructions.append(text)
+            
+            if ingredients and instructions:
+                recipe_data = {
+                    'title': recipe.get('name', ''),
+                    'ingredients': ingredients,
+                    'instructions': instructions,
+                    'source_url': recipe.get('url', ''),
+                    'image_url': json_ld_image_url(recipe.get('image'))
+                }
+                return recipe_data
+            return None
+        except json.JSONDecodeError as decode_error:
+            logger.debug(f"Invalid JSON in script: {str(decode_error)}")
+        except Exception as script_error:
+            logger.debug(f"Error processing JSON-LD script: {str(script_error)}")
+        return None
+
+    def _extract_og_image(self, soup: BeautifulSoup) -> Optional[str]:
+        """The page's og:image (or twitter:image) photo URL, if it has one"""
+        for attribute, name in (('property', 'og:image'), ('property', 'og:image:url'), ('name', 'twitter:image')):
+            tag = soup.find('meta', attrs={attribute: name})
+            if tag and tag.get('content', '').strip():
+                return tag['content'].strip()
+        return None
+
     def _extract_title(self, soup: BeautifulSoup) -> str:
         """Extract recipe title using common patterns"""
         # Try different common patterns for recipe titles
@@ -351,10 +782,9 @@ class RecipeScrapingService:
         return any(re.search(pattern, text) for pattern in patterns)
 
     @log_operation("extract_ingredients")
-    def _extract_ingredients(self, soup: BeautifulSoup) -> List[str]:
-        """Extract ingredients list using common patterns"""
-        ingredients = []
-        
+    def _extract_ingredients(self, soup: BeautifulSoup, host: str = '') -> Tuple[List[str], Optional[Tuple[str, int]]]:
+        """Extract ingredients from microdata or common patterns.
+        Returns (ingredients, strategy that found them)"""
         # Define ingredient pattern searches
         pattern_searches = [
             # Class-based patterns
@@ -378,23 +808,22 @@ class RecipeScrapingService:
                     if self._looks_like_ingredient(item.text)]
         ]
         
-        # Try each pattern until we find ingredients
-        for pattern_search in pattern_searches:
-            try:
-                items = pattern_search()
-                if items:
-                    found_ingredients = [item.text.strip() for item in items if item.text.strip()]
-                    # Validate found ingredients
-                    if found_ingredients and any(self._looks_like_ingredient(ing) for ing in found_ingredients):
-                        ingredients = found_ingredients
-                        break
-            except Exception as e:
-                logger.debug(f"Error in ingredient pattern search: {str(e)}")
-                continue
+        def pattern(search: Callable) -> Callable[[], List[str]]:
+            def find() -> List[str]:
+                found_ingredients = [item.text.strip() for item in search() if item.text.strip()]
+                # Validate found ingredients
+                if not any(self._looks_like_ingredient(ing) for ing in found_ingredients):
+                    return []
+                # Clean and validate the ingredients
+                cleaned_ingredients = clean_and_deduplicate(found_ingredients, "ingredient")
+                return [ing for ing in cleaned_ingredients if self._looks_like_ingredient(ing)]
+            return find
         
-        # Clean and validate the ingredients
-        cleaned_ingredients = clean_and_deduplicate(ingredients, "ingredient")
-        return [ing for ing in cleaned_ingredients if self._looks_like_ingredient(ing)]
+        # Microdata first, then each pattern until we find ingredients
+        ingredients, strategy = self._run_strategies(host, 'ingredients', [
+            (('microdata', -1), lambda: self._extract_microdata_ingredients(soup)),
+        ] + [(('pattern', index), pattern(search)) for index, search in enumerate(pattern_searches)])
+        return ingredients or [], strategy
 
     @log_operation("clean_ingredients")
     @log_operation("clean_ingredients")
@@ -441,10 +870,9 @@ class RecipeScrapingService:
         
         return text
 
-    def _extract_instructions(self, soup: BeautifulSoup) -> List[str]:
-        """Extract cooking instructions using common patterns"""
-        instructions = []
-        
+    def _extract_instructions(self, soup: BeautifulSoup, host: str = '') -> Tuple[List[str], Optional[Tuple[str, int]]]:
+        """Extract cooking instructions from microdata or common patterns.
+        Returns (instructions, strategy that found them)"""
         # Look for common instruction patterns
         pattern_searches = [
             # Class-based patterns
@@ -473,21 +901,19 @@ class RecipeScrapingService:
                     re.search(r'^[0-9]+[.)]\s|step\s+[0-9]+', p.text.strip(), re.I)]  # Numbered steps
         ]
         
-        # Try each pattern until we find instructions
-        for pattern_search in pattern_searches:
-            try:
-                items = pattern_search()
-                if items:
-                    instructions = [self._clean_instruction(item.text) for item in items]
-                    instructions = [i for i in instructions if i]  # Remove empty strings
-                    if instructions:
-                        logger.info(f"Found {len(instructions)} instructions using pattern: {pattern_search.__name__ if hasattr(pattern_search, '__name__') else 'anonymous'}")
-                        break
-            except Exception as e:
-                logger.debug(f"Error in instruction pattern search: {str(e)}")
-                continue
-                
-        return instructions
+        def pattern(search: Callable) -> Callable[[], List[str]]:
+            def find() -> List[str]:
+                instructions = [self._clean_instruction(item.text) for item in search()]
+                return [i for i in instructions if i]  # Remove empty strings
+            return find
+        
+        # Microdata first, then each pattern until we find instructions
+        instructions, strategy = self._run_strategies(host, 'instructions', [
+            (('microdata', -1), lambda: self._extract_microdata_instructions(soup)),
+        ] + [(('pattern', index), pattern(search)) for index, search in enumerate(pattern_searches)])
+        if strategy and strategy[0] == 'pattern':
+            logger.debug(f"Found {len(instructions)} instructions using pattern {strategy[1]}")
+        return instructions or [], strategy
 
     @log_operation("format_recipe")
     def format_recipe(self, recipe_data: Dict) -> Dict:
@@ -506,7 +932,8 @@ class RecipeScrapingService:
                 'title': clean_text(recipe_data.get('title', '')),
                 'ingredients': '\n'.join(unique_ingredients),
                 'instructions': '\n'.join(unique_instructions),
-                'source_url': recipe_data.get('source_url', '')
+                'source_url': recipe_data.get('source_url', ''),
+                'image_url': recipe_data.get('image_url') or None
             }
             
             # Validate formatted data
@@ -517,7 +944,7 @@ class RecipeScrapingService:
             if not formatted_data['instructions'].strip():
                 raise ValueError("Recipe instructions are missing")
             
-            logger.info(f"Formatted recipe: {len(unique_ingredients)} ingredients, {len(unique_instructions)} instructions")
+            logger.debug(f"Formatted recipe: {len(unique_ingredients)} ingredients, {len(unique_instructions)} instructions")
             return formatted_data
             
         except Exception as e:
@@ -0,0 +1,339 @@
+"""
+Per-request CPU profiling for production debugging.
+
+Two ways a request gets profiled:
+- On demand: an operator sends the request with an X-Profile header
+  (cprofile or sample) and the admin credentials (X-Admin-Token when
+  ADMIN_TOKEN is set). Anyone else's X-Profile header is ignored.
+- Slow request capture: a small random share of requests is watched by the
+  sampler, and the report is kept when the request turns out slower than
+  the threshold.
+
+Modes:
+- cprofile: exact call counts and times, but slows the request down a lot.
+  Only one request per process can be under cProfile at a time; others asked
+  for meanwhile fall back to the sampler.
+- sample: a background thread reads the request thread's stack every few
+  milliseconds. Cheap enough to leave on for the slow request capture.
+
+Reports (top functions by own and cumulative time, plus the request's SQL
+counts) are kept in memory, the last N per worker process. A profiled
+response carries X-Profile-Id; the app serves the reports on
+/admin/profiles. Streamed responses are profiled up to the first byte.
+
+Settings (app.config, defaulting from the environment):
+- PROFILE_SLOW_MS: requests at least this slow are kept (default 1000)
+- PROFILE_SLOW_SAMPLE_RATE: share of requests watched for that (default 0.01, 0 turns it off)
+- PROFILE_SAMPLE_INTERVAL_MS: sampler period (default 5)
+- PROFILE_KEEP: reports kept per process (default 20)
+- PROFILE_TOP: functions listed per report (default 25)
+"""
+
+import cProfile
+import itertools
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_STACK_DEPTH = 200
+
+FunctionKey = Tuple[str, int, str]
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(APP_DIR + os.sep):
+        return os.path.relpath(filename, APP_DIR)
+    marker = f"site-packages{os.sep}"
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return os.path.basename(filename) if os.sep in filename else filename
+
+
+def _function_name(key: FunctionKey) -> str:
+    filename, line, name = key
+    if filename == '~':  # Built-ins, as pstats labels them
+        return name
+    return f"{_short_path(filename)}:{line}({name})"
+
+
+class _Samples:
+    """Stack samples taken from one thread"""
+
+    def __init__(self):
+        self.count = 0
+        self.own: Counter = Counter()
+        self.cumulative: Counter = Counter()
+
+    def add(self, frame) -> None:
+        self.count += 1
+        seen = set()
+        leaf = True
+        depth = 0
+        while frame is not None and depth < MAX_STACK_DEPTH:
+            code = frame.f_code
+            key = (code.co_filename, code.co_firstlineno, code.co_name)
+            if leaf:
+                self.own[key] += 1
+                leaf = False
+            if key not in seen:
+                seen.add(key)
+                self.cumulative[key] += 1
+            frame = frame.f_back
+            depth += 1
+
+
+class StackSampler:
+    """One background thread sampling the stacks of the threads it is told to watch"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._watched: Dict[int, _Samples] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def watch(self, thread_id: int) -> _Samples:
+        samples = _Samples()
+        with self._lock:
+            self._watched[thread_id] = samples
+            # Started on first use and again after a fork, which keeps no threads
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return samples
+
+    def unwatch(self, thread_id: int) -> None:
+        with self._lock:
+            self._watched.pop(thread_id, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                idle = not self._watched
+                if idle:
+                    self._wakeup.clear()
+            if idle:
+                self._wakeup.wait()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._watched.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples.add(frame)
+            del frames
+
+
+class _ActiveProfile:
+    def __init__(self, mode: str, trigger: str):
+        self.mode = mode
+        self.trigger = trigger
+        self.started = time.perf_counter()
+        self.thread_id = threading.get_ident()
+        self.profiler: Optional[cProfile.Profile] = None
+        self.samples: Optional[_Samples] = None
+        self.note: Optional[str] = None
+
+
+class RequestProfiler:
+    """Starts and stops per-request profiles and keeps the finished reports"""
+
+    def __init__(self, keep: int = 20, top: int = 25, sample_interval: float = 0.005):
+        self.top = top
+        self.sampler = StackSampler(sample_interval)
+        self._reports: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._keep = keep
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # cProfile can only watch one request per process at a time
+        self._cprofile_lock = threading.Lock()
+
+    def start(self, mode: str, trigger: str) -> _ActiveProfile:
+        active = _ActiveProfile(mode, trigger)
+        if mode == 'cprofile':
+            if self._cprofile_lock.acquire(blocking=False):
+                active.profiler = cProfile.Profile()
+                active.profiler.enable()
+            else:
+                active.mode = 'sample'
+                active.note = 'another request was under cProfile; sampled instead'
+        if active.mode == 'sample':
+            active.samples = self.sampler.watch(active.thread_id)
+        return active
+
+    def stop(self, active: _ActiveProfile) -> float:
+        """Stop profiling; returns the request's duration so far in seconds"""
+        if active.profiler is not None:
+            active.profiler.disable()
+            self._cprofile_lock.release()
+        if active.samples is not None:
+            self.sampler.unwatch(active.thread_id)
+        return time.perf_counter() - active.started
+
+    def report(self, active: _ActiveProfile, duration: float, request_info: Dict) -> Dict:
+        """Build a report for a stopped profile and keep it"""
+        if active.profiler is not None:
+            own, cumulative = self._cprofile_top(active.profiler)
+        else:
+            own, cumulative = self._sample_top(active.samples, duration)
+        report = {
+            'id': f"{os.getpid()}-{next(self._ids)}",
+            'created_at': datetime.utcnow().isoformat(),
+            'mode': active.mode,
+            'trigger': active.trigger,
+            'duration_ms': round(duration * 1000, 2),
+            **request_info,
+            'top_own': own,
+            'top_cumulative': cumulative,
+        }
+        if active.samples is not None:
+            report['samples'] = active.samples.count
+            report['sample_interval_ms'] = round(self.sampler.interval * 1000, 2)
+        if active.note:
+            report['note'] = active.note
+        with self._lock:
+            self._reports[report['id']] = report
+            while len(self._reports) > self._keep:
+                self._reports.popitem(last=False)
+        return report
+
+    def _cprofile_top(self, profiler: cProfile.Profile) -> Tuple[List[Dict], List[Dict]]:
+        stats = pstats.Stats(profiler).stats
+        rows = [{
+            'function': _function_name(key),
+            'calls': calls,
+            'own_ms': round(own_time * 1000, 3),
+            'cumulative_ms': round(cumulative_time * 1000, 3),
+        } for key, (_, calls, own_time, cumulative_time, _) in stats.items()]
+        own = sorted(rows, key=lambda row: row['own_ms'], reverse=True)[:self.top]
+        cumulative = sorted(rows, key=lambda row: row['cumulative_ms'], reverse=True)[:self.top]
+        return own, cumulative
+
+    def _sample_top(self, samples: _Samples, duration: float) -> Tuple[List[Dict], List[Dict]]:
+        def rows(counter: Counter) -> List[Dict]:
+            return [{
+                'function': _function_name(key),
+                'samples': count,
+                'share': round(count / samples.count, 3),
+                # Samples land less often than the interval under load, so scale by wall time
+                'approx_ms': round(count / samples.count * duration * 1000, 1),
+            } for key, count in counter.most_common(self.top)]
+        if not samples.count:
+            return [], []
+        return rows(samples.own), rows(samples.cumulative)
+
+    def reports(self) -> List[Dict]:
+        """Summaries of the kept reports, newest first"""
+        with self._lock:
+            reports = list(self._reports.values())
+        return [{key: report[key] for key in ('id', 'created_at', 'mode', 'trigger', 'method', 'path',
+                                               'status', 'duration_ms')}
+                for report in reversed(reports)]
+
+    def get(self, report_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._reports.get(report_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reports.clear()
+
+
+def format_report(report: Dict) -> str:
+    """Plain-text rendering of a report, like pstats output"""
+    lines = [
+        f"{report['method']} {report['path']} -> {report['status']} in {report['duration_ms']:.1f} ms "
+        f"({report['mode']}, {report['trigger']})",
+    ]
+    if report.get('sql_queries') is not None:
+        lines.append(f"SQL: {report['sql_queries']} statements, {report['sql_ms']:.1f} ms")
+    if report.get('note'):
+        lines.append(f"Note: {report['note']}")
+    for title, key in (('Own time', 'top_own'), ('Cumulative time', 'top_cumulative')):
+        lines.append('')
+        lines.append(title)
+        for row in report[key]:
+            if report['mode'] == 'cprofile':
+                lines.append(f"  {row['own_ms']:>10.3f} {row['cumulative_ms']:>10.3f} {row['calls']:>8}  "
+                             f"{row['function']}")
+            else:
+                lines.append(f"  {row['share']:>6.1%} {row['approx_ms']:>9.1f}ms  {row['function']}")
+    return '\n'.join(lines) + '\n'
+
+
+def install_request_profiler(app, is_admin: Callable[[], bool]) -> RequestProfiler:
+    """Profile requests of a Flask app on demand (X-Profile from an operator, as
+    decided by is_admin) and sample slow ones; returns the report store"""
+    from flask import g, request
+
+    app.config.setdefault('PROFILE_SLOW_MS', float(os.environ.get('PROFILE_SLOW_MS', 1000)))
+    app.config.setdefault('PROFILE_SLOW_SAMPLE_RATE', float(os.environ.get('PROFILE_SLOW_SAMPLE_RATE', 0.01)))
+    app.config.setdefault('PROFILE_SAMPLE_INTERVAL_MS', float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 5)))
+    app.config.setdefault('PROFILE_KEEP', int(os.environ.get('PROFILE_KEEP', 20)))
+    app.config.setdefault('PROFILE_TOP', int(os.environ.get('PROFILE_TOP', 25)))
+
+    profiler = RequestProfiler(
+        keep=app.config['PROFILE_KEEP'],
+        top=app.config['PROFILE_TOP'],
+        sample_interval=app.config['PROFILE_SAMPLE_INTERVAL_MS'] / 1000.0,
+    )
+
+    @app.before_request
+    def _start_request_profile():
+        requested = request.headers.get('X-Profile', '').strip().lower()
+        if requested:
+            if is_admin():
+                mode = 'sample' if requested == 'sample' else 'cprofile'
+                g.request_profile = profiler.start(mode, 'on_demand')
+                return
+            logger.info(f"Ignoring X-Profile from {request.remote_addr}: not an admin request")
+        rate = app.config['PROFILE_SLOW_SAMPLE_RATE']
+        if rate > 0 and random.random() < rate:
+            g.request_profile = profiler.start('sample', 'slow')
+
+    @app.after_request
+    def _finish_request_profile(response):
+        active = g.pop('request_profile', None)
+        if active is None:
+            return response
+        duration = profiler.stop(active)
+        if active.trigger == 'slow' and duration * 1000 < app.config['PROFILE_SLOW_MS']:
+            return response
+        sql = g.get('sql_profile')
+        report = profiler.report(active, duration, {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'sql_queries': sql.count if sql is not None else None,
+            'sql_ms': round(sql.duration * 1000, 2) if sql is not None else None,
+        })
+        if active.trigger == 'slow':
+            logger.warning(f"Slow request {request.method} {request.path}: {report['duration_ms']:.0f} ms, "
+                           f"profile {report['id']}")
+        response.headers['X-Profile-Id'] = report['id']
+        return response
+
+    @app.teardown_request
+    def _abandon_request_profile(exc):
+        # after_request did not run (the request failed before a response existed)
+        active = g.pop('request_profile', None)
+        if active is not None:
+            profiler.stop(active)
+
+    app.extensions['request_profiler'] = profiler
+    return profiler
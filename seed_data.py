@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+QuickBasket Synthetic Data Loader
+Generates realistic recipes and bulk-loads them into a SQLite database with
+the same schema as models.Recipe, for capacity tests and benchmarks.
+
+Rows go in through sqlite3 executemany inside large transactions. A new
+database is loaded with pragmas that trade durability for speed (no fsync,
+in-memory journal, exclusive lock) and the canonical_url index is rebuilt
+once at the end instead of per row. Appending to a database that already
+existed keeps its journal, fsyncs and index, so an interrupted load can't
+corrupt it or leave it without its dedupe index; it is slower. Load into a
+scratch file, not the app's recipes.db.
+
+Examples:
+    python seed_data.py --db /tmp/capacity.db --count 100000
+    python seed_data.py --db /tmp/capacity.db --count 500 --append
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+
+# A few staples show up in most recipes, the long tail only occasionally
+COMMON_INGREDIENTS = [
+    'salt', 'black pepper', 'olive oil', 'garlic', 'onion', 'butter', 'sugar',
+    'all-purpose flour', 'eggs', 'whole milk',
+]
+OTHER_INGREDIENTS = [
+    'chicken breast', 'ground beef', 'pork shoulder', 'salmon fillet', 'shrimp', 'tofu',
+    'heavy cream', 'parmesan cheese', 'cheddar cheese', 'mozzarella', 'greek yogurt',
+    'basil', 'oregano', 'thyme', 'rosemary', 'cumin', 'paprika', 'chili flakes', 'cinnamon',
+    'tomatoes', 'tomato paste', 'carrots', 'celery', 'potatoes', 'spinach', 'bell pepper',
+    'mushrooms', 'zucchini', 'broccoli', 'green onions', 'ginger', 'lemon juice', 'lime',
+    'rice', 'pasta', 'bread crumbs', 'chicken stock', 'vegetable broth', 'soy sauce',
+    'honey', 'maple syrup', 'baking powder', 'baking soda', 'vanilla extract', 'brown sugar',
+    'black beans', 'chickpeas', 'coconut milk', 'sundried tomatoes', 'walnuts', 'almonds',
+]
+UNITS = ['cup', 'cups', 'tablespoons', 'tablespoon', 'teaspoon', 'teaspoons', 'oz', 'pound',
+         'cloves', 'large', 'medium', 'small', 'pinch of', 'can']
+QUANTITIES = ['1', '2', '3', '4', '1/2', '1/4', '3/4', '1 1/2', '2 1/2']
+PREPARATIONS = ['', '', '', ', chopped', ', minced', ', diced', ', sliced', ', grated', ', to taste']
+DISHES = ['Chicken', 'Pasta', 'Soup', 'Stew', 'Salad', 'Tacos', 'Curry', 'Casserole', 'Stir Fry',
+          'Skillet', 'Bake', 'Bowl', 'Pie', 'Bread', 'Muffins', 'Cookies', 'Chili', 'Risotto']
+STYLES = ['Creamy', 'Garlic', 'Lemon', 'Spicy', 'Easy', 'One-Pot', 'Weeknight', 'Classic',
+          'Honey', 'Smoky', 'Roasted', 'Herbed', 'Crispy', "Grandma's", 'Tuscan', 'Cajun']
+VERBS = ['Preheat the oven and', 'In a large skillet,', 'Whisk together', 'Stir in', 'Season with',
+         'Bring to a boil and', 'Reduce the heat and', 'Transfer to a baking dish and', 'Gently fold in']
+SITES = ['littlesunnykitchen.com', 'allrecipes.com', 'budgetbytes.com', 'seriouseats.com',
+         'bonappetit.com', 'food52.com', 'smittenkitchen.com', 'thekitchn.com']
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'  # What SQLAlchemy writes for DateTime on SQLite
+
+INSERT_SQL = (
+    "INSERT INTO recipes (title, ingredients, instructions, source_url, canonical_url, "
+    "created_at, updated_at, last_added_to_grocery) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# Settings that trade durability for speed while loading a throwaway database;
+# never used on one that existed before the load
+LOAD_PRAGMAS = [
+    'PRAGMA synchronous = OFF',
+    'PRAGMA journal_mode = MEMORY',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -262144',  # 256 MB
+    'PRAGMA locking_mode = EXCLUSIVE',
+]
+# Safe for a database someone may be using: only this connection's cache
+APPEND_PRAGMAS = [
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -262144',
+]
+
+
+# Distinct ingredient lines, steps and titles generated up front. A row's
+# ingredients (or steps) are a run of consecutive lines from a random place
+# in the pool, cut out of one pre-joined string, so a row costs a few slices
+POOL_SIZE = 4096
+MAX_LINES = 30  # Most ingredients (or steps) in one recipe
+
+
+class RecipeGenerator:
+    """Deterministic stream of realistic-looking recipes for a given seed"""
+
+    def __init__(self, seed: int = 42, days: int = 730, url_fraction: float = 0.7,
+                 grocery_fraction: float = 0.05, pool_size: int = POOL_SIZE):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.now = datetime.utcnow()
+        self.days = days
+        self.url_fraction = url_fraction
+        self.grocery_fraction = grocery_fraction
+        self.pool_size = pool_size
+        self._ingredient_pool = self._joined(self.ingredients(pool_size))
+        self._step_pool = self._joined(self.steps(pool_size))
+        self._title_pool = [self.title() for _ in range(pool_size)]
+        self._site_slugs = [f"{site}/recipe-{seed}-" for site in SITES]
+
+    def ingredient(self) -> str:
+        rng = self.rng
+        name = rng.choice(COMMON_INGREDIENTS) if rng.random() < 0.35 else rng.choice(OTHER_INGREDIENTS)
+        return f"{rng.choice(QUANTITIES)} {rng.choice(UNITS)} {name}{rng.choice(PREPARATIONS)}"
+
+    def ingredients(self, count: int) -> List[str]:
+        return [self.ingredient() for _ in range(count)]
+
+    def step(self) -> str:
+        rng = self.rng
+        return (f"{rng.choice(VERBS)} the {rng.choice(OTHER_INGREDIENTS)} with the "
+                f"{rng.choice(COMMON_INGREDIENTS)} and cook for {rng.randint(2, 45)} minutes.")
+
+    def steps(self, count: int) -> List[str]:
+        return [self.step() for _ in range(count)]
+
+    def title(self) -> str:
+        return f"{self.rng.choice(STYLES)} {self.rng.choice(OTHER_INGREDIENTS).title()} {self.rng.choice(DISHES)}"
+
+    @staticmethod
+    def _joined(lines: List[str]) -> Tuple[str, List[int]]:
+        """The lines as one string, plus where each starts; wrapped so any run of MAX_LINES fits"""
+        lines = lines + lines[:MAX_LINES]
+        offsets = [0]
+        for line in lines:
+            offsets.append(offsets[-1] + len(line) + 1)
+        return '\n'.join(lines) + '\n', offsets
+
+    def _run(self, pool: Tuple[str, List[int]], count: int) -> str:
+        text, offsets = pool
+        start = int(self.rng.random() * self.pool_size)
+        return text[offsets[start]:offsets[start + count] - 1]
+
+    def row(self, index: int) -> Tuple:
+        """One INSERT_SQL parameter tuple; index keeps URLs unique across the load"""
+        rng = self.rng
+        # Ingredient counts skew towards 6-12 with a long tail, like real recipes
+        ingredient_count = max(2, min(MAX_LINES, int(rng.gauss(9, 4))))
+        step_count = max(1, min(20, int(rng.gauss(6, 3))))
+        created_at = self.now - timedelta(seconds=rng.random() * self.days * 86400)
+        created = created_at.strftime(DATETIME_FORMAT)
+        source_url = canonical_url = None
+        if rng.random() < self.url_fraction:
+            site_slug = f"{rng.choice(self._site_slugs)}{index}"
+            source_url = f"https://www.{site_slug}/"
+            canonical_url = f"https://{site_slug}"
+        last_added = None
+        if rng.random() < self.grocery_fraction:
+            last_added = (self.now - timedelta(days=rng.randint(0, 14))).strftime(DATETIME_FORMAT)
+        return (
+            self._title_pool[int(rng.random() * self.pool_size)],
+            self._run(self._ingredient_pool, ingredient_count),
+            self._run(self._step_pool, step_count),
+            source_url,
+            canonical_url,
+            created,
+            created,
+            last_added,
+        )
+
+    def rows(self, count: int, start: int = 0) -> Iterator[Tuple]:
+        for index in range(start, start + count):
+            yield self.row(index)
+
+
+def ensure_schema(db_path: str) -> None:
+    """Create the tables exactly as the app would, and bring a database made
+    by an older version up to the current columns the same way"""
+    from models import build_engine, prepare_database
+
+    engine = build_engine(f"sqlite:///{db_path}")
+    prepare_database(engine)
+    engine.dispose()
+
+
+def bulk_load(db_path: str, count: int, batch_size: int = 50000, seed: int = 42,
+              fresh: bool = False, progress: bool = True) -> float:
+    """Insert count generated recipes into db_path; returns rows per second.
+    Only a database created by this load gets the fast, unsafe settings."""
+    if fresh and os.path.exists(db_path):
+        os.remove(db_path)
+    throwaway = not os.path.exists(db_path)
+    ensure_schema(db_path)
+
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        for pragma in LOAD_PRAGMAS if throwaway else APPEND_PRAGMAS:
+            connection.execute(pragma)
+
+        start_index = connection.execute("SELECT COALESCE(MAX(id), 0) FROM recipes").fetchone()[0]
+        generator = RecipeGenerator(seed=seed + start_index)
+
+        if throwaway:
+            # Maintaining the unique index row by row is the slowest part of the load
+            connection.execute("DROP INDEX IF EXISTS ix_recipes_canonical_url")
+
+        started = time.perf_counter()
+        loaded = 0
+        rows = generator.rows(count, start=start_index)
+        while loaded < count:
+            batch = [next(rows) for _ in range(min(batch_size, count - loaded))]
+            connection.execute('BEGIN')
+            connection.executemany(INSERT_SQL, batch)
+            connection.execute('COMMIT')
+            loaded += len(batch)
+            if progress:
+                elapsed = time.perf_counter() - started
+                print(f"  {loaded:>9,} rows  {loaded / elapsed:>10,.0f} rows/s", end='\r')
+
+        connection.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_recipes_canonical_url ON recipes (canonical_url)"
+        )
+        elapsed = time.perf_counter() - started
+        connection.execute('ANALYZE')
+    finally:
+        try:
+            # Back even if the load was interrupted (the CREATE above is then a no-op)
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            connection.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ix_recipes_canonical_url ON recipes (canonical_url)"
+            )
+        finally:
+            connection.close()
+
+    if progress:
+        print()
+    return count / elapsed if elapsed else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate and bulk-load synthetic QuickBasket recipes')
+    parser.add_argument('--db', required=True, help='SQLite database file to load into')
+    parser.add_argument('--count', type=int, default=100000, help='recipes to generate')
+    parser.add_argument('--batch-size', type=int, default=50000, help='rows per transaction')
+    parser.add_argument('--seed', type=int, default=42, help='random seed for reproducible data')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--fresh', action='store_true', help='delete the database file first')
+    group.add_argument('--append', action='store_true',
+                       help='add to an existing database (default; slower, since it keeps the safe settings)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🍽️  QuickBasket - Synthetic Data Loader")
+    print("=" * 60)
+    print(f"📁 Database: {args.db}")
+    print(f"📝 Recipes: {args.count:,} in batches of {args.batch_size:,}")
+
+    try:
+        rate = bulk_load(args.db, args.count, batch_size=args.batch_size, seed=args.seed, fresh=args.fresh)
+    except sqlite3.Error as e:
+        print(f"❌ Load failed: {e}")
+        sys.exit(1)
+
+    print(f"✅ Loaded {args.count:,} recipes at {rate:,.0f} rows/s")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
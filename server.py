@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+QuickBasket Server Launcher
+One entry point for every way QuickBasket is served: the desktop build,
+`python app.py`, run_server.py and the cloud Procfile all end up here.
+
+Configuration (environment variables, overridable on the command line):
+    QB_SERVER        waitress | gunicorn | auto (default: gunicorn on POSIX
+                     when installed and not frozen, otherwise waitress)
+    QB_WORKER_CLASS  gunicorn worker type: gthread (default) | sync
+    QB_WORKLOAD      io | mixed | cpu (default mixed), used to size threads
+    QB_WORKERS       gunicorn worker processes (WEB_CONCURRENCY also works)
+    QB_THREADS       threads per worker / waitress threads
+    QB_MAX_WORKERS   upper bound for auto-sized workers (default 8)
+    QB_DRAIN_SECONDS how long SIGTERM waits for in-flight requests (default 30)
+    HOST, PORT       bind address (default 0.0.0.0:5000)
+
+gunicorn runs with preload_app so the app, templates and DB metadata are
+loaded once in the master and shared copy-on-write; `kill -HUP` reloads
+workers gracefully and SIGTERM drains them, each worker answering /ready
+with 503 from then on. Under waitress, SIGTERM marks the app not ready,
+stops accepting connections and waits for in-flight requests; SIGHUP does
+the same and then re-executes the process.
+"""
+
+import argparse
+import gc
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import webbrowser
+
+from log_setup import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Threads per worker for each workload profile: scrapes spend most of their
+# time waiting on other sites, page renders and list building use the CPU
+THREADS_PER_CPU = {'io': 4, 'mixed': 2, 'cpu': 1}
+THREAD_BASE = {'io': 4, 'mixed': 4, 'cpu': 2}
+
+
+def _is_cloud() -> bool:
+    return bool(os.environ.get('DYNO') or os.environ.get('RAILWAY_ENVIRONMENT') or os.environ.get('RENDER'))
+
+
+def _gunicorn_available() -> bool:
+    if getattr(sys, 'frozen', False) or os.name != 'posix':
+        return False
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ServerConfig:
+    """Server choice and sizing, derived from the environment and CPU count"""
+
+    def __init__(self, server=None, worker_class=None, workload=None, workers=None,
+                 threads=None, host=None, port=None, env=os.environ):
+        self.cpu_count = os.cpu_count() or 1
+        self.workload = (workload or env.get('QB_WORKLOAD') or 'mixed').lower()
+        if self.workload not in THREADS_PER_CPU:
+            raise ValueError(f"QB_WORKLOAD must be one of {', '.join(THREADS_PER_CPU)}")
+
+        server = (server or env.get('QB_SERVER') or 'auto').lower()
+        if server == 'auto':
+            server = 'gunicorn' if _gunicorn_available() else 'waitress'
+        if server not in ('waitress', 'gunicorn'):
+            raise ValueError("QB_SERVER must be waitress, gunicorn or auto")
+        self.server = server
+
+        self.worker_class = (worker_class or env.get('QB_WORKER_CLASS') or 'gthread').lower()
+        if self.worker_class not in ('gthread', 'sync'):
+            raise ValueError("QB_WORKER_CLASS must be gthread or sync")
+
+        self.host = host or env.get('HOST') or '0.0.0.0'
+        self.port = int(port or env.get('PORT') or 5000)
+        self.drain_seconds = float(env.get('QB_DRAIN_SECONDS', 30))
+        max_workers = int(env.get('QB_MAX_WORKERS', 8))
+
+        configured_threads = threads or env.get('QB_THREADS')
+        configured_workers = workers or env.get('QB_WORKERS') or env.get('WEB_CONCURRENCY')
+
+        if self.server == 'waitress':
+            # One process; all concurrency comes from threads
+            self.workers = 1
+            self.threads = int(configured_threads or min(
+                32, THREAD_BASE[self.workload] + THREADS_PER_CPU[self.workload] * self.cpu_count))
+        elif self.worker_class == 'sync':
+            # Classic 2 x CPU + 1; each sync worker handles one request at a time
+            self.threads = 1
+            self.workers = int(configured_workers or min(max_workers, 2 * self.cpu_count + 1))
+        else:
+            # A process per core for CPU work, threads to overlap waiting on I/O
+            self.workers = int(configured_workers or min(max_workers, self.cpu_count + 1))
+            self.threads = int(configured_threads or (
+                THREAD_BASE[self.workload] + THREADS_PER_CPU[self.workload] * 2))
+
+    def describe(self) -> str:
+        if self.server == 'waitress':
+            return f"Waitress, {self.threads} threads"
+        if self.worker_class == 'sync':
+            return f"Gunicorn, {self.workers} sync workers"
+        return f"Gunicorn, {self.workers} workers x {self.threads} threads"
+
+
+def _prepare_metrics_dir(config: ServerConfig) -> None:
+    """Multi-process servers need a shared METRICS_DIR, emptied on every start"""
+    if config.server != 'gunicorn' or config.workers < 2:
+        return
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if not metrics_dir:
+        metrics_dir = os.path.join(tempfile.gettempdir(), f"quickbasket-metrics-{config.port}")
+        os.environ['METRICS_DIR'] = metrics_dir
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+    # app.py may already be loaded (python app.py), so point the registry there too
+    from metrics import REGISTRY
+    REGISTRY.multiprocess_dir = metrics_dir
+
+
+def _lan_address() -> str:
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect(('10.255.255.255', 1))
+            return sock.getsockname()[0]
+    except OSError:
+        return '127.0.0.1'
+
+
+def print_banner(config: ServerConfig) -> None:
+    print("=" * 60)
+    print("🍽️  QuickBasket - Production Server")
+    print("=" * 60)
+    print(f"Server: {config.describe()}")
+    print(f"Local: http://127.0.0.1:{config.port}")
+    print(f"Network: http://{_lan_address()}:{config.port} (for tablets)")
+    print("=" * 60)
+    print("✅ Progressive Web App - Installable on tablets")
+    print("✅ Web scraping - Import recipes from URLs")
+    print("✅ Offline support - Service worker caching")
+    print("=" * 60)
+    print(f"Environment: {'Cloud' if _is_cloud() else 'Local'}")
+
+
+def open_browser_delayed(port: int) -> None:
+    """Open the app in a browser once the server has had time to start"""
+    def opener():
+        time.sleep(2)
+        webbrowser.open(f'http://127.0.0.1:{port}')
+    threading.Thread(target=opener, daemon=True).start()
+
+
+# ----- waitress -----
+
+def _waitress_listeners(server):
+    from waitress.server import BaseWSGIServer
+    if isinstance(server, BaseWSGIServer):
+        return [server]
+    return [dispatcher for dispatcher in server.map.values() if isinstance(dispatcher, BaseWSGIServer)]
+
+
+def serve_waitress(app_module, config: ServerConfig) -> None:
+    from waitress import create_server
+    from metrics import HTTP_IN_FLIGHT
+    from rate_limit import size_admission
+
+    server = create_server(
+        app_module.app,
+        host=config.host,
+        port=config.port,
+        threads=config.threads,
+        connection_limit=1000,
+        cleanup_interval=30,
+        channel_timeout=120,
+    )
+    # Requests parked in waitress's queue are invisible to the app otherwise
+    size_admission(app_module.scrape_admission, config.threads, lambda: len(server.task_dispatcher.queue))
+    restart = threading.Event()
+    drained = threading.Event()
+
+    def drain_and_stop():
+        deadline = time.monotonic() + config.drain_seconds
+        dispatcher = server.task_dispatcher
+        while time.monotonic() < deadline:
+            if HTTP_IN_FLIGHT.get() <= 0 and not dispatcher.queue and dispatcher.active_count == 0:
+                break
+            time.sleep(0.05)
+        else:
+            logger.warning(f"Drain timed out after {config.drain_seconds}s with requests still running")
+        drained.set()
+        # Wake the main thread; the handler then leaves server.run(), which
+        # shuts the worker threads down
+        signal.raise_signal(signal.SIGTERM)
+
+    def handle_stop(signum, frame):
+        if drained.is_set():
+            raise SystemExit(0)
+        if app_module.draining.is_set():
+            return
+        logger.info(f"Received signal {signum}, draining in-flight requests")
+        app_module.draining.set()
+        for listener in _waitress_listeners(server):
+            listener.accepting = False
+        if signum == getattr(signal, 'SIGHUP', None):
+            restart.set()
+        threading.Thread(target=drain_and_stop, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, handle_stop)
+
+    logger.info(f"Starting Waitress WSGI server on {config.host}:{config.port} with {config.threads} threads")
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        server.close()
+
+    if restart.is_set():
+        logger.info("Reloading: re-executing the server process")
+        script_args = sys.argv[1:] if getattr(sys, 'frozen', False) else sys.argv
+        os.execv(sys.executable, [sys.executable] + script_args)
+
+
+# ----- gunicorn -----
+
+def serve_gunicorn(app_module, config: ServerConfig) -> None:
+    from gunicorn.app.base import BaseApplication
+    from rate_limit import size_admission
+
+    # Per worker; gthread doesn't expose its connection queue, so only in-flight scrapes count
+    size_admission(app_module.scrape_admission, config.threads)
+
+    def post_fork(server, worker):
+        # Pooled connections opened in the master must not be shared with workers
+        from models import engine
+        engine.dispose(close=False)
+
+    def post_worker_init(worker):
+        # Report not ready while the worker drains: gunicorn's own SIGTERM
+        # handler (installed just before this hook) only stops the accept loop
+        handle_exit = signal.getsignal(signal.SIGTERM)
+
+        def handle_term(signum, frame):
+            app_module.draining.set()
+            handle_exit(signum, frame)
+
+        signal.signal(signal.SIGTERM, handle_term)
+        # As gunicorn has it: don't interrupt system calls of active requests
+        signal.siginterrupt(signal.SIGTERM, False)
+
+    def worker_int(worker):
+        app_module.draining.set()
+
+    def when_ready(server):
+        # Move everything loaded so far out of the collector's reach so that
+        # GC passes in the workers don't touch (and copy) the shared pages
+        gc.freeze()
+
+    options = {
+        'bind': f"{config.host}:{config.port}",
+        'workers': config.workers,
+        'worker_class': config.worker_class,
+        'threads': config.threads,
+        'preload_app': True,
+        'timeout': 120,
+        'graceful_timeout': int(config.drain_seconds),
+        'keepalive': 5,
+        'post_fork': post_fork,
+        'post_worker_init': post_worker_init,
+        'worker_int': worker_int,
+        'when_ready': when_ready,
+    }
+
+    class QuickBasketGunicorn(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app_module.app
+
+    logger.info(f"Starting Gunicorn on {config.host}:{config.port}: {config.describe()}")
+    QuickBasketGunicorn().run()
+
+
+def serve(config: ServerConfig, open_browser: bool = False) -> None:
+    """Load the app once, then hand it to the configured server"""
+    _prepare_metrics_dir(config)
+    import app as app_module  # Warms up on import, before any worker is forked
+
+    print_banner(config)
+    if open_browser:
+        open_browser_delayed(config.port)
+
+    if config.server == 'gunicorn':
+        serve_gunicorn(app_module, config)
+    else:
+        serve_waitress(app_module, config)
+
+
+def main(argv=None, open_browser=None):
+    parser = argparse.ArgumentParser(description='Run the QuickBasket server')
+    parser.add_argument('--server', choices=['auto', 'waitress', 'gunicorn'])
+    parser.add_argument('--worker-class', choices=['gthread', 'sync'])
+    parser.add_argument('--workload', choices=list(THREADS_PER_CPU))
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--no-browser', action='store_true', help="don't open a browser window")
+    args = parser.parse_args(argv)
+
+    try:
+        config = ServerConfig(server=args.server, worker_class=args.worker_class, workload=args.workload,
+                              workers=args.workers, threads=args.threads, host=args.host, port=args.port)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if open_browser is None:
+        open_browser = not _is_cloud()
+    serve(config, open_browser=open_browser and not args.no_browser)
+
+
+if __name__ == '__main__':
+    main()
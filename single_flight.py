@@ -0,0 +1,117 @@
+"""
+Single-flight call coalescing for recipe scrapes.
+
+When the same recipe link is shared in a group chat, several devices import
+it within seconds. SingleFlight (threads) and AsyncSingleFlight (asyncio)
+let the first caller for a key do the work while later callers for the same
+key wait for it and share the result, so a page is fetched and parsed once.
+Followers get their own deep copy of the result, since callers modify the
+recipe dicts they are handed.
+"""
+
+import asyncio
+import copy
+import threading
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from metrics import SCRAPE_FLIGHTS
+
+T = TypeVar('T')
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _FlightStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.leaders = 0
+        self.followers = 0
+
+    def _record(self, role: str) -> None:
+        if role == 'leader':
+            self.leaders += 1
+        else:
+            self.followers += 1
+        SCRAPE_FLIGHTS.inc(flight=self.name, role=role)
+
+    def snapshot(self) -> Dict:
+        total = self.leaders + self.followers
+        return {
+            'in_flight': len(self._calls),
+            'leaders': self.leaders,
+            'followers': self.followers,
+            'coalesce_ratio': round(self.followers / total, 3) if total else 0.0,
+        }
+
+
+class SingleFlight(_FlightStats):
+    """Coalesces concurrent calls with the same key across threads"""
+
+    def __init__(self, name: str = 'scrape'):
+        super().__init__(name)
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """fn() for the first caller with key; concurrent callers wait and share its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._record('leader' if leader else 'follower')
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Later callers start a fresh call: a result is shared, never cached
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight(_FlightStats):
+    """Coalesces concurrent coroutines with the same key on one event loop"""
+
+    def __init__(self, name: str = 'scrape'):
+        super().__init__(name)
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, make_coroutine: Callable[[], Awaitable[T]]) -> T:
+        future = self._calls.get(key)
+        if future is not None:
+            self._record('follower')
+            # shield: a follower giving up must not cancel the leader's work
+            return copy.deepcopy(await asyncio.shield(future))
+
+        self._record('leader')
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await make_coroutine()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Retrieved, so an unshared failure isn't logged as lost
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+QuickBasket Site Extractors
+Per-site recipe selectors, so pages from known sites are read with a few
+targeted CSS selects instead of the generic heuristic scan.
+
+Definitions live in site_extractors.json (SITE_EXTRACTORS_PATH overrides it):
+
+    {"sites": [{
+        "name": "wp-recipe-maker",
+        "hosts": ["budgetbytes.com"],            # subdomains match too
+        "title": ".wprm-recipe-name",
+        "ingredients": ".wprm-recipe-ingredient",
+        "instructions": [".wprm-recipe-instruction-text",
+                         {"select": "meta[itemprop=recipeInstructions]", "attr": "content"}],
+        "fixtures": [{"file": "budgetbytes.html", "url": "https://www.budgetbytes.com/...",
+                      "expect": {"title": "...", "ingredients": 9, "instructions": 6}}]
+    }]}
+
+A field is a selector, a {"select", "attr"} rule (take an attribute instead
+of the text), or a list of them tried in order until one matches. Selectors
+are compiled once when the file is loaded; a site whose definition does not
+compile is logged and left out, so one bad entry cannot stop the app.
+
+Fixtures are saved pages under fixtures/sites/. Check every definition
+against them (exit status 1 on any failure):
+    python site_extractors.py validate
+    python site_extractors.py capture https://www.budgetbytes.com/... --site wp-recipe-maker
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('title', 'ingredients', 'instructions')
+
+
+def _base_path() -> str:
+    # PyInstaller unpacks data files to _MEIPASS
+    return getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+
+
+DEFAULT_PATH = os.path.join(_base_path(), 'site_extractors.json')
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'sites')
+
+
+class SiteExtractorError(ValueError):
+    """A site definition that cannot be used"""
+
+
+class FieldRule:
+    """One compiled selector, reading element text or an attribute"""
+    __slots__ = ('selector', 'attr', 'compiled')
+
+    def __init__(self, selector: str, attr: Optional[str] = None):
+        self.selector = selector
+        self.attr = attr
+        self.compiled = soupsieve.compile(selector)
+
+    def values(self, soup: BeautifulSoup) -> List[str]:
+        values = []
+        for element in self.compiled.select(soup):
+            value = element.get(self.attr) if self.attr else element.get_text(' ', strip=True)
+            if isinstance(value, list):  # Multi-valued attributes such as class
+                value = ' '.join(value)
+            value = ' '.join((value or '').split())
+            if value:
+                values.append(value)
+        return values
+
+
+class SiteExtractor:
+    """Selectors for one site, covering one or more hosts"""
+
+    def __init__(self, name: str, hosts: List[str], rules: Dict[str, List[FieldRule]], fixtures: List[Dict]):
+        self.name = name
+        self.hosts = hosts
+        self.rules = rules
+        self.fixtures = fixtures
+
+    @classmethod
+    def from_definition(cls, definition: Dict) -> 'SiteExtractor':
+        if not isinstance(definition, dict):
+            raise SiteExtractorError(f"site definition must be an object, not {type(definition).__name__}")
+        name = definition.get('name') or '?'
+        hosts = definition.get('hosts')
+        if not hosts or not isinstance(hosts, list) or not all(isinstance(host, str) and host for host in hosts):
+            raise SiteExtractorError(f"{name}: 'hosts' must be a non-empty list of host names")
+        if not definition.get('ingredients') or not definition.get('instructions'):
+            raise SiteExtractorError(f"{name}: 'ingredients' and 'instructions' are required")
+        rules = {}
+        for field in FIELDS:
+            specs = definition.get(field) or []
+            if not isinstance(specs, list):
+                specs = [specs]
+            rules[field] = [cls._compile(name, field, spec) for spec in specs]
+        fixtures = definition.get('fixtures') or []
+        if not isinstance(fixtures, list):
+            raise SiteExtractorError(f"{name}: 'fixtures' must be a list")
+        return cls(name, [normalize_host(host) for host in hosts], rules, fixtures)
+
+    @staticmethod
+    def _compile(name: str, field: str, spec) -> FieldRule:
+        if isinstance(spec, str):
+            selector, attr = spec, None
+        elif isinstance(spec, dict) and isinstance(spec.get('select'), str):
+            selector, attr = spec['select'], spec.get('attr')
+        else:
+            raise SiteExtractorError(f"{name}: {field} rule must be a selector or {{\"select\", \"attr\"}}, got {spec!r}")
+        try:
+            return FieldRule(selector, attr)
+        except soupsieve.SelectorSyntaxError as e:
+            raise SiteExtractorError(f"{name}: {field} selector {selector!r} does not compile: {str(e).splitlines()[0]}") from e
+
+    def extract(self, soup: BeautifulSoup) -> Dict[str, List[str]]:
+        """Raw values per field; each field from its first rule that matches anything"""
+        fields = {}
+        for field, rules in self.rules.items():
+            fields[field] = []
+            for rule in rules:
+                values = rule.values(soup)
+                if values:
+                    fields[field] = values
+                    break
+        return fields
+
+
+def normalize_host(host: str) -> str:
+    host = host.strip().lower().rstrip('.')
+    return host[4:] if host.startswith('www.') else host
+
+
+class SiteExtractorRegistry:
+    """Site extractors by host"""
+
+    def __init__(self, extractors: Iterable[SiteExtractor] = (), errors: Iterable[str] = ()):
+        self.extractors = list(extractors)
+        self.errors = list(errors)
+        self._by_host: Dict[str, SiteExtractor] = {}
+        for extractor in self.extractors:
+            for host in extractor.hosts:
+                if host in self._by_host:
+                    self.errors.append(f"{extractor.name}: host {host} is already covered by "
+                                       f"{self._by_host[host].name}")
+                    continue
+                self._by_host[host] = extractor
+
+    @classmethod
+    def from_file(cls, path: str, strict: bool = False) -> 'SiteExtractorRegistry':
+        """Load and compile definitions. Broken sites are left out and listed in
+        errors, or raise SiteExtractorError when strict"""
+        with open(path, encoding='utf-8') as handle:
+            try:
+                data = json.load(handle)
+            except json.JSONDecodeError as e:
+                raise SiteExtractorError(f"{path} is not valid JSON: {e}") from e
+        sites = data.get('sites') if isinstance(data, dict) else None
+        if not isinstance(sites, list):
+            raise SiteExtractorError(f"{path} must hold an object with a 'sites' list")
+
+        extractors, errors = [], []
+        for definition in sites:
+            try:
+                extractors.append(SiteExtractor.from_definition(definition))
+            except SiteExtractorError as e:
+                if strict:
+                    raise
+                errors.append(str(e))
+        registry = cls(extractors, errors)
+        if strict and registry.errors:
+            raise SiteExtractorError(registry.errors[0])
+        return registry
+
+    def for_host(self, host: Optional[str]) -> Optional[SiteExtractor]:
+        """The extractor for host or the closest parent domain that has one"""
+        if not host or not self._by_host:
+            return None
+        host = normalize_host(host)
+        while host:
+            extractor = self._by_host.get(host)
+            if extractor is not None:
+                return extractor
+            _, _, host = host.partition('.')
+        return None
+
+    def __len__(self) -> int:
+        return len(self.extractors)
+
+
+def load_registry(path: Optional[str] = None) -> SiteExtractorRegistry:
+    """The registry the scraper uses; empty if the file is missing or unreadable"""
+    path = path or os.environ.get('SITE_EXTRACTORS_PATH') or DEFAULT_PATH
+    try:
+        registry = SiteExtractorRegistry.from_file(path)
+    except FileNotFoundError:
+        logger.info(f"No site extractors file at {path}")
+        return SiteExtractorRegistry()
+    except (OSError, SiteExtractorError) as e:
+        logger.error(f"Could not load site extractors: {e}")
+        return SiteExtractorRegistry()
+    for error in registry.errors:
+        logger.error(f"Skipping site extractor: {error}")
+    logger.info(f"Loaded {len(registry)} site extractors from {path}")
+    return registry
+
+
+# ----- validation CLI -----
+
+def _check(expected, actual, field: str) -> Optional[str]:
+    """Why actual does not meet the fixture's expectation, or None"""
+    if isinstance(expected, int) and not isinstance(expected, bool):
+        return None if len(actual) == expected else f"{field}: expected {expected}, found {len(actual)}"
+    if isinstance(expected, str):
+        return None if actual == expected else f"{field}: expected {expected!r}, found {actual!r}"
+    if isinstance(expected, list):
+        return None if actual == expected else f"{field}: found {actual!r}"
+    return f"{field}: unsupported expectation {expected!r}"
+
+
+def validate(registry: SiteExtractorRegistry, fixtures_dir: str) -> Tuple[List[Dict], List[str]]:
+    """Run every site's fixtures through its extractor and the generic cascade.
+    Returns (results, problems)"""
+    from recipe_scraper import RecipeScrapingService
+    from extraction_memory import ExtractionMemory
+
+    # The generic cascade only, for comparison; no memory carried between pages
+    generic = RecipeScrapingService(site_extractors=SiteExtractorRegistry(),
+                                    extraction_memory=ExtractionMemory(min_attempts=10 ** 9))
+    targeted = RecipeScrapingService(site_extractors=registry, extraction_memory=ExtractionMemory())
+    results = []
+    problems = list(registry.errors)
+    for extractor in registry.extractors:
+        if not extractor.fixtures:
+            problems.append(f"{extractor.name}: no fixtures")
+        for fixture in extractor.fixtures:
+            path = os.path.join(fixtures_dir, fixture.get('file', ''))
+            url = fixture.get('url') or f"https://{extractor.hosts[0]}/"
+            result = {'site': extractor.name, 'fixture': fixture.get('file'), 'problems': []}
+            results.append(result)
+            try:
+                with open(path, encoding='utf-8') as handle:
+                    html = handle.read()
+            except OSError as e:
+                result['problems'].append(f"cannot read fixture: {e}")
+                problems.append(f"{extractor.name}/{fixture.get('file')}: cannot read fixture: {e}")
+                continue
+            if registry.for_host(urlparse(url).hostname) is not extractor:
+                result['problems'].append(f"{url} is not covered by this site's hosts")
+
+            # Both timings include parsing the page
+            started = time.perf_counter()
+            recipe = targeted._extract_site(BeautifulSoup(html, 'html.parser'), url, extractor)
+            result['site_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            started = time.perf_counter()
+            generic.extract_recipe(html, url)
+            result['cascade_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+            if recipe is None:
+                result['problems'].append("no recipe: title, ingredients or instructions missing")
+            else:
+                result['found'] = {field: len(recipe[field]) if field != 'title' else recipe['title']
+                                   for field in FIELDS}
+                for field, expected in (fixture.get('expect') or {}).items():
+                    problem = _check(expected, recipe.get(field), field)
+                    if problem:
+                        result['problems'].append(problem)
+            problems.extend(f"{extractor.name}/{fixture.get('file')}: {problem}" for problem in result['problems'])
+    return results, problems
+
+
+def capture(url: str, site: str, path: str, fixtures_dir: str) -> Dict:
+    """Save url as a fixture for site and record what its extractor finds as the expectation"""
+    from recipe_scraper import RecipeScrapingService
+
+    with open(path, encoding='utf-8') as handle:
+        data = json.load(handle)
+    definition = next((entry for entry in data['sites'] if entry.get('name') == site), None)
+    if definition is None:
+        raise SiteExtractorError(f"no site named {site} in {path}")
+    extractor = SiteExtractor.from_definition(definition)
+
+    service = RecipeScrapingService(site_extractors=SiteExtractorRegistry([extractor]))
+    html, _ = service._fetch_page(url, service.request_headers())
+    if html is None:
+        raise SiteExtractorError(f"{url} is not a webpage")
+    recipe = service._extract_site(BeautifulSoup(html, 'html.parser'), url, extractor)
+    if recipe is None:
+        raise SiteExtractorError(f"the {site} selectors find no recipe on {url}")
+
+    host = normalize_host(urlparse(url).hostname or 'page')
+    os.makedirs(fixtures_dir, exist_ok=True)
+    existing = {fixture.get('file') for fixture in definition.get('fixtures') or []}
+    number = 1
+    while f"{host}-{number}.html" in existing or os.path.exists(os.path.join(fixtures_dir, f"{host}-{number}.html")):
+        number += 1
+    file_name = f"{host}-{number}.html"
+    with open(os.path.join(fixtures_dir, file_name), 'w', encoding='utf-8') as handle:
+        handle.write(html)
+    fixture = {'file': file_name, 'url': url, 'expect': {
+        'title': recipe['title'],
+        'ingredients': len(recipe['ingredients']),
+        'instructions': len(recipe['instructions']),
+    }}
+    definition.setdefault('fixtures', []).append(fixture)
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(data, handle, indent=2, ensure_ascii=False)
+        handle.write('\n')
+    return fixture
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate site extractor definitions against saved pages')
+    parser.add_argument('--path', default=os.environ.get('SITE_EXTRACTORS_PATH') or DEFAULT_PATH,
+                        help='site extractors file')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='directory of saved pages')
+    commands = parser.add_subparsers(dest='command')
+    check = commands.add_parser('validate', help='check every definition against its fixtures (default)')
+    check.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    save = commands.add_parser('capture', help="save a live page as a fixture for a site")
+    save.add_argument('url')
+    save.add_argument('--site', required=True, help='name of the site definition')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    print("=" * 72)
+    print("🍽️  QuickBasket - Site Extractors")
+    print("=" * 72)
+
+    if args.command == 'capture':
+        try:
+            fixture = capture(args.url, args.site, args.path, args.fixtures)
+        except (OSError, SiteExtractorError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"💾 Saved {fixture['file']}: {fixture['expect']['title']!r}, "
+              f"{fixture['expect']['ingredients']} ingredients, {fixture['expect']['instructions']} steps")
+        print("Check the page and the expectations before committing them.")
+        return
+
+    try:
+        registry = SiteExtractorRegistry.from_file(args.path)
+    except (OSError, SiteExtractorError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    results, problems = validate(registry, args.fixtures)
+    print(f"{len(registry)} sites, {len(results)} fixtures in {args.path}")
+    print(f"{'site':<20} {'fixture':<28} {'site ms':>8} {'cascade ms':>10}  result")
+    for result in results:
+        status = '✅' if not result['problems'] else '❌ ' + '; '.join(result['problems'])
+        print(f"{result['site']:<20} {str(result['fixture']):<28} {result.get('site_ms', 0):>8.2f} "
+              f"{result.get('cascade_ms', 0):>10.2f}  {status}")
+    print("=" * 72)
+    for problem in problems:
+        print(f"❌ {problem}")
+    print(f"{'✅ All definitions valid' if not problems else f'{len(problems)} problems'}")
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'results': results, 'problems': problems}, handle, indent=2)
+        print(f"💾 Results written to {args.json}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Streamed HTML pages for long lists (the recipe library, the grocery list).
+
+render_template() builds the whole page before the first byte goes out, so
+time to first byte and memory grow with the list. stream_page() renders the
+template with Jinja's generate() under stream_with_context instead: the
+page shell (head, styles, header) is sent as soon as it is rendered, then
+the list in chunks of about STREAM_CHUNK_BYTES as its rows arrive.
+
+The rows come from cached_rows(): the read cache's copy when it is current,
+otherwise a server-side cursor, read yield_per rows at a time. Lists of up
+to STREAM_CACHE_ROWS rows are kept in the read cache once streamed, so
+small libraries are still served from memory; longer ones are never held
+in memory whole. A streamed page holds its database connection until the
+last row is sent.
+
+Settings (app.config, defaulting from the environment):
+- STREAM_PAGES: 0 renders the pages whole, as before (default 1)
+- STREAM_CHUNK_BYTES: bytes per chunk after the page shell (default 32768)
+- STREAM_CACHE_ROWS: longest list kept in the read cache (default 2000)
+"""
+
+import os
+from typing import Any, Callable, Hashable, Iterable, Iterator, List, Optional
+
+from read_cache import MISSING, read_cache
+
+# The first chunk goes out as soon as there is this much, which the page
+# shell always is, so the browser can start on the styles before any row is read
+FIRST_CHUNK_BYTES = 1024
+
+
+class LazyRows:
+    """An iterable that reads its rows only when the template gets to them.
+    Truth-testing ({% if recipes %}) reads just the first row. Iterable once."""
+
+    def __init__(self, rows: Iterable[Any]):
+        self._rows = iter(rows)
+        self._first: List[Any] = []
+        self._empty: Optional[bool] = None
+
+    def __bool__(self) -> bool:
+        if self._empty is None:
+            try:
+                self._first.append(next(self._rows))
+                self._empty = False
+            except StopIteration:
+                self._empty = True
+        return not self._empty
+
+    def __iter__(self) -> Iterator[Any]:
+        yield from self._first
+        self._first = []
+        yield from self._rows
+
+
+def cached_rows(engine, key: Hashable, query_rows: Callable[[], Iterable[Any]], cache_limit: int) -> Iterator[Any]:
+    """Rows for key from the read cache, or streamed from query_rows() (and
+    cached afterwards when there are no more than cache_limit of them)"""
+    version, cached = read_cache.lookup(engine, key)
+    if cached is not MISSING:
+        yield from cached
+        return
+    kept: Optional[List[Any]] = [] if cache_limit > 0 else None
+    for row in query_rows():
+        if kept is not None:
+            kept.append(row)
+            if len(kept) > cache_limit:
+                kept = None
+        yield row
+    if kept is not None:
+        read_cache.store(engine, key, version, kept)
+
+
+def _chunks(parts: Iterable[str], chunk_bytes: int) -> Iterator[str]:
+    buffer: List[str] = []
+    size = 0
+    limit = FIRST_CHUNK_BYTES
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= limit:
+            yield ''.join(buffer)
+            buffer, size, limit = [], 0, chunk_bytes
+    if buffer:
+        yield ''.join(buffer)
+
+
+def configure_streaming(app) -> None:
+    """Default the streaming settings from the environment"""
+    app.config.setdefault('STREAM_PAGES', os.environ.get('STREAM_PAGES', '1').lower() not in ('0', 'false', 'no'))
+    app.config.setdefault('STREAM_CHUNK_BYTES', int(os.environ.get('STREAM_CHUNK_BYTES', 32768)))
+    app.config.setdefault('STREAM_CACHE_ROWS', int(os.environ.get('STREAM_CACHE_ROWS', 2000)))
+
+
+def stream_page(template_name: str, **context):
+    """A Response that renders template_name as it is sent (see the module docstring)"""
+    from flask import Response, current_app, get_flashed_messages, stream_with_context
+
+    # Take the flashed messages out of the session now: once the body is
+    # streaming, the headers (and the session cookie) have already been sent
+    get_flashed_messages()
+    current_app.update_template_context(context)
+    template = current_app.jinja_env.get_or_select_template(template_name)
+    chunks = _chunks(template.generate(context), current_app.config['STREAM_CHUNK_BYTES'])
+    return Response(stream_with_context(chunks), mimetype='text/html')
@@ -0,0 +1,17 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Before anything imports models, which binds the engine on import
+_workdir = tempfile.mkdtemp(prefix='quickbasket-tests-')
+atexit.register(shutil.rmtree, _workdir, ignore_errors=True)
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_workdir, 'recipes.db')}"
+os.environ['HOUSEHOLD_DB_DIR'] = os.path.join(_workdir, 'households')
+os.environ['BACKUP_INTERVAL_HOURS'] = '0'
+os.environ['IMAGE_WORKERS'] = '0'
+os.environ['PROFILE_SLOW_SAMPLE_RATE'] = '0'
+os.environ['LOG_REQUESTS'] = '0'
@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import inspect
+
+from models import Base, build_engine, prepare_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic(database_url, *args):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    return subprocess.run([sys.executable, '-m', 'alembic', *args], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+
+
+def app_created(path):
+    engine = build_engine(f"sqlite:///{path}")
+    prepare_database(engine)
+    engine.dispose()
+
+
+def first_version(path):
+    # The table as the app made it before last_added_to_grocery existed
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE recipes (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, "
+                       "ingredients TEXT NOT NULL, instructions TEXT, created_at DATETIME, updated_at DATETIME)")
+    connection.execute("INSERT INTO recipes (title, ingredients) VALUES ('Soup', '1 leek')")
+    connection.commit()
+    connection.close()
+
+
+@pytest.mark.parametrize('make', [None, app_created, first_version])
+def test_upgrade_head_reaches_the_model_schema(tmp_path, make):
+    path = tmp_path / 'recipes.db'
+    if make:
+        make(path)
+    result = alembic(f"sqlite:///{path}", 'upgrade', 'head')
+    assert result.returncode == 0, result.stderr
+
+    engine = build_engine(f"sqlite:///{path}")
+    try:
+        inspector = inspect(engine)
+        for table in Base.metadata.sorted_tables:
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            assert columns == set(table.columns.keys())
+        assert 'ix_recipes_canonical_url' in {index['name'] for index in inspector.get_indexes('recipes')}
+    finally:
+        engine.dispose()
+    assert 'head' in alembic(f"sqlite:///{path}", 'current').stdout
+
+
+def test_upgrade_head_in_memory():
+    result = alembic('sqlite://', 'upgrade', 'head')
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,17 @@
+from rate_limit import RateLimiter, TokenBucket
+
+
+def test_cost_above_capacity_leaves_the_bucket_in_debt():
+    bucket = TokenBucket(rate=2.0, capacity=30)
+    now = bucket.updated
+    assert bucket.take(now, cost=100) == 0.0
+    # 71 tokens short of one more, at 2 per second
+    assert bucket.take(now, cost=1) == 35.5
+
+
+def test_batch_cost_applies_to_the_client_bucket():
+    limiter = RateLimiter('write', per_minute=120, burst=30, global_per_minute=1200)
+    assert limiter.check('phone', cost=25) == (None, 0.0)
+    scope, wait = limiter.check('phone', cost=10)
+    assert scope == 'client' and wait > 0
+    assert limiter.check('laptop', cost=10) == (None, 0.0)
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from models import Recipe, build_engine, prepare_database
+from recipe_io import import_lines
+from sqlalchemy import func, select
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'recipes.db'}")
+    prepare_database(engine)
+    yield engine
+    engine.dispose()
+
+
+def recipe_count(engine):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(Recipe.__table__)).scalar()
+
+
+def line(record):
+    return (json.dumps(record) + '\n').encode('utf-8')
+
+
+GOOD = {'title': 'Soup', 'ingredients': ['1 leek'], 'source_url': 'https://example.com/soup'}
+
+
+@pytest.mark.parametrize('bad', [
+    {'title': 5, 'ingredients': ['a']},
+    {'title': 'Stew', 'ingredients': 'a', 'source_url': ['https://example.com/stew']},
+    {'title': 'Stew', 'ingredients': {'a': 1}},
+    {'title': 'Stew', 'ingredients': ['a', 2]},
+    {'title': 'Stew', 'ingredients': ['a'], 'created_at': 20240101},
+])
+def test_wrongly_typed_fields_are_bad_lines(engine, bad):
+    report = import_lines(engine, [line(bad), line(GOOD)])
+    assert report.error_count == 1
+    assert report.inserted == 1
+    assert recipe_count(engine) == 1
+
+
+def test_badly_encoded_line_is_a_bad_line(engine):
+    report = import_lines(engine, [b'{"title": "Caf\xe9", "ingredients": ["a"]}\n', line(GOOD)])
+    assert report.error_count == 1
+    assert report.inserted == 1
+    assert 'line 1' in report.errors[0]
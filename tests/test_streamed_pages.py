@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pytest
+
+import app as app_module
+from models import Recipe, Session, households
+from read_cache import read_cache
+
+
+@pytest.fixture
+def client():
+    households.create('smith')
+    main, household = Session(), households.get('smith')[1]()
+    try:
+        now = datetime.utcnow()
+        main.add(Recipe(title='MainSoup', ingredients='main leek', last_added_to_grocery=now))
+        household.add(Recipe(title='SmithPie', ingredients='smith apple', last_added_to_grocery=now))
+        main.commit()
+        household.commit()
+    finally:
+        main.close()
+        household.close()
+    read_cache.clear()
+    yield app_module.app.test_client()
+    read_cache.clear()
+
+
+@pytest.mark.parametrize('streamed', [True, False])
+@pytest.mark.parametrize('path, mine, theirs', [
+    ('/', 'SmithPie', 'MainSoup'),
+    ('/grocery_list', 'smith apple', 'main leek'),
+])
+def test_household_pages_list_the_household_rows(client, streamed, path, mine, theirs):
+    app_module.app.config['STREAM_PAGES'] = streamed
+    try:
+        # Twice, so the second request is served from whatever the first cached
+        for _ in range(2):
+            body = client.get(path, headers={'X-Household': 'smith'}).get_data(as_text=True)
+            assert mine in body and theirs not in body
+            body = client.get(path).get_data(as_text=True)
+            assert theirs in body and mine not in body
+    finally:
+        app_module.app.config['STREAM_PAGES'] = True